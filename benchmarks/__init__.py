@@ -0,0 +1,11 @@
+"""
+Performance benchmarks for the create and query paths, against local stand-ins for DynamoDB.
+
+Run `python -m benchmarks --help`, or `make benchmark`. The fixtures are synthetic `FaultSystemSolution`s
+(see `tests.synthetic_solution`) at `small`, `medium` or `full` scale, `full` being about the size of the NSHM
+crustal rupture set. Queries are timed against moto and the embedded SQLite backend, and imports of the
+package entry points in a new interpreter.
+
+Save the results with `--json` and check a change against them with `--compare`, which fails when a benchmark's
+median time grows by more than `--threshold`.
+"""
@@ -0,0 +1,73 @@
+"""Run the benchmarks, see `python -m benchmarks --help`."""
+
+import argparse
+import logging
+import os
+import platform
+import sys
+from datetime import datetime as dt
+from datetime import timezone
+
+# the benchmarks run against local stand-ins, never AWS
+os.environ.setdefault('TESTING', '1')
+for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY'):
+    os.environ.setdefault(name, 'testing')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+
+def main(argv=None) -> int:
+    from .harness import format_results, load_results, regressions, save_results
+    from .suite import BACKENDS, SCALES, run
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__)
+    parser.add_argument('--scale', choices=list(SCALES), default='full')
+    parser.add_argument('--backends', default=','.join(BACKENDS), help='comma separated, of %(default)s')
+    parser.add_argument('--rounds', type=int, default=3, help='timed rounds per benchmark')
+    parser.add_argument('--workers', type=int, default=1, help='also time the create functions with this pool size')
+    parser.add_argument('--only', choices=['create', 'query', 'import'], help='run only these benchmarks')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc round')
+    parser.add_argument('--json', metavar='PATH', help='save the results')
+    parser.add_argument('--compare', metavar='PATH', help='fail on regressions against saved results')
+    parser.add_argument('--threshold', type=float, default=1.25, help='the regression ratio (default %(default)s)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    backends = [name.strip() for name in args.backends.split(',') if name.strip()]
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f'unknown backends: {sorted(unknown)}')
+
+    results = []
+    for result in run(
+        args.scale,
+        backends,
+        rounds=args.rounds,
+        memory=not args.no_memory,
+        workers=args.workers,
+        create=args.only in (None, 'create'),
+        query=args.only in (None, 'query'),
+        imports=args.only in (None, 'import'),
+    ):
+        print(f'{result.name}: {result.median_seconds:.4f}s', file=sys.stderr)
+        results.append(result)
+    print(format_results(results))
+
+    if args.json:
+        save_results(
+            results,
+            args.json,
+            scale=args.scale,
+            rounds=args.rounds,
+            python=platform.python_version(),
+            created=dt.now(timezone.utc).isoformat(),
+        )
+    if args.compare:
+        found = regressions(results, load_results(args.compare), args.threshold)
+        for line in found:
+            print(f'REGRESSION {line}')
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
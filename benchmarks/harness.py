@@ -0,0 +1,89 @@
+"""
+Timing, peak memory and regression checks for the benchmarks.
+"""
+
+import gc
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+
+@dataclass
+class Result:
+    name: str
+    rounds: int
+    min_seconds: float
+    median_seconds: float
+    peak_bytes: Optional[int] = None  # by tracemalloc, in a separate round
+
+
+def measure(
+    name: str,
+    fn: Callable[[], Any],
+    rounds: int = 3,
+    setup: Optional[Callable[[], Any]] = None,
+    memory: bool = True,
+) -> Result:
+    """Time `rounds` calls of fn, each after an untimed setup, then trace the peak memory of one more call."""
+    times = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    peak = None
+    if memory:
+        if setup:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return Result(
+        name=name, rounds=rounds, min_seconds=min(times), median_seconds=statistics.median(times), peak_bytes=peak
+    )
+
+
+def format_results(results: Iterable[Result]) -> str:
+    lines = [f"{'benchmark':<64} {'rounds':>6} {'min s':>10} {'median s':>10} {'peak MiB':>10}"]
+    for result in results:
+        peak = f'{result.peak_bytes / 2**20:10.1f}' if result.peak_bytes is not None else f"{'-':>10}"
+        lines.append(
+            f'{result.name:<64} {result.rounds:>6} {result.min_seconds:>10.4f} {result.median_seconds:>10.4f} {peak}'
+        )
+    return '\n'.join(lines)
+
+
+def save_results(results: Iterable[Result], path: Union[str, os.PathLike], **meta: Any) -> None:
+    with open(path, 'w') as f:
+        json.dump(dict(meta=meta, results=[asdict(result) for result in results]), f, indent=2)
+
+
+def load_results(path: Union[str, os.PathLike]) -> Dict[str, Result]:
+    with open(path) as f:
+        return {item['name']: Result(**item) for item in json.load(f)['results']}
+
+
+def regressions(results: Iterable[Result], baseline: Dict[str, Result], threshold: float) -> List[str]:
+    """Describe the results slower, or using more memory, than the baseline by more than the threshold ratio."""
+    found = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        if result.median_seconds > base.median_seconds * threshold:
+            found.append(f'{result.name}: median {result.median_seconds:.4f}s, was {base.median_seconds:.4f}s')
+        if result.peak_bytes and base.peak_bytes and result.peak_bytes > base.peak_bytes * threshold:
+            found.append(f'{result.name}: peak {result.peak_bytes} bytes, was {base.peak_bytes} bytes')
+    return found
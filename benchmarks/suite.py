@@ -0,0 +1,233 @@
+"""
+The benchmarks: the create functions on a synthetic solution, the queries on the rupture set they create, and the
+import time of the package entry points.
+"""
+
+import logging
+import statistics
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, NamedTuple, Sequence
+
+import numpy as np
+from nzshm_common.location.location import LOCATION_LISTS
+
+from solvis_store import model
+from solvis_store.backends import Backend, set_backend
+from solvis_store.create import create_location_radius_rupture_models, create_parent_fault_rupture_models
+from solvis_store.create.create_parent_fault_rupture_models import parent_faults
+from solvis_store.query import (
+    fault_name,
+    get_fault_name_rupture_ids,
+    get_fault_name_ruptures,
+    get_location_fault_rupture_columns,
+    get_location_radius_rupture_ids,
+    get_location_radius_rupture_page,
+    get_location_radius_ruptures,
+    get_nearest_ruptures,
+    location_radius,
+    prefetch_fault_names,
+)
+from solvis_store.records import RADII
+from tests.synthetic_solution import SyntheticFaultSystemSolution
+
+from .harness import Result, measure
+
+log = logging.getLogger(__name__)
+
+RUPTURE_SET_ID = 'BENCHMARK_RUPTURE_SET'
+BACKENDS = ('moto', 'sqlite')
+QUERY_RADIUS = 100
+QUERY_FAULTS = 5
+NEAREST_K = 200
+PAGE_LIMIT = 100
+
+# the entry points timed by import_benchmarks, query is what the API Lambda imports
+IMPORTS = {
+    'solvis_store.query': 'import solvis_store.query',
+    'solvis_store.query+dynamodb': 'import solvis_store.query; solvis_store.query.location_radius.get_backend()',
+    'solvis_store.create': 'import solvis_store.create',
+}
+
+
+class Scale(NamedTuple):
+    sections: int
+    ruptures: int
+    locations: int  # for the create benchmarks
+    query_locations: int  # stored for the query benchmarks
+
+
+SCALES = {
+    'small': Scale(sections=300, ruptures=3_000, locations=10, query_locations=4),
+    'medium': Scale(sections=1_000, ruptures=50_000, locations=50, query_locations=6),
+    'full': Scale(sections=2_500, ruptures=400_000, locations=200, query_locations=8),
+}
+
+
+def location_ids(count: int) -> List[str]:
+    return LOCATION_LISTS['SRWG214']['locations'][:count]
+
+
+@contextmanager
+def backend_context(name: str) -> Iterator[Backend]:
+    """An empty backend, used by the queries until the context exits."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if name == 'sqlite':
+            from solvis_store.backends.sqlite import SQLiteBackend
+
+            backend: Any = SQLiteBackend(Path(tmpdir) / 'benchmark.sqlite')
+            try:
+                set_backend(backend)
+                yield backend
+            finally:
+                set_backend(None)
+                backend.close()
+        elif name == 'moto':
+            from moto import mock_dynamodb
+
+            from solvis_store.backends.dynamodb import DynamoDBBackend
+
+            with mock_dynamodb():
+                model.migrate()
+                backend = DynamoDBBackend()
+                try:
+                    set_backend(backend)
+                    yield backend
+                finally:
+                    set_backend(None)
+        else:
+            raise ValueError(f'unknown backend: {name}, expected one of {BACKENDS}')
+
+
+def clear_query_caches() -> None:
+    location_radius.clear_caches()
+    fault_name.clear_caches()
+
+
+def consume(models: Iterable[Any]) -> int:
+    return sum(1 for _ in models)
+
+
+def create_benchmarks(
+    fss: SyntheticFaultSystemSolution, scale: Scale, rounds: int, memory: bool, workers: int
+) -> Iterator[Result]:
+    locations = location_ids(scale.locations)
+
+    for variant in sorted({1, workers}):
+        yield measure(
+            f'create_location_radius_rupture_models[locations={len(locations)},workers={variant}]',
+            lambda variant=variant: consume(
+                create_location_radius_rupture_models(
+                    fss, RUPTURE_SET_ID, locations, RADII, dtype=np.float32, workers=variant, compact=True
+                )
+            ),
+            rounds,
+            memory=memory,
+        )
+    yield measure(
+        'create_parent_fault_rupture_models',
+        lambda: consume(create_parent_fault_rupture_models(fss, RUPTURE_SET_ID, compact=True)),
+        rounds,
+        memory=memory,
+    )
+
+
+def load(backend: Backend, fss: SyntheticFaultSystemSolution, locations: Sequence[str]) -> None:
+    """Store the rupture set for the query benchmarks."""
+    models = create_location_radius_rupture_models(fss, RUPTURE_SET_ID, list(locations), RADII, compact=True)
+    count = backend.put_models(models, writers=4)
+    count += backend.put_models(create_parent_fault_rupture_models(fss, RUPTURE_SET_ID, compact=True), writers=4)
+    log.info(f'loaded {count} records')
+
+
+def query_benchmarks(
+    backend_name: str, fss: SyntheticFaultSystemSolution, scale: Scale, rounds: int, memory: bool
+) -> Iterator[Result]:
+    locations = tuple(location_ids(scale.query_locations))
+    faults = tuple(name for _, name in parent_faults(fss)[:QUERY_FAULTS])
+
+    with backend_context(backend_name) as backend:
+        load(backend, fss, locations)
+
+        queries = {}
+        for union in (True, False):
+            kind = 'union' if union else 'intersection'
+            queries[f'get_location_radius_rupture_ids[{kind}]'] = lambda union=union: get_location_radius_rupture_ids(
+                RUPTURE_SET_ID, locations, QUERY_RADIUS, union
+            )
+            queries[f'get_location_radius_ruptures[{kind}]'] = lambda union=union: list(
+                get_location_radius_ruptures(RUPTURE_SET_ID, locations, QUERY_RADIUS, union)
+            )
+            queries[f'get_fault_name_rupture_ids[{kind}]'] = lambda union=union: get_fault_name_rupture_ids(
+                RUPTURE_SET_ID, faults, union
+            )
+            queries[f'get_fault_name_ruptures[{kind}]'] = lambda union=union: list(
+                get_fault_name_ruptures(RUPTURE_SET_ID, faults, union)
+            )
+        queries['get_location_fault_rupture_columns[union]'] = lambda: get_location_fault_rupture_columns(
+            RUPTURE_SET_ID, locations, QUERY_RADIUS, faults, location_union=True, fault_union=True
+        )
+        queries[f'get_location_radius_rupture_page[union,limit={PAGE_LIMIT}]'] = lambda: (
+            get_location_radius_rupture_page(RUPTURE_SET_ID, locations, QUERY_RADIUS, union=True, limit=PAGE_LIMIT)
+        )
+        queries[f'get_nearest_ruptures[k={NEAREST_K}]'] = lambda: list(
+            get_nearest_ruptures(RUPTURE_SET_ID, locations, NEAREST_K)
+        )
+
+        for name, query in queries.items():
+            # cold, so each round fetches the records from the backend
+            yield measure(f'{name}[{backend_name}]', query, rounds, setup=clear_query_caches, memory=memory)
+
+        def prefetched() -> None:
+            clear_query_caches()
+            prefetch_fault_names(RUPTURE_SET_ID)
+
+        yield measure(
+            f'get_fault_name_ruptures[union,prefetched][{backend_name}]',
+            queries['get_fault_name_ruptures[union]'],
+            rounds,
+            setup=prefetched,
+            memory=memory,
+        )
+        clear_query_caches()
+
+
+def import_time(statement: str) -> float:
+    """The seconds to run the import statement in a new interpreter, i.e. cold."""
+    code = f'import time; t0 = time.perf_counter(); {statement}; print(time.perf_counter() - t0)'
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    return float(output.split()[-1])
+
+
+def import_benchmarks(rounds: int) -> Iterator[Result]:
+    for name, statement in IMPORTS.items():
+        times = [import_time(statement) for _ in range(rounds)]
+        yield Result(
+            name=f'import[{name}]', rounds=rounds, min_seconds=min(times), median_seconds=statistics.median(times)
+        )
+
+
+def run(
+    scale_name: str = 'full',
+    backends: Sequence[str] = BACKENDS,
+    rounds: int = 3,
+    memory: bool = True,
+    workers: int = 1,
+    create: bool = True,
+    query: bool = True,
+    imports: bool = True,
+) -> Iterator[Result]:
+    if imports:
+        yield from import_benchmarks(rounds)
+    if not (create or query):
+        return
+    scale = SCALES[scale_name]
+    fss = SyntheticFaultSystemSolution(n_sections=scale.sections, n_ruptures=scale.ruptures)
+    if create:
+        yield from create_benchmarks(fss, scale, rounds, memory, workers)
+    if query:
+        for backend_name in backends:
+            yield from query_benchmarks(backend_name, fss, scale, rounds, memory)
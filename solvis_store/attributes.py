@@ -0,0 +1,166 @@
+"""
+Compact binary encodings for rupture id and distance arrays, and the pynamodb attributes that store them.
+
+Each encoded value has a two byte header, `(encoding, compression)`, followed by the payload.
+
+Rupture ids are either zigzag-delta varints, which work for any order but are smallest when sorted, or a
+bitmap over `0..max(ids)` for sorted unique ids when that is smaller. Distances are packed little-endian
+float16, float32 or float64. Payloads may be compressed with zlib or, if the `zstandard` package is installed, zstd.
+"""
+
+import struct
+import zlib
+from typing import Any, Dict, Sequence, Union
+
+import numpy as np
+import numpy.typing as npt
+from pynamodb.attributes import Attribute
+from pynamodb.constants import BINARY
+
+from .config import COMPACT_COMPRESSION, COMPACT_DISTANCE_DTYPE
+
+HEADER = struct.Struct('<BB')
+
+# rupture id encodings
+VARINT_DELTA = 1
+BITMAP = 2
+
+# distance encodings
+DISTANCE_DTYPES: Dict[int, np.dtype] = {1: np.dtype('<f2'), 2: np.dtype('<f4'), 3: np.dtype('<f8')}
+DISTANCE_ENCODINGS = {dtype.name: code for code, dtype in DISTANCE_DTYPES.items()}
+
+COMPRESSIONS = {'none': 0, 'zlib': 1, 'zstd': 2}
+
+ArrayLike = Union[np.ndarray, Sequence[int], Sequence[float]]
+
+
+def _compress(payload: bytes, compression: str) -> bytes:
+    if compression not in COMPRESSIONS:
+        raise ValueError(f'unknown compression: {compression}, expected one of {list(COMPRESSIONS)}')
+    if compression == 'none':
+        return payload
+    if compression == 'zstd':
+        import zstandard
+
+        return zstandard.ZstdCompressor().compress(payload)
+    return zlib.compress(payload)
+
+
+def _decompress(payload: bytes, compression_code: int) -> bytes:
+    if compression_code == COMPRESSIONS['none']:
+        return payload
+    if compression_code == COMPRESSIONS['zlib']:
+        return zlib.decompress(payload)
+    if compression_code == COMPRESSIONS['zstd']:
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f'unknown compression code: {compression_code}')
+
+
+def _encode_varints(values: np.ndarray) -> bytes:
+    """LEB128 encode unsigned 64 bit values, vectorised over the 7 bit groups."""
+    nbytes = np.ones(len(values), dtype=np.int64)
+    for group in range(1, 10):
+        nbytes += values >= np.uint64(1 << (7 * group))
+    offsets = np.cumsum(nbytes) - nbytes
+    out = np.empty(int(nbytes.sum()), dtype=np.uint8)
+    for group in range(int(nbytes.max(initial=0))):
+        mask = nbytes > group
+        low_bits = (values[mask] >> np.uint64(7 * group)) & np.uint64(0x7F)
+        more = np.where(nbytes[mask] > group + 1, 0x80, 0).astype(np.uint64)
+        out[offsets[mask] + group] = (low_bits | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def _decode_varints(payload: bytes) -> np.ndarray:
+    data = np.frombuffer(payload, dtype=np.uint8)
+    if not len(data):
+        return np.empty(0, dtype=np.uint64)
+    ends = (data & 0x80) == 0
+    starts = np.flatnonzero(np.concatenate(([True], ends[:-1])))
+    group = np.arange(len(data)) - np.repeat(starts, np.diff(np.append(starts, len(data))))
+    parts = (data & 0x7F).astype(np.uint64) << (np.uint64(7) * group.astype(np.uint64))
+    return np.add.reduceat(parts, starts)
+
+
+def encode_rupture_ids(ids: ArrayLike, compression: str = 'none') -> bytes:
+    """Encode rupture ids, keeping their order."""
+    ids = np.asarray(ids, dtype=np.int64)
+    deltas = np.diff(ids, prepend=0)
+    varints = _encode_varints(((deltas << 1) ^ (deltas >> 63)).astype(np.uint64))
+
+    encoding, payload = VARINT_DELTA, varints
+    if len(ids) and np.all(deltas[1:] > 0) and ids[0] >= 0 and (int(ids[-1]) + 8) // 8 < len(varints):
+        bits = np.zeros(int(ids[-1]) + 1, dtype=bool)
+        bits[ids] = True
+        encoding, payload = BITMAP, np.packbits(bits, bitorder='little').tobytes()
+
+    payload = _compress(payload, compression)
+    return HEADER.pack(encoding, COMPRESSIONS[compression]) + payload
+
+
+def decode_rupture_ids(value: bytes) -> np.ndarray:
+    """Decode rupture ids to an int32 array."""
+    encoding, compression_code = HEADER.unpack_from(value)
+    payload = _decompress(bytes(value[HEADER.size :]), compression_code)
+    if encoding == BITMAP:
+        bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8), bitorder='little')
+        return np.flatnonzero(bits).astype(np.int32)
+    if encoding == VARINT_DELTA:
+        zigzag = _decode_varints(payload)
+        deltas = (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+        return np.cumsum(deltas).astype(np.int32)
+    raise ValueError(f'unknown rupture id encoding: {encoding}')
+
+
+def encode_distances(distances: ArrayLike, dtype: npt.DTypeLike = 'float32', compression: str = 'none') -> bytes:
+    """Encode distances as packed float16, float32 or float64."""
+    dtype = np.dtype(dtype).newbyteorder('<')
+    if dtype.name not in DISTANCE_ENCODINGS:
+        raise ValueError(f'unsupported distance dtype: {dtype}, expected one of {list(DISTANCE_ENCODINGS)}')
+    payload = _compress(np.asarray(distances, dtype=dtype).tobytes(), compression)
+    return HEADER.pack(DISTANCE_ENCODINGS[dtype.name], COMPRESSIONS[compression]) + payload
+
+
+def decode_distances(value: bytes) -> np.ndarray:
+    """Decode distances to a (read only) float array."""
+    encoding, compression_code = HEADER.unpack_from(value)
+    if encoding not in DISTANCE_DTYPES:
+        raise ValueError(f'unknown distance encoding: {encoding}')
+    return np.frombuffer(_decompress(bytes(value[HEADER.size :]), compression_code), dtype=DISTANCE_DTYPES[encoding])
+
+
+class RuptureIdsAttribute(Attribute[np.ndarray]):
+    """Rupture ids as a compact binary value, deserialized to a NumPy int32 array."""
+
+    attr_type = BINARY
+
+    def __init__(self, *args: Any, compression: str = COMPACT_COMPRESSION, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.compression = compression
+
+    def serialize(self, value):
+        return encode_rupture_ids(value, self.compression)
+
+    def deserialize(self, value):
+        return decode_rupture_ids(value)
+
+
+class DistancesAttribute(Attribute[np.ndarray]):
+    """Distances as a compact binary value, deserialized to a NumPy float array."""
+
+    attr_type = BINARY
+
+    def __init__(
+        self, *args: Any, dtype: str = COMPACT_DISTANCE_DTYPE, compression: str = COMPACT_COMPRESSION, **kwargs: Any
+    ):
+        super().__init__(*args, **kwargs)
+        self.dtype = dtype
+        self.compression = compression
+
+    def serialize(self, value):
+        return encode_distances(value, self.dtype, self.compression)
+
+    def deserialize(self, value):
+        return decode_distances(value)
@@ -0,0 +1,86 @@
+"""
+Storage backends for the decoded rupture set records (see `solvis_store.records`).
+
+`DynamoDBBackend` stores them with the pynamodb models, `SQLiteBackend` in an embedded SQLite file for local
+runs and tests. `get_backend()` returns the backend selected by `SOLVIS_STORE_BACKEND` (`dynamodb` or `sqlite`,
+with `SOLVIS_STORE_SQLITE_PATH`), unless another was set with `set_backend()`.
+"""
+
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional, Protocol, Tuple
+
+from solvis_store.config import BACKEND, SQLITE_PATH
+from solvis_store.records import Record, RuptureIdsRecord
+
+if TYPE_CHECKING:
+    from pynamodb.models import Model
+
+
+class Backend(Protocol):
+    """
+    The storage operations used by the create and query functions.
+
+    `table` is `location_radius` or `fault_name` (see `solvis_store.records.TABLES`), keys are its range keys.
+    """
+
+    def get(self, table: str, rupture_set_id: str, key: str) -> Optional[Record]:
+        """Get one record, or None if there is no such item."""
+
+    def batch_get(self, table: str, rupture_set_id: str, keys: Iterable[str]) -> Dict[str, Record]:
+        """Get the records for the keys, omitting keys with no item."""
+
+    def batch_get_ids(self, table: str, rupture_set_id: str, keys: Iterable[str]) -> Dict[str, RuptureIdsRecord]:
+        """As `batch_get`, reading just the rupture ids of the items, e.g. without their distances."""
+
+    def batch_put(self, items: Iterable[Tuple[str, Record]]) -> int:
+        """Store `(rupture_set_id, record)` pairs, replacing any existing item, returning the count stored."""
+
+    def put_models(self, models: Iterable['Model'], writers: int) -> int:
+        """Store models, as yielded by the `solvis_store.create` functions, returning the count of records."""
+
+    def scan(self, table: str, rupture_set_id: str) -> Iterator[Record]:
+        """All the records of the rupture set, in key order."""
+
+    def content_hashes(self, table: str, rupture_set_id: str) -> Dict[str, Optional[str]]:
+        """The stored `content_hash` of every item of the rupture set by key, None for items stored without one."""
+
+    def get_stamp(self, rupture_set_id: str) -> Optional[str]:
+        """
+        The rupture set's populate stamp, or None if it was never stamped.
+
+        Raises `LookupError` if the backend has nowhere to keep stamps, e.g. the DynamoDB table was not created.
+        """
+
+    def put_stamp(self, rupture_set_id: str, stamp: str) -> None:
+        """Set the populate stamp, after storing items of the rupture set, see `solvis_store.query.disk_cache`."""
+
+
+_backend: Optional[Backend] = None
+_lock = threading.Lock()
+
+
+def create_backend(name: str = BACKEND) -> Backend:
+    if name == 'dynamodb':
+        from .dynamodb import DynamoDBBackend
+
+        return DynamoDBBackend()
+    if name == 'sqlite':
+        from .sqlite import SQLiteBackend
+
+        return SQLiteBackend(SQLITE_PATH)
+    raise ValueError(f'unknown backend: {name}, expected dynamodb or sqlite')
+
+
+def get_backend() -> Backend:
+    global _backend
+    with _lock:
+        if _backend is None:
+            _backend = create_backend()
+        return _backend
+
+
+def set_backend(backend: Optional[Backend]) -> None:
+    """Use the backend for all stores and queries, or reset to the configured backend if None."""
+    global _backend
+    with _lock:
+        _backend = backend
@@ -0,0 +1,198 @@
+"""
+The DynamoDB backend, storing records with the `solvis_store.model` pynamodb models.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+import numpy as np
+from pynamodb.exceptions import GetError
+from pynamodb.models import Model
+
+from solvis_store import model
+from solvis_store.batch_get import batch_get_shards
+from solvis_store.bulk_load import DEFAULT_WRITERS, bulk_load
+from solvis_store.records import (
+    LocationRadiusRecord,
+    Record,
+    RuptureIdsRecord,
+    content_hash,
+    fault_name_record,
+    is_nearest_key,
+    location_radius_record,
+    rupture_ids_record,
+)
+from solvis_store.sharding import base_key, group_shards, shard_keys_condition, shard_model, stale_shard_keys
+
+log = logging.getLogger(__name__)
+
+MODELS: Dict[str, Type[model.MetricatedModel]] = {
+    'location_radius': model.RuptureSetLocationDistances,
+    'fault_name': model.RuptureSetParentFaultRuptures,
+}
+
+RECORD_FUNCTIONS = {'location_radius': location_radius_record, 'fault_name': fault_name_record}
+
+# the attributes read by `batch_get_ids`, either layout, the shard attributes are added by `batch_get_shards`
+RUPTURE_ID_ATTRIBUTES = ['ruptures', 'packed_ruptures']
+
+
+def model_from_record(rupture_set_id: str, record: Record, compact: bool = False) -> Model:
+    """The unsharded model for a record, with compact or legacy rupture attributes, and its content hash."""
+    ruptures = record.ruptures
+    arrays: Dict[str, Any]
+    if isinstance(record, LocationRadiusRecord):
+        location, _, radius = record.location_radius.rpartition(':')
+        if is_nearest_key(record.location_radius):
+            location = record.location_radius
+        if compact:
+            arrays = dict(packed_ruptures=ruptures, packed_distances=record.distances)
+        else:
+            # number sets are unordered, so distances are stored in Rupture Index order
+            order = np.argsort(ruptures, kind='stable')
+            arrays = dict(ruptures=ruptures[order].tolist(), distances=record.distances[order].tolist())
+        return model.RuptureSetLocationDistances(
+            rupture_set_id=rupture_set_id,
+            location_radius=record.location_radius,
+            radius=record.radius if record.radius is not None else int(radius),
+            location=location,
+            rupture_count=len(ruptures),
+            content_hash=content_hash(record),
+            **arrays,
+        )
+    arrays = dict(packed_ruptures=ruptures) if compact else dict(ruptures=ruptures.tolist())
+    return model.RuptureSetParentFaultRuptures(
+        rupture_set_id=rupture_set_id,
+        fault_name=record.fault_name,
+        fault_id=record.fault_id,
+        rupture_count=len(ruptures),
+        content_hash=content_hash(record),
+        **arrays,
+    )
+
+
+# the shard count written for each (model class, hash key, range key)
+ShardCounts = Dict[Tuple[Type[Model], str, str], int]
+
+
+def track_shard_counts(models: Iterable[Model], written: ShardCounts) -> Iterator[Model]:
+    """Yield the models, noting the shard count of each key in `written`."""
+    for mod in models:
+        if not getattr(mod, 'shard', None):
+            model_class = type(mod)
+            hash_key = getattr(mod, model_class._hash_key_attribute().attr_name)
+            key = getattr(mod, model_class._range_key_attribute().attr_name)
+            written[(model_class, hash_key, key)] = int(getattr(mod, 'shard_count', None) or 1)
+        yield mod
+
+
+def delete_stale_shards(written: ShardCounts, workers: int = DEFAULT_WRITERS) -> int:
+    """
+    Delete the shards left over from items since written with fewer shards, or unsharded.
+
+    The shard keys of each written key are read with a keys only range key query, in `workers` threads.
+
+    Returns:
+        the number of shards deleted.
+    """
+
+    def stale(entry: Tuple[Type[Model], str, str]) -> List[str]:
+        model_class, hash_key, key = entry
+        range_key = model_class._range_key_attribute()
+        condition = shard_keys_condition(range_key, key)
+        items = model_class.query(hash_key, condition, attributes_to_get=[range_key.attr_name])
+        return stale_shard_keys(key, written[entry], [getattr(item, range_key.attr_name) for item in items])
+
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='delete_stale_shards') as executor:
+        for (model_class, hash_key, key), range_keys in zip(written, executor.map(stale, written)):
+            if range_keys:
+                log.info(f'delete_stale_shards: {model_class.__name__} {hash_key} {range_keys}')
+                with model_class.batch_write() as batch:
+                    for range_key in range_keys:
+                        batch.delete(model_class(hash_key, range_key))
+                count += len(range_keys)
+    return count
+
+
+class DynamoDBBackend:
+    """Records in the DynamoDB tables, sharded if need be, see `solvis_store.sharding`."""
+
+    def __init__(self, compact: bool = False, writers: int = DEFAULT_WRITERS) -> None:
+        self.compact = compact
+        self.writers = writers
+
+    def _record(self, table: str, key: str, shards: Optional[List[Any]]) -> Optional[Record]:
+        return RECORD_FUNCTIONS[table](key, shards)  # type: ignore[operator]
+
+    def get(self, table: str, rupture_set_id: str, key: str) -> Optional[Record]:
+        return self._record(table, key, batch_get_shards(MODELS[table], rupture_set_id, [key]).get(key))
+
+    def batch_get(self, table: str, rupture_set_id: str, keys: Iterable[str]) -> Dict[str, Record]:
+        found = batch_get_shards(MODELS[table], rupture_set_id, list(keys))
+        records = {key: self._record(table, key, shards) for key, shards in found.items()}
+        return {key: record for key, record in records.items() if record is not None}
+
+    def batch_get_ids(self, table: str, rupture_set_id: str, keys: Iterable[str]) -> Dict[str, RuptureIdsRecord]:
+        # a projection reads fewer bytes, but DynamoDB charges read units for the whole item
+        found = batch_get_shards(MODELS[table], rupture_set_id, list(keys), attributes_to_get=RUPTURE_ID_ATTRIBUTES)
+        records = {key: rupture_ids_record(key, shards) for key, shards in found.items()}
+        return {key: record for key, record in records.items() if record is not None}
+
+    def batch_put(self, items: Iterable[Tuple[str, Record]]) -> int:
+        count = 0
+
+        def models() -> Iterator[Model]:
+            nonlocal count
+            for rupture_set_id, record in items:
+                count += 1
+                yield from shard_model(model_from_record(rupture_set_id, record, self.compact))
+
+        written: ShardCounts = {}
+        bulk_load(track_shard_counts(models(), written), writers=self.writers)
+        delete_stale_shards(written, self.writers)
+        return count
+
+    def put_models(self, models: Iterable[Model], writers: int = DEFAULT_WRITERS) -> int:
+        written: ShardCounts = {}
+        count = bulk_load(track_shard_counts(models, written), writers=writers).items
+        delete_stale_shards(written, writers)
+        return count
+
+    def scan(self, table: str, rupture_set_id: str) -> Iterator[Record]:
+        model_class = MODELS[table]
+        range_key_name = model_class._range_key_attribute().attr_name
+        items = list(model_class.query(rupture_set_id))
+        keys = sorted({base_key(getattr(item, range_key_name)) for item in items})
+        for key, shards in sorted(group_shards(items, keys, range_key_name).items()):
+            record = self._record(table, key, shards)
+            if record is not None:
+                yield record
+
+    def content_hashes(self, table: str, rupture_set_id: str) -> Dict[str, Optional[str]]:
+        model_class = MODELS[table]
+        range_key_name = model_class._range_key_attribute().attr_name
+        attributes = [range_key_name, 'content_hash', 'shard', 'shard_count']
+        items = list(model_class.query(rupture_set_id, attributes_to_get=attributes))
+        keys = sorted({base_key(getattr(item, range_key_name)) for item in items})
+        complete = group_shards(items, keys, range_key_name)
+        hashes: Dict[str, Optional[str]] = {}
+        for key in keys:
+            # a key with a missing shard, or shards of different writes, has no hash so it is rewritten
+            shard_hashes = {shard.content_hash for shard in complete.get(key, [])}
+            hashes[key] = shard_hashes.pop() if len(shard_hashes) == 1 else None
+        return hashes
+
+    def get_stamp(self, rupture_set_id: str) -> Optional[str]:
+        try:
+            return model.RuptureSetPopulateStamp.get(rupture_set_id).stamp
+        except model.RuptureSetPopulateStamp.DoesNotExist:
+            return None
+        except GetError as err:
+            if err.cause_response_code != 'ResourceNotFoundException':
+                raise
+            raise LookupError(f'no populate stamp table {model.RuptureSetPopulateStamp.Meta.table_name}') from err
+
+    def put_stamp(self, rupture_set_id: str, stamp: str) -> None:
+        model.RuptureSetPopulateStamp(rupture_set_id=rupture_set_id, stamp=stamp).save()
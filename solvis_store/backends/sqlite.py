@@ -0,0 +1,206 @@
+"""
+An embedded SQLite backend, for local runs, benchmarks and tests without DynamoDB.
+
+Rupture ids and distances are stored with the compact encodings of `solvis_store.attributes`, distances as
+float64 so records read back exactly as stored. Records are never sharded.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from solvis_store.attributes import decode_distances, decode_rupture_ids, encode_distances, encode_rupture_ids
+from solvis_store.config import COMPACT_COMPRESSION
+from solvis_store.records import (
+    FaultNameRecord,
+    LocationRadiusRecord,
+    Record,
+    RuptureIdsRecord,
+    content_hash,
+    records_from_models,
+)
+
+if TYPE_CHECKING:
+    from pynamodb.models import Model
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    table_name TEXT NOT NULL,
+    rupture_set_id TEXT NOT NULL,
+    range_key TEXT NOT NULL,
+    fault_id INTEGER,
+    ruptures BLOB NOT NULL,
+    distances BLOB,
+    radius REAL,
+    content_hash TEXT,
+    PRIMARY KEY (table_name, rupture_set_id, range_key)
+) WITHOUT ROWID
+"""
+
+STAMP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stamps (
+    rupture_set_id TEXT PRIMARY KEY,
+    stamp TEXT NOT NULL
+)
+"""
+
+COLUMNS = ('table_name', 'rupture_set_id', 'range_key', 'fault_id', 'ruptures', 'distances', 'radius', 'content_hash')
+
+INSERT = f'INSERT OR REPLACE INTO records ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})'
+
+BATCH_LIMIT = 500  # keys per SELECT and rows per transaction, below the SQLite bound parameter limit
+
+
+class SQLiteBackend:
+    """Records in one SQLite database file, which may be shared by many processes."""
+
+    def __init__(self, path: Union[str, os.PathLike], compression: str = COMPACT_COMPRESSION) -> None:
+        self.path = path
+        self.compression = compression
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            if str(path) != ':memory:':
+                self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(SCHEMA)
+            self._connection.execute(STAMP_SCHEMA)
+            columns = {row[1] for row in self._connection.execute('PRAGMA table_info(records)')}
+            for column in ('radius REAL', 'content_hash TEXT'):
+                if column.split()[0] not in columns:  # a database created by an earlier version
+                    self._connection.execute(f'ALTER TABLE records ADD COLUMN {column}')
+
+    def _record(
+        self,
+        table: str,
+        range_key: str,
+        fault_id: Optional[int],
+        ruptures: bytes,
+        distances: bytes,
+        radius: Optional[float],
+    ) -> Record:
+        if table == 'location_radius':
+            return LocationRadiusRecord(range_key, decode_rupture_ids(ruptures), decode_distances(distances), radius)
+        return FaultNameRecord(range_key, int(fault_id or 0), decode_rupture_ids(ruptures))
+
+    def _row(self, rupture_set_id: str, record: Record) -> Tuple:
+        ruptures = encode_rupture_ids(record.ruptures, compression=self.compression)
+        if isinstance(record, LocationRadiusRecord):
+            distances = encode_distances(record.distances, dtype='float64', compression=self.compression)
+            return (
+                'location_radius',
+                rupture_set_id,
+                record.location_radius,
+                None,
+                ruptures,
+                distances,
+                record.radius,
+                content_hash(record),
+            )
+        return (
+            'fault_name',
+            rupture_set_id,
+            record.fault_name,
+            record.fault_id,
+            ruptures,
+            None,
+            None,
+            content_hash(record),
+        )
+
+    def get(self, table: str, rupture_set_id: str, key: str) -> Optional[Record]:
+        return self.batch_get(table, rupture_set_id, [key]).get(key)
+
+    def batch_get(self, table: str, rupture_set_id: str, keys: Iterable[str]) -> Dict[str, Record]:
+        keys = list(dict.fromkeys(keys))
+        records = {}
+        for start in range(0, len(keys), BATCH_LIMIT):
+            page = keys[start : start + BATCH_LIMIT]
+            with self._lock:
+                rows = self._connection.execute(
+                    'SELECT range_key, fault_id, ruptures, distances, radius FROM records '
+                    f'WHERE table_name = ? AND rupture_set_id = ? AND range_key IN ({",".join("?" * len(page))})',
+                    [table, rupture_set_id, *page],
+                ).fetchall()
+            for row in rows:
+                records[row[0]] = self._record(table, *row)
+        return records
+
+    def batch_get_ids(self, table: str, rupture_set_id: str, keys: Iterable[str]) -> Dict[str, RuptureIdsRecord]:
+        keys = list(dict.fromkeys(keys))
+        records = {}
+        for start in range(0, len(keys), BATCH_LIMIT):
+            page = keys[start : start + BATCH_LIMIT]
+            with self._lock:
+                rows = self._connection.execute(
+                    'SELECT range_key, ruptures FROM records '
+                    f'WHERE table_name = ? AND rupture_set_id = ? AND range_key IN ({",".join("?" * len(page))})',
+                    [table, rupture_set_id, *page],
+                ).fetchall()
+            for key, ruptures in rows:
+                records[key] = RuptureIdsRecord(key, decode_rupture_ids(ruptures))
+        return records
+
+    def batch_put(self, items: Iterable[Tuple[str, Record]]) -> int:
+        count = 0
+        rows: List[Tuple] = []
+
+        def flush() -> None:
+            with self._lock:
+                self._connection.execute('BEGIN')
+                try:
+                    self._connection.executemany(INSERT, rows)
+                except BaseException:
+                    self._connection.execute('ROLLBACK')
+                    raise
+                self._connection.execute('COMMIT')
+            rows.clear()
+
+        for rupture_set_id, record in items:
+            rows.append(self._row(rupture_set_id, record))
+            count += 1
+            if len(rows) >= BATCH_LIMIT:
+                flush()
+        if rows:
+            flush()
+        log.debug(f'SQLiteBackend.batch_put: {count} records to {self.path}')
+        return count
+
+    def put_models(self, models: Iterable['Model'], writers: int = 1) -> int:
+        return self.batch_put(records_from_models(models))
+
+    def scan(self, table: str, rupture_set_id: str) -> Iterator[Record]:
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT range_key, fault_id, ruptures, distances, radius FROM records '
+                'WHERE table_name = ? AND rupture_set_id = ? ORDER BY range_key',
+                [table, rupture_set_id],
+            ).fetchall()
+        for row in rows:
+            yield self._record(table, *row)
+
+    def content_hashes(self, table: str, rupture_set_id: str) -> Dict[str, Optional[str]]:
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT range_key, content_hash FROM records WHERE table_name = ? AND rupture_set_id = ?',
+                [table, rupture_set_id],
+            ).fetchall()
+        return dict(rows)
+
+    def get_stamp(self, rupture_set_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT stamp FROM stamps WHERE rupture_set_id = ?', [rupture_set_id]
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_stamp(self, rupture_set_id: str, stamp: str) -> None:
+        with self._lock:
+            self._connection.execute('INSERT OR REPLACE INTO stamps VALUES (?, ?)', [rupture_set_id, stamp])
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
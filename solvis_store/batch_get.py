@@ -0,0 +1,98 @@
+"""
+BatchGetItem fetches of pynamodb models, including any shards (see `solvis_store.sharding`).
+"""
+
+import logging
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type, TypeVar
+
+from pynamodb.constants import BATCH_GET_PAGE_LIMIT, KEYS, RESPONSES, TOTAL, UNPROCESSED_KEYS
+from pynamodb.exceptions import GetError
+from pynamodb.models import Model
+
+from .bulk_load import DEFAULT_MAX_RETRIES, backoff_delay
+from .instrumentation import ReadStats, consumed_capacity, record_read
+from .sharding import group_shards, raw_item_size, shard_key
+
+log = logging.getLogger(__name__)
+
+_M = TypeVar('_M', bound=Model)
+
+
+def batch_get(
+    model_class: Type[_M],
+    keys: Iterable[Tuple[str, str]],
+    attributes_to_get: Optional[Sequence[str]] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+) -> Iterator[_M]:
+    """
+    Get the items for the (hash_key, range_key) keys, in pages of up to 100 keys.
+
+    Unprocessed keys are requested again with backoff. Keys with no item are silently skipped.
+    The reads are recorded as `<model>.batch_get`, see `solvis_store.instrumentation`.
+    """
+    table_name = model_class.Meta.table_name
+    connection = model_class._get_connection()
+    hash_key_name = model_class._hash_key_attribute().attr_name
+    range_key_name = model_class._range_key_attribute().attr_name
+
+    serialized: List[Any] = []  # key dicts, the pynamodb annotation says Sequence[str]
+    for hash_key, range_key in dict.fromkeys(keys):
+        hash_key_ser, range_key_ser = model_class._serialize_keys(hash_key, range_key)
+        serialized.append({hash_key_name: hash_key_ser, range_key_name: range_key_ser})
+
+    stats = ReadStats(reads=1)
+    try:
+        for start in range(0, len(serialized), BATCH_GET_PAGE_LIMIT):
+            page = serialized[start : start + BATCH_GET_PAGE_LIMIT]
+            attempt = 0
+            while page:
+                t0 = time.perf_counter()
+                data = connection.batch_get_item(
+                    page, attributes_to_get=attributes_to_get, return_consumed_capacity=TOTAL
+                )
+                raw_items = data.get(RESPONSES, {}).get(table_name, [])
+                items = [model_class.from_raw_data(raw_item) for raw_item in raw_items]
+                stats.seconds += time.perf_counter() - t0
+                stats.pages += 1
+                stats.items += len(raw_items)
+                stats.bytes += sum(raw_item_size(raw_item) for raw_item in raw_items)
+                stats.capacity_units += consumed_capacity(data)
+                yield from items
+                page = data.get(UNPROCESSED_KEYS, {}).get(table_name, {}).get(KEYS, [])
+                if page:
+                    attempt += 1
+                    if attempt > max_retries:
+                        raise GetError(f"Failed to batch get {len(page)} keys from {table_name}: max_retries exceeded")
+                    log.debug("Requesting %d unprocessed keys from %s (retry %d)", len(page), table_name, attempt)
+                    time.sleep(backoff_delay(attempt))
+    finally:
+        record_read(f'{model_class.__name__}.batch_get', stats, __name__)
+
+
+def batch_get_shards(
+    model_class: Type[_M],
+    hash_key: str,
+    range_keys: Sequence[str],
+    attributes_to_get: Optional[Sequence[str]] = None,
+) -> Dict[str, List[_M]]:
+    """
+    Get the items for the range keys under one hash key, with all their shards.
+
+    Returns:
+        the items for each range key found, in shard order.
+    """
+    range_key_name = model_class._range_key_attribute().attr_name
+    if attributes_to_get is not None:
+        attributes_to_get = list(dict.fromkeys([*attributes_to_get, range_key_name, 'shard', 'shard_count']))
+
+    items = list(batch_get(model_class, [(hash_key, key) for key in range_keys], attributes_to_get))
+    # the first shard has the plain range key, and knows how many more there are
+    more_shards = [
+        (hash_key, shard_key(getattr(item, range_key_name), shard))
+        for item in items
+        for shard in range(1, int(getattr(item, 'shard_count', None) or 1))
+    ]
+    if more_shards:
+        items.extend(batch_get(model_class, more_shards, attributes_to_get))
+    return group_shards(items, range_keys, range_key_name)
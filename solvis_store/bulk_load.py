@@ -0,0 +1,144 @@
+"""
+Bulk loading of pynamodb models using BatchWriteItem from a bounded pool of writer threads.
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Set, Type
+
+from pynamodb.connection.base import RATE_LIMITING_ERROR_CODES
+from pynamodb.constants import BATCH_WRITE_PAGE_LIMIT, ITEM, PUT_REQUEST, UNPROCESSED_ITEMS
+from pynamodb.exceptions import PutError
+from pynamodb.models import Model
+
+log = logging.getLogger(__name__)
+
+DEFAULT_WRITERS = 4
+DEFAULT_MAX_RETRIES = 8
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_MAX_SECONDS = 5.0
+
+
+@dataclass
+class BulkLoadStats:
+    """Counters reported by `bulk_load`."""
+
+    items: int = 0
+    batches: int = 0
+    retries: int = 0
+    throttled: int = 0
+    elapsed: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def items_per_sec(self) -> float:
+        return self.items / self.elapsed if self.elapsed else 0.0
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.items} items in {self.batches} batches, {self.elapsed:2.3f} seconds "
+            f"({self.items_per_sec:2.1f} items/sec), retries: {self.retries}, throttled: {self.throttled}"
+        )
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt))
+
+
+def write_batch(
+    model_class: Type[Model], items: List[Model], stats: BulkLoadStats, max_retries: int = DEFAULT_MAX_RETRIES
+) -> None:
+    """Write up to `BATCH_WRITE_PAGE_LIMIT` items, resending unprocessed items with backoff."""
+    table_name = model_class.Meta.table_name
+    connection = model_class._get_connection()
+    put_items = [item.serialize() for item in items]
+    attempt = 0
+    while True:
+        try:
+            data = connection.batch_write_item(put_items=put_items)
+            unprocessed = (data or {}).get(UNPROCESSED_ITEMS, {}).get(table_name)
+        except PutError as err:
+            if err.cause_response_code not in RATE_LIMITING_ERROR_CODES:
+                raise
+            unprocessed = None
+            stats.add(throttled=1)
+        else:
+            if not unprocessed:
+                break
+            # DynamoDB returns unprocessed items when the table throttles part of a batch
+            stats.add(throttled=1)
+            put_items = [unprocessed_item[PUT_REQUEST][ITEM] for unprocessed_item in unprocessed]
+
+        attempt += 1
+        if attempt > max_retries:
+            raise PutError(f"Failed to batch write {len(put_items)} items to {table_name}: max_retries exceeded")
+        stats.add(retries=1)
+        log.debug("Resending %d items to %s (retry %d)", len(put_items), table_name, attempt)
+        time.sleep(backoff_delay(attempt))
+
+    stats.add(items=len(items), batches=1)
+
+
+def bulk_load(
+    models: Iterable[Model],
+    writers: int = DEFAULT_WRITERS,
+    batch_size: int = BATCH_WRITE_PAGE_LIMIT,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+) -> BulkLoadStats:
+    """
+    Save models in BatchWriteItem chunks from a pool of `writers` threads.
+
+    Models may be of mixed classes, they are grouped into batches per table. At most `2 * writers` batches
+    are held in memory at once, so `models` can be a lazy generator of any length.
+    """
+    if not 0 < batch_size <= BATCH_WRITE_PAGE_LIMIT:
+        raise ValueError(f"batch_size must be between 1 and {BATCH_WRITE_PAGE_LIMIT}")
+
+    stats = BulkLoadStats()
+    pending: Dict[Type[Model], List[Model]] = {}
+    in_flight: Set[Future] = set()
+    t0 = time.perf_counter()
+
+    def drain(limit: int) -> None:
+        nonlocal in_flight
+        while len(in_flight) > limit:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()  # re-raise any write failure
+
+    with ThreadPoolExecutor(max_workers=writers, thread_name_prefix='bulk_load') as executor:
+
+        def submit(model_class: Type[Model], items: List[Model]) -> None:
+            drain(2 * writers - 1)
+            in_flight.add(executor.submit(write_batch, model_class, items, stats, max_retries))
+
+        for mod in models:
+            model_class = type(mod)
+            if model_class not in pending:
+                # create the botocore client here, as client creation is not thread safe
+                model_class._get_connection().connection.client
+                pending[model_class] = []
+            batch = pending[model_class]
+            batch.append(mod)
+            if len(batch) == batch_size:
+                submit(model_class, batch)
+                pending[model_class] = []
+
+        for model_class, batch in pending.items():
+            if batch:
+                submit(model_class, batch)
+        drain(0)
+
+    stats.elapsed = time.perf_counter() - t0
+    log.info(f"bulk_load: {stats}")
+    return stats
@@ -1,43 +1,270 @@
 #!cloudwatch
+"""
+CloudWatch metrics, buffered so that recording a datapoint never waits on the network.
 
+`ServerlessMetricWriter.put_duration` queues datapoints on the shared `metric_buffer`. A background thread
+aggregates them into statistic sets, one per metric, dimensions and period, and publishes them with
+`put_metric_data` in batches of up to `MAX_DATUMS_PER_REQUEST`. It flushes every `METRICS_FLUSH_SECONDS`, when
+`METRICS_FLUSH_SIZE` datapoints are queued, and at interpreter exit, or on SIGTERM once the entry point has called
+`install_shutdown_flush`.
+When the queue is full datapoints are dropped and counted, rather than blocking the caller.
+
+boto3 is imported, and the CloudWatch client created, on the first publish (see `get_client`), so importing this
+module costs nothing offline or in tests.
+"""
+
+import atexit
 import datetime
 import logging
+import queue
+import signal
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
-import boto3
+from .config import (
+    IS_OFFLINE,
+    IS_TESTING,
+    METRICS_BUFFERED,
+    METRICS_FLUSH_SECONDS,
+    METRICS_FLUSH_SIZE,
+    METRICS_QUEUE_SIZE,
+    REGION,
+)
 
-from .config import IS_OFFLINE, IS_TESTING, REGION
+log = logging.getLogger(__name__)
 
-# initialize our Cloudwatch client
-client = boto3.client('cloudwatch', region_name=REGION)
+_client: Any = None
+_client_lock = threading.Lock()
 
-log = logging.getLogger(__name__)
+
+def get_client() -> Any:
+    """The shared CloudWatch client, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import boto3
+
+                _client = boto3.client('cloudwatch', region_name=REGION)
+    return _client
+
+
+MAX_DATUMS_PER_REQUEST = 1000  # the put_metric_data limit
+
+_AggregateKey = Tuple[str, str, Tuple[Tuple[str, str], ...], str, int, datetime.datetime]
+
+
+@dataclass
+class MetricBufferStats:
+    queued: int = 0
+    dropped: int = 0
+    published: int = 0
+    requests: int = 0
+    errors: int = 0
+
+
+class MetricBuffer:
+    """
+    A bounded queue of metric datapoints, published in aggregated batches from a background thread.
+
+    Published with the shared client from `get_client`, unless given a client.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        max_queue: int = METRICS_QUEUE_SIZE,
+        flush_seconds: float = METRICS_FLUSH_SECONDS,
+        flush_size: int = METRICS_FLUSH_SIZE,
+    ) -> None:
+        self.client = client
+        self.flush_seconds = flush_seconds
+        self.flush_size = flush_size
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = MetricBufferStats()
+
+    def put(
+        self,
+        namespace: str,
+        metric_name: str,
+        dimensions: Dict[str, str],
+        value: float,
+        unit: str = 'None',
+        resolution: int = 60,
+        timestamp: Optional[datetime.datetime] = None,
+    ) -> bool:
+        """Queue a datapoint, returning False if it was dropped because the queue is full."""
+        timestamp = timestamp or datetime.datetime.now(datetime.timezone.utc)
+        try:
+            self._queue.put_nowait((namespace, metric_name, dimensions, value, unit, resolution, timestamp))
+        except queue.Full:
+            with self._lock:
+                self._stats.dropped += 1
+            return False
+        with self._lock:
+            self._stats.queued += 1
+        self._start()
+        if self._queue.qsize() >= self.flush_size:
+            self._wake.set()
+        return True
+
+    def _start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='metric_buffer', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as err:  # the thread must survive to publish later datapoints
+                log.warning(f'MetricBuffer flush failed: {err}')
+
+    def _drain(self) -> Dict[_AggregateKey, Dict[str, float]]:
+        """Take everything queued, aggregated by namespace, metric, dimensions, unit and period."""
+        aggregates: Dict[_AggregateKey, Dict[str, float]] = {}
+        while True:
+            try:
+                namespace, metric_name, dimensions, value, unit, resolution, timestamp = self._queue.get_nowait()
+            except queue.Empty:
+                return aggregates
+            period = timestamp.replace(microsecond=0)
+            if resolution >= 60:
+                period = period.replace(second=0)
+            key = (namespace, metric_name, tuple(sorted(dimensions.items())), unit, resolution, period)
+            stats = aggregates.get(key)
+            if stats is None:
+                aggregates[key] = dict(SampleCount=1, Sum=value, Minimum=value, Maximum=value)
+            else:
+                stats['SampleCount'] += 1
+                stats['Sum'] += value
+                stats['Minimum'] = min(stats['Minimum'], value)
+                stats['Maximum'] = max(stats['Maximum'], value)
+
+    def flush(self) -> int:
+        """Publish everything queued now, returning the number of datapoints published."""
+        with self._flush_lock:
+            by_namespace: Dict[str, List[Dict[str, Any]]] = {}
+            for (namespace, metric_name, dimensions, unit, resolution, period), stats in self._drain().items():
+                by_namespace.setdefault(namespace, []).append(
+                    {
+                        'MetricName': metric_name,
+                        'Dimensions': [{'Name': name, 'Value': value} for name, value in dimensions],
+                        'Timestamp': period,
+                        'StatisticValues': stats,
+                        'Unit': unit,
+                        'StorageResolution': resolution,
+                    }
+                )
+            published = 0
+            for namespace, data in by_namespace.items():
+                for start in range(0, len(data), MAX_DATUMS_PER_REQUEST):
+                    batch = data[start : start + MAX_DATUMS_PER_REQUEST]
+                    samples = int(sum(datum['StatisticValues']['SampleCount'] for datum in batch))
+                    try:
+                        (self.client or get_client()).put_metric_data(Namespace=namespace, MetricData=batch)
+                    except Exception as err:
+                        log.warning(f'MetricBuffer dropped {samples} datapoints for {namespace}: {err}')
+                        with self._lock:
+                            self._stats.errors += 1
+                        continue
+                    published += samples
+                    with self._lock:
+                        self._stats.requests += 1
+                        self._stats.published += samples
+            return published
+
+    def stats(self) -> MetricBufferStats:
+        with self._lock:
+            return MetricBufferStats(**vars(self._stats))
+
+
+metric_buffer = MetricBuffer()
+
+
+def flush_metrics() -> int:
+    """Publish the queued datapoints now, e.g. at the end of a Lambda invocation."""
+    return metric_buffer.flush()
+
+
+def _on_sigterm(previous: Any) -> Any:
+    def handler(signum, frame):
+        flush_metrics()
+        if callable(previous):
+            previous(signum, frame)
+        elif previous != signal.SIG_IGN:
+            signal.signal(signum, signal.SIG_DFL)
+            signal.raise_signal(signum)
+
+    handler.flushes_metrics = True  # type: ignore[attr-defined]
+    return handler
+
+
+def install_shutdown_flush() -> None:
+    """
+    Flush the queued datapoints on SIGTERM, then hand the signal on to the previous handler, or restore the
+    default handler and raise it again. Call once from the main thread of the application entry point.
+    """
+    previous = signal.getsignal(signal.SIGTERM)
+    if getattr(previous, 'flushes_metrics', False):
+        return
+    signal.signal(signal.SIGTERM, _on_sigterm(previous))
+
+
+atexit.register(flush_metrics)
 
 
 class ServerlessMetricWriter:
-    def __init__(self, lambda_name, metric_name, resolution=60):
+    def __init__(self, lambda_name, metric_name, resolution=60, buffer: Optional[MetricBuffer] = None):
         self._lambda_name = lambda_name
         self._metric_name = metric_name
         self._resolution = resolution  # 1=high, or 60
+        self._buffer = buffer or metric_buffer
 
     def put_duration(self, package, operation, duration):
 
         if isinstance(duration, datetime.timedelta):
             duration = float(duration.seconds * 1e3 + (duration.microseconds / 1e3))
 
-        rec = dict(
-            Namespace=f'AWS/Lambda/{self._lambda_name}',
-            MetricData=[
-                {
-                    'MetricName': self._metric_name,
-                    'Dimensions': [{'Name': 'Package', 'Value': package}, {'Name': 'Operation', 'Value': operation}],
-                    'Timestamp': datetime.datetime.now(),
-                    'Value': duration,
-                    'Unit': 'Milliseconds',
-                    'StorageResolution': self._resolution,
-                }
-            ],
-        )
+        self.put_value(package, operation, duration, unit='Milliseconds')
+
+    def put_value(self, package, operation, value, unit='Count'):
+
         if IS_OFFLINE or IS_TESTING:
-            log.debug(f"CW: {rec}")
+            log.debug(f"CW: {self._metric_name} {package} {operation} {value} {unit}")
+        elif METRICS_BUFFERED:
+            self._buffer.put(
+                f'AWS/Lambda/{self._lambda_name}',
+                self._metric_name,
+                dict(Package=package, Operation=operation),
+                value,
+                unit=unit,
+                resolution=self._resolution,
+            )
         else:
-            client.put_metric_data(**rec)
+            get_client().put_metric_data(
+                Namespace=f'AWS/Lambda/{self._lambda_name}',
+                MetricData=[
+                    {
+                        'MetricName': self._metric_name,
+                        'Dimensions': [
+                            {'Name': 'Package', 'Value': package},
+                            {'Name': 'Operation', 'Value': operation},
+                        ],
+                        'Timestamp': datetime.datetime.now(),
+                        'Value': value,
+                        'Unit': unit,
+                        'StorageResolution': self._resolution,
+                    }
+                ],
+            )
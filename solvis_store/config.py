@@ -23,3 +23,43 @@ REGION = os.getenv('REGION', 'us-east-1')
 DEPLOYMENT_STAGE = os.getenv('DEPLOYMENT_STAGE', 'LOCAL').upper()
 LOGGING_CFG = os.getenv('LOGGING_CFG', 'api/logging.yaml')
 CLOUDWATCH_APP_NAME = os.getenv('CLOUDWATCH_APP_NAME', 'CLOUDWATCH_APP_NAME_unconfigured')
+
+# the DynamoDB table names, see solvis_store.model
+LOCATION_RADIUS_TABLE_NAME = f"SOLVIS_RuptureSetLocationDistances-{DEPLOYMENT_STAGE}"
+FAULT_NAME_TABLE_NAME = f"SOLVIS_RuptureSetParentFaultRuptures-{DEPLOYMENT_STAGE}"
+POPULATE_STAMP_TABLE_NAME = f"SOLVIS_RuptureSetPopulateStamp-{DEPLOYMENT_STAGE}"
+
+# buffered metric publishing, see solvis_store.cloudwatch
+METRICS_BUFFERED = boolean_env('SOLVIS_STORE_METRICS_BUFFERED', 'True')  # False puts each datapoint inline
+METRICS_QUEUE_SIZE = int(os.getenv('SOLVIS_STORE_METRICS_QUEUE_SIZE', 10000))  # datapoints, drops when full
+METRICS_FLUSH_SECONDS = float(os.getenv('SOLVIS_STORE_METRICS_FLUSH_SECONDS', 10))
+METRICS_FLUSH_SIZE = int(os.getenv('SOLVIS_STORE_METRICS_FLUSH_SIZE', 1000))
+
+# compact attribute encoding, see solvis_store.attributes
+COMPACT_COMPRESSION = os.getenv('SOLVIS_STORE_COMPACT_COMPRESSION', 'none').lower()  # none, zlib or zstd
+COMPACT_DISTANCE_DTYPE = os.getenv(
+    'SOLVIS_STORE_COMPACT_DISTANCE_DTYPE', 'float32'
+).lower()  # float16, float32 or float64
+
+# the shared query cache, see solvis_store.query.cache
+QUERY_CACHE_MAX_BYTES = int(os.getenv('SOLVIS_STORE_QUERY_CACHE_MAX_BYTES', 256 * 1024**2))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv('SOLVIS_STORE_QUERY_CACHE_TTL_SECONDS', 3600)) or None  # 0 never expires
+QUERY_DISK_CACHE_DIR = os.getenv('SOLVIS_STORE_QUERY_DISK_CACHE_DIR')  # unset to disable, see query.disk_cache
+QUERY_DISK_CACHE_VERSION = os.getenv('SOLVIS_STORE_QUERY_DISK_CACHE_VERSION', '')
+QUERY_DISK_CACHE_TTL_SECONDS = (
+    float(os.getenv('SOLVIS_STORE_QUERY_DISK_CACHE_TTL_SECONDS', QUERY_CACHE_TTL_SECONDS or 0)) or None
+)  # 0 never expires
+
+# snapshot files to query instead of DynamoDB, see solvis_store.query.snapshot
+SNAPSHOT_PATHS = [path for path in os.getenv('SOLVIS_STORE_SNAPSHOTS', '').split(os.pathsep) if path]
+
+# rupture sets whose fault_name items are all loaded into memory, see solvis_store.query.prefetch
+PREFETCH_FAULT_NAMES = [
+    rupture_set_id.strip()
+    for rupture_set_id in os.getenv('SOLVIS_STORE_PREFETCH_FAULT_NAMES', '').split(',')
+    if rupture_set_id.strip()
+]
+
+# the storage backend, see solvis_store.backends
+BACKEND = os.getenv('SOLVIS_STORE_BACKEND', 'dynamodb').lower()  # dynamodb or sqlite
+SQLITE_PATH = os.getenv('SOLVIS_STORE_SQLITE_PATH', 'solvis_store.sqlite')
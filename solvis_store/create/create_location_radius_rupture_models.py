@@ -1,78 +1,218 @@
 import logging
-from typing import Iterator, List
+import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List, NamedTuple, Sequence, Tuple
 
+import numpy as np
+import numpy.typing as npt
 from nzshm_common.location.location import location_by_id
-from pyproj import Transformer
 
 # from solvis.get_secret import get_secret
-from solvis import FaultSystemSolution, geometry
+from solvis import FaultSystemSolution
 
 from solvis_store import model
+from solvis_store.records import LocationRadiusRecord, content_hash
+from solvis_store.sharding import shard_model
+
+from . import shared_arrays
+from .section_distances import section_location_distances
 
 log = logging.getLogger(__name__)
 
 
+class RatedRuptureSections(NamedTuple):
+    """The rupture/section pairs for ruptures with rates, as parallel arrays."""
+
+    ruptures: np.ndarray  # Rupture Index
+    section_rows: np.ndarray  # row position of the section in fault_surfaces()
+
+
+class LocationRadiusRuptures(NamedTuple):
+    radius: int
+    ruptures: np.ndarray  # sorted Rupture Index, or in distance order for a nearest cut
+    distances: np.ndarray  # distance in km, one for each rupture
+
+
+def rated_rupture_sections(fault_system_solution: FaultSystemSolution, surfaces) -> RatedRuptureSections:
+    """Join the rupture sections to the fault surfaces rows, keeping only ruptures with rates."""
+    fss = fault_system_solution
+    rated_ids = fss.rates.index.get_level_values('Rupture Index').to_numpy()
+    rupture_sections = fss.rupture_sections
+    ruptures = rupture_sections['rupture'].to_numpy()
+    section_rows = surfaces.index.get_indexer(rupture_sections['section'])
+    keep = (section_rows >= 0) & np.isin(ruptures, rated_ids)
+    return RatedRuptureSections(ruptures=ruptures[keep].astype(np.int64), section_rows=section_rows[keep])
+
+
+def nearest_rupture_distances(
+    rupture_sections: RatedRuptureSections, section_distances: np.ndarray, max_radius: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the distance to the closest section of every rupture within max_radius.
+
+    Returns:
+        rupture ids and distances, ordered by ascending distance.
+    """
+    distances = section_distances[rupture_sections.section_rows]
+    within = distances < max_radius
+    ruptures, distances = rupture_sections.ruptures[within], distances[within]
+
+    # the first row of each rupture, ordered by distance, is the closest section
+    order = np.lexsort((distances, ruptures))
+    ruptures, distances = ruptures[order], distances[order]
+    first = np.ones(len(ruptures), dtype=bool)
+    first[1:] = ruptures[1:] != ruptures[:-1]
+    ruptures, distances = ruptures[first], distances[first]
+
+    by_distance = np.argsort(distances, kind='stable')
+    return ruptures[by_distance], distances[by_distance]
+
+
+def radius_cuts(ruptures: np.ndarray, distances: np.ndarray, radii: Sequence[int]) -> Iterator[LocationRadiusRuptures]:
+    """
+    Cut the distance ordered ruptures at each radius.
+
+    Every smaller radius is a prefix of the distance ordered ruptures, so this is a searchsorted per radius.
+    """
+    for radius in radii:
+        count = np.searchsorted(distances, radius, side='left')
+        # back to Rupture Index order
+        order = np.argsort(ruptures[:count], kind='stable')
+        yield LocationRadiusRuptures(radius=radius, ruptures=ruptures[order], distances=distances[order])
+
+
+def location_radius_cuts(
+    rupture_sections: RatedRuptureSections,
+    distance_matrix: np.ndarray,
+    columns: Sequence[int],
+    radii: Sequence[int],
+    nearest: bool = False,
+) -> Iterator[Tuple[int, List[LocationRadiusRuptures]]]:
+    """
+    Get the radius cuts for each location column of the distance matrix.
+
+    With `nearest=True` there is one cut per location, of the ruptures within the maximum radius in distance order.
+    """
+    max_radius = max(radii)
+    for col in columns:
+        ruptures, distances = nearest_rupture_distances(rupture_sections, distance_matrix[:, col], max_radius)
+        if nearest:
+            yield col, [LocationRadiusRuptures(radius=max_radius, ruptures=ruptures, distances=distances)]
+        else:
+            yield col, list(radius_cuts(ruptures, distances, radii))
+
+
+def _shared_location_radius_cuts(
+    columns: Sequence[int], radii: Sequence[int], nearest: bool
+) -> List[Tuple[int, List[LocationRadiusRuptures]]]:
+    """Worker process task, using the arrays shared by `parallel_location_radius_cuts`."""
+    rupture_sections = RatedRuptureSections(
+        ruptures=shared_arrays.get('ruptures'), section_rows=shared_arrays.get('section_rows')
+    )
+    return list(location_radius_cuts(rupture_sections, shared_arrays.get('distance_matrix'), columns, radii, nearest))
+
+
+def parallel_location_radius_cuts(
+    rupture_sections: RatedRuptureSections,
+    distance_matrix: np.ndarray,
+    radii: Sequence[int],
+    workers: int,
+    nearest: bool = False,
+) -> Iterator[Tuple[int, List[LocationRadiusRuptures]]]:
+    """
+    Get the radius cuts for every location column, with chunks of locations processed by a pool of workers.
+
+    The input arrays are shared read-only with the workers, and results are yielded as they complete.
+    """
+    n_locations = distance_matrix.shape[1]
+    chunk_size = max(1, math.ceil(n_locations / (workers * 4)))
+    with shared_arrays.SharedArrays(
+        ruptures=rupture_sections.ruptures,
+        section_rows=rupture_sections.section_rows,
+        distance_matrix=distance_matrix,
+    ) as shared:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=shared_arrays.attach, initargs=(shared.specs,)
+        ) as executor:
+            chunks = [range(start, min(start + chunk_size, n_locations)) for start in range(0, n_locations, chunk_size)]
+            for future in as_completed(
+                [executor.submit(_shared_location_radius_cuts, chunk, radii, nearest) for chunk in chunks]
+            ):
+                yield from future.result()
+
+
 def create_location_radius_rupture_models(
     fault_system_solution: FaultSystemSolution,
     rupture_set_id: str,
     locations: List[str],
     distances: List[int],
     create_tables: bool = False,
+    dtype: npt.DTypeLike = np.float64,
+    workers: int = 1,
+    compact: bool = False,
+    nearest: bool = False,
 ) -> Iterator[model.RuptureSetLocationDistances]:
     """
     Generate models for the ruptures having any fault_sections that are within the distance to location arguments.
-    """
-    fss = fault_system_solution
-    if create_tables:
-        model.migrate()
 
-    for loc_id in locations:
+    The section distances for all locations are calculated up front, `dtype=np.float32` halves the memory used.
+    Then the closest rupture distances for each location are calculated once, at the maximum distance, and each
+    distance is cut from those.
 
-        loc = location_by_id(loc_id)
+    With `workers > 1` the locations are processed in a pool of worker processes, and the models are yielded
+    in the order the locations complete.
 
-        # calculate the distances
-        lon, lat = loc['longitude'], loc['latitude']
-        wgs84_projection = "+proj=longlat +datum=WGS84 +no_defs"
-        local_azimuthal_projection = "+proj=aeqd +R=6371000 +units=m +lat_0={} +lon_0={}".format(lat, lon)
-        transformer = Transformer.from_crs(wgs84_projection, local_azimuthal_projection)
+    With `compact=True` the ruptures and distances are stored in the compact binary attributes. Models too
+    large for a DynamoDB item are split into shards, see `solvis_store.sharding`.
 
-        gdf = fss.fault_surfaces()
-        gdf['distance_km'] = gdf.apply(
-            lambda section: geometry.section_distance(transformer, section.geometry, section.UpDepth, section.LowDepth),
-            axis=1,
-        )
+    With `nearest=True` there is one model per location, keyed by the location, of the ruptures within the
+    maximum distance. The queries cut any smaller radius from it, see `solvis_store.records.radius_cut`.
+    Compact ruptures are stored in distance order, legacy number sets in Rupture Index order.
 
-        # loop through the distances
-        for radius_km in distances:
-            log.debug('RADIUS %s' % radius_km)
-            # get the sections whose closest point is within radius
-            sections_gdf = gdf[gdf.distance_km < radius_km]
+    Every model has the `content_hash` of its record, so unchanged items can be skipped, see `solvis_store.resume`.
+    """
+    fss = fault_system_solution
+    if create_tables:
+        model.migrate()
 
-            # get the ruptures
-            rupts_gdf = fss.rupture_sections.join(sections_gdf, 'section', how='inner')
+    gdf = fss.fault_surfaces()
+    locs = [location_by_id(loc_id) for loc_id in locations]
+    distance_matrix = section_location_distances(
+        gdf, [loc['latitude'] for loc in locs], [loc['longitude'] for loc in locs], dtype=dtype
+    )
+    rupture_sections = rated_rupture_sections(fss, gdf)
+
+    if workers > 1:
+        location_cuts = parallel_location_radius_cuts(rupture_sections, distance_matrix, distances, workers, nearest)
+    else:
+        location_cuts = location_radius_cuts(
+            rupture_sections, distance_matrix, range(len(locations)), distances, nearest
+        )
 
-            # aggregate to get the closest rupture/section for each rupture
-            rupt_min_dist_df = rupts_gdf.pivot_table(index=['rupture'], aggfunc={"distance_km": 'min'})
+    for col, cuts in location_cuts:
+        loc_id = locations[col]
 
-            ## filter out ruptures with no rates
-            rates_df = fss.rates.copy().reset_index(level=0, drop=True).drop(columns=['fault_system', 'Rupture Index'])
-            rupts_rates_gdf = rates_df.join(rupt_min_dist_df, 'Rupture Index', how='inner')
+        for cut in cuts:
+            log.debug('RADIUS %s' % cut.radius)
 
-            if not len(rupts_rates_gdf):
+            if not len(cut.ruptures):
                 continue
 
-            if len(rupts_rates_gdf) > 1e5:
-                raise Exception(f"Too many ruptures in {loc} with radius {radius_km}: {len(rupts_rates_gdf)}")
-
-            # get the list of rupture ids
-            ruptures = list(rupts_rates_gdf.index.astype(dtype='int').tolist())
-
-            yield model.RuptureSetLocationDistances(
+            mod = model.RuptureSetLocationDistances(
                 rupture_set_id=rupture_set_id,
-                location_radius=f'{loc_id}:{radius_km}',
-                radius=radius_km,
+                location_radius=loc_id if nearest else f'{loc_id}:{cut.radius}',
+                radius=cut.radius,
                 location=loc_id,
-                ruptures=ruptures,
-                distances=[round(d, 3) for d in rupts_rates_gdf.distance_km.to_list()],
-                rupture_count=len(ruptures),
+                rupture_count=len(cut.ruptures),
+            )
+            if compact:
+                mod.packed_ruptures = cut.ruptures
+                mod.packed_distances = cut.distances
+            else:
+                order = np.argsort(cut.ruptures, kind='stable') if nearest else slice(None)
+                mod.ruptures = cut.ruptures[order].tolist()
+                mod.distances = [round(d, 3) for d in cut.distances[order].tolist()]
+            mod.content_hash = content_hash(
+                LocationRadiusRecord(mod.location_radius, mod.rupture_ids(), mod.rupture_distances(), cut.radius)
             )
+            yield from shard_model(mod)
@@ -1,45 +1,89 @@
 import logging
 import time
-from functools import lru_cache
-from typing import Iterable, Iterator, Set, Tuple
+from typing import Any, Dict, Iterator, List, NamedTuple, Tuple
 
+import numpy as np
 from solvis import FaultSystemSolution
 
 from solvis_store import model
+from solvis_store.records import FaultNameRecord, content_hash
+from solvis_store.sharding import shard_model
 
 log = logging.getLogger(__name__)
 
 
-# TODO: this is here temporarily until we can get solvis published (GHA problems)
-def parent_faults(sol: FaultSystemSolution) -> Iterable[Tuple[int, str]]:
-    return zip(list(sol.fault_sections.ParentID.unique()), list(sol.fault_sections.ParentName.unique()))
+class ParentFaultRuptures(NamedTuple):
+    fault_id: int
+    fault_name: str
+    ruptures: np.ndarray  # sorted Rupture Index, of the ruptures with rates
 
 
-@lru_cache
-def get_rupture_ids_for_parent_fault(fault_system_solution: FaultSystemSolution, fault_name: str) -> Set[int]:
-    rr = set(fault_system_solution.ruptures_with_rates["Rupture Index"].unique())
-    pr = set(fault_system_solution.get_ruptures_for_parent_fault(fault_name))  # all, including those with no rate
-    return rr.intersection(pr)
+def parent_faults(sol: FaultSystemSolution) -> List[Tuple[int, str]]:
+    """The (ParentID, ParentName) of each parent fault, in the order of their first section."""
+    parents = sol.fault_sections[['ParentID', 'ParentName']].drop_duplicates('ParentID')
+    return [(int(pid), str(name)) for pid, name in zip(parents.ParentID, parents.ParentName)]
+
+
+def parent_fault_ruptures(fault_system_solution: FaultSystemSolution) -> Iterator[ParentFaultRuptures]:
+    """
+    Get the ruptures (with rates) of every parent fault, in one pass over the rupture sections.
+
+    The rupture sections are joined to the parent fault of each section, then the unique (parent, rupture) pairs
+    are sorted by parent, so each parent fault's ruptures are a slice. Parent faults with no rated ruptures have
+    an empty array.
+    """
+    fss = fault_system_solution
+    fault_sections = fss.fault_sections
+    rupture_sections = fss.rupture_sections
+    rated_ids = fss.ruptures_with_rates['Rupture Index'].to_numpy()
+
+    ruptures = rupture_sections['rupture'].to_numpy()
+    section_rows = fault_sections.index.get_indexer(rupture_sections['section'])
+    keep = (section_rows >= 0) & np.isin(ruptures, rated_ids)
+    parent_ids = fault_sections['ParentID'].to_numpy()[section_rows[keep]]
+    ruptures = ruptures[keep]
+
+    order = np.lexsort((ruptures, parent_ids))
+    parent_ids, ruptures = parent_ids[order], ruptures[order]
+    first = np.ones(len(ruptures), dtype=bool)
+    first[1:] = (parent_ids[1:] != parent_ids[:-1]) | (ruptures[1:] != ruptures[:-1])
+    parent_ids, ruptures = parent_ids[first], ruptures[first].astype(np.int32)
+
+    ids, starts, counts = np.unique(parent_ids, return_index=True, return_counts=True)
+    slices = {int(pid): slice(start, start + count) for pid, start, count in zip(ids, starts, counts)}
+    for fault_id, fault_name in parent_faults(fss):
+        yield ParentFaultRuptures(fault_id, fault_name, ruptures[slices.get(fault_id, slice(0, 0))])
 
 
 def create_parent_fault_rupture_models(
-    fault_system_solution: FaultSystemSolution, rupture_set_id: str, create_tables: bool = False
+    fault_system_solution: FaultSystemSolution, rupture_set_id: str, create_tables: bool = False, compact: bool = False
 ) -> Iterator[model.RuptureSetParentFaultRuptures]:
+    """
+    Generate models for the ruptures (with rates) of each parent fault.
+
+    With `compact=True` the ruptures are stored in the compact binary attribute. Models too large for a
+    DynamoDB item are split into shards, see `solvis_store.sharding`. Every model has the `content_hash` of its
+    record.
+    """
 
     log.debug('get_parent_fault_rupture_models')
     if create_tables:
         model.migrate()
-    for fault in parent_faults(fault_system_solution):
 
-        tic22 = time.perf_counter()
-        fault_rupture_ids = [int(rid) for rid in get_rupture_ids_for_parent_fault(fault_system_solution, fault[1])]
-        tic23 = time.perf_counter()
-        log.debug('fss.get_ruptures_for_parent_fault %s: %2.3f seconds' % (fault[0], (tic23 - tic22)))
+    tic = time.perf_counter()
+    faults = list(parent_fault_ruptures(fault_system_solution))
+    log.debug('parent_fault_ruptures %s faults: %2.3f seconds' % (len(faults), time.perf_counter() - tic))
 
-        yield model.RuptureSetParentFaultRuptures(
+    for fault in faults:
+        ruptures: Dict[str, Any] = (
+            {'packed_ruptures': fault.ruptures} if compact else {'ruptures': fault.ruptures.tolist()}
+        )
+        mod = model.RuptureSetParentFaultRuptures(
             rupture_set_id=rupture_set_id,
-            fault_name=fault[1],
-            fault_id=int(fault[0]),
-            ruptures=fault_rupture_ids,
-            rupture_count=len(fault_rupture_ids),
+            fault_name=fault.fault_name,
+            fault_id=fault.fault_id,
+            rupture_count=len(fault.ruptures),
+            **ruptures,
         )
+        mod.content_hash = content_hash(FaultNameRecord(fault.fault_name, fault.fault_id, fault.ruptures))
+        yield from shard_model(mod)
@@ -0,0 +1,86 @@
+"""
+Vectorised distances between fault sections and locations.
+
+This reproduces `solvis.geometry.section_distance` for a whole sections x locations matrix in one pass.
+`section_distance` projects the section trace into a spherical azimuthal equidistant (aeqd) projection
+centred on the location and takes the nearest of the first two trace points at the upper and lower depths.
+In the aeqd projection the planar distance from the origin is the great circle distance, so we can use
+the haversine formula on the trace coordinates directly, with no per-location `Transformer`.
+"""
+
+import logging
+from typing import Sequence, Tuple
+
+import numpy as np
+import numpy.typing as npt
+import shapely
+
+log = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000.0  # matches the `+R=6371000` aeqd projection used by solvis
+LOCATION_CHUNK_SIZE = 64
+
+
+def surface_trace_points(geometries: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the first two trace points of each fault surface geometry.
+
+    Returns:
+        longitudes and latitudes in radians, each with shape (sections, 2)
+    """
+    geoms = np.asarray(geometries, dtype=object)
+    type_ids = shapely.get_type_id(geoms)
+    is_polygon = type_ids == shapely.GeometryType.POLYGON
+    unsupported = ~(is_polygon | (type_ids == shapely.GeometryType.LINESTRING))
+    if np.any(unsupported):
+        raise ValueError(f'unable to handle geometry: {geoms[unsupported][0]}')
+
+    traces = np.where(is_polygon, shapely.get_exterior_ring(geoms), geoms)
+    points = np.stack([shapely.get_point(traces, 0), shapely.get_point(traces, 1)], axis=1)
+    return np.radians(shapely.get_x(points)), np.radians(shapely.get_y(points))
+
+
+def section_location_distances(
+    surfaces,
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    dtype: npt.DTypeLike = np.float64,
+) -> np.ndarray:
+    """
+    Calculate the distance in km from every fault surface to every location.
+
+    Args:
+        surfaces: a GeoDataFrame like `FaultSystemSolution.fault_surfaces()`, with `geometry`,
+            `UpDepth` and `LowDepth` columns.
+        latitudes: location latitudes in degrees.
+        longitudes: location longitudes in degrees.
+        dtype: the output dtype, use `np.float32` to halve the memory required.
+
+    Returns:
+        an array of distances with shape (sections, locations).
+    """
+    lons, lats = surface_trace_points(surfaces.geometry.values)
+    # squared depth in metres of the nearest edge of each section, normally UpDepth
+    depth_sq = np.minimum(surfaces.UpDepth.to_numpy(dtype=float) ** 2, surfaces.LowDepth.to_numpy(dtype=float) ** 2)
+    depth_sq = depth_sq * 1e6
+    cos_lats = np.cos(lats)
+
+    loc_lats = np.radians(np.asarray(latitudes, dtype=float))
+    loc_lons = np.radians(np.asarray(longitudes, dtype=float))
+
+    distances = np.empty((len(lons), len(loc_lats)), dtype=dtype)
+    for start in range(0, len(loc_lats), LOCATION_CHUNK_SIZE):
+        stop = start + LOCATION_CHUNK_SIZE
+        loc_lat = loc_lats[start:stop]
+        loc_lon = loc_lons[start:stop]
+        # haversine with shape (sections, 2, locations)
+        hav = (
+            np.sin((lats[..., None] - loc_lat) / 2) ** 2
+            + cos_lats[..., None] * np.cos(loc_lat) * np.sin((lons[..., None] - loc_lon) / 2) ** 2
+        )
+        surface_dist = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(hav, 0.0, 1.0)))
+        nearest_sq = np.min(surface_dist, axis=1) ** 2
+        distances[:, start:stop] = np.sqrt(nearest_sq + depth_sq[:, None]) / 1000.0
+
+    log.debug(f'section_location_distances: {distances.shape} {distances.dtype}')
+    return distances
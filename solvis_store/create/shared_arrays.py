@@ -0,0 +1,63 @@
+"""
+Read-only NumPy arrays shared with worker processes, so that large inputs are not pickled per task.
+"""
+
+import logging
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+ArraySpec = Tuple[str, Tuple[int, ...], str]  # shared memory name, shape, dtype
+
+# the arrays attached in this (worker) process
+_attached: Dict[str, np.ndarray] = {}
+_attached_blocks: List[SharedMemory] = []
+
+
+class SharedArrays:
+    """
+    Copy arrays into shared memory blocks, owned by the creating process.
+
+    Pass `specs` to `attach` in the worker process initializer. Use as a context manager so the blocks
+    are released when the pool is done.
+    """
+
+    def __init__(self, **arrays: np.ndarray):
+        self._blocks: List[SharedMemory] = []
+        self.specs: Dict[str, ArraySpec] = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            self._blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self) -> None:
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def attach(specs: Dict[str, ArraySpec]) -> None:
+    """Process pool initializer, maps the shared arrays read-only into this process."""
+    for name, (block_name, shape, dtype) in specs.items():
+        block = SharedMemory(name=block_name)
+        _attached_blocks.append(block)
+        array: np.ndarray = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        _attached[name] = array
+    log.debug(f'attached shared arrays: {list(specs)}')
+
+
+def get(name: str) -> np.ndarray:
+    return _attached[name]
@@ -0,0 +1,231 @@
+"""
+Instrumentation of the DynamoDB reads and the query internals.
+
+`instrument_query` wraps a pynamodb `ResultIterator` so that the reads are measured as they happen, while the
+results are iterated: the fetch time, pages, items, bytes returned and `ConsumedCapacity`. `record_read` does the
+same for other reads, e.g. `solvis_store.batch_get`. Each read is published as CloudWatch metrics (see
+`solvis_store.cloudwatch`) and added to the in-process totals of `read_stats()`.
+
+`span(name)` times a block, or decorates a function, with `perf_counter`. Span totals are kept in `span_stats()`,
+callbacks added with `add_span_hook` are called with `(name, seconds)`, and `enable_span_profiling()` also runs
+each span under cProfile, see `span_profile(name)`.
+"""
+
+import cProfile
+import logging
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from pynamodb.constants import CAPACITY_UNITS, CONSUMED_CAPACITY, ITEMS, TOTAL
+
+from .cloudwatch import ServerlessMetricWriter
+from .config import CLOUDWATCH_APP_NAME
+from .sharding import raw_item_size
+
+log = logging.getLogger(__name__)
+
+_T = TypeVar('_T')
+
+duration_metrics = ServerlessMetricWriter(lambda_name=CLOUDWATCH_APP_NAME, metric_name="MethodDuration", resolution=1)
+page_metrics = ServerlessMetricWriter(lambda_name=CLOUDWATCH_APP_NAME, metric_name="ReadPages")
+item_metrics = ServerlessMetricWriter(lambda_name=CLOUDWATCH_APP_NAME, metric_name="ReadItems")
+byte_metrics = ServerlessMetricWriter(lambda_name=CLOUDWATCH_APP_NAME, metric_name="ReadBytes")
+capacity_metrics = ServerlessMetricWriter(lambda_name=CLOUDWATCH_APP_NAME, metric_name="ConsumedReadCapacity")
+
+
+@dataclass
+class ReadStats:
+    """Totals for one kind of read, e.g. `RuptureSetLocationDistances.query`."""
+
+    reads: int = 0
+    pages: int = 0
+    items: int = 0
+    bytes: int = 0
+    capacity_units: float = 0.0
+    seconds: float = 0.0
+
+
+@dataclass
+class SpanStats:
+    calls: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+
+
+_lock = threading.Lock()
+_read_stats: Dict[str, ReadStats] = {}
+_span_stats: Dict[str, SpanStats] = {}
+_span_hooks: List[Callable[[str, float], None]] = []
+_span_profiles: Dict[str, pstats.Stats] = {}
+_profiling = False
+_local = threading.local()
+
+
+def consumed_capacity(page: Dict[str, Any]) -> float:
+    """The capacity units consumed by a response, one `ConsumedCapacity` dict or a list of them."""
+    consumed = page.get(CONSUMED_CAPACITY) or []
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    return float(sum(capacity.get(CAPACITY_UNITS, 0) for capacity in consumed))
+
+
+def record_read(operation: str, stats: ReadStats, package: str = __name__) -> None:
+    """Add a read to the totals and publish its metrics."""
+    with _lock:
+        totals = _read_stats.setdefault(operation, ReadStats())
+        totals.reads += stats.reads
+        totals.pages += stats.pages
+        totals.items += stats.items
+        totals.bytes += stats.bytes
+        totals.capacity_units += stats.capacity_units
+        totals.seconds += stats.seconds
+    log.debug(f'{operation}: {stats}')
+    duration_metrics.put_duration(package, operation, stats.seconds * 1e3)
+    page_metrics.put_value(package, operation, stats.pages, unit='Count')
+    item_metrics.put_value(package, operation, stats.items, unit='Count')
+    byte_metrics.put_value(package, operation, stats.bytes, unit='Bytes')
+    capacity_metrics.put_value(package, operation, stats.capacity_units, unit='Count')
+
+
+def read_stats() -> Dict[str, ReadStats]:
+    """A copy of the read totals since the last `reset_stats()`, by operation."""
+    with _lock:
+        return {operation: ReadStats(**vars(stats)) for operation, stats in _read_stats.items()}
+
+
+def span_stats() -> Dict[str, SpanStats]:
+    """A copy of the span totals since the last `reset_stats()`, by span name."""
+    with _lock:
+        return {name: SpanStats(**vars(stats)) for name, stats in _span_stats.items()}
+
+
+def reset_stats() -> None:
+    with _lock:
+        _read_stats.clear()
+        _span_stats.clear()
+        _span_profiles.clear()
+
+
+class _PageOperation:
+    """Wraps the pynamodb operation called for each page, to ask for and count `ConsumedCapacity`."""
+
+    def __init__(self, operation: Callable, stats: ReadStats) -> None:
+        self._operation = operation
+        self._stats = stats
+        self.__self__ = getattr(operation, '__self__', None)  # used by `PageIterator.key_names`
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        kwargs['return_consumed_capacity'] = TOTAL
+        page = self._operation(*args, **kwargs)
+        self._stats.pages += 1
+        items = page.get(ITEMS) or []
+        self._stats.items += len(items)
+        self._stats.bytes += sum(raw_item_size(item) for item in items)
+        self._stats.capacity_units += consumed_capacity(page)
+        return page
+
+
+class InstrumentedResultIterator(Iterator[_T]):
+    """
+    A `ResultIterator` that measures its reads, recording them with `record_read` when it is exhausted.
+
+    The time spent in `__next__`, which includes fetching and deserializing each page, is the fetch time.
+    Other attributes are those of the wrapped iterator.
+    """
+
+    def __init__(self, operation: str, results: Any, package: str = __name__) -> None:
+        self._operation = operation
+        self._results = results
+        self._package = package
+        self._stats = ReadStats(reads=1)
+        self._recorded = False
+        page_iter = results.page_iter
+        page_iter._operation = _PageOperation(page_iter._operation, self._stats)
+
+    def __iter__(self) -> Iterator[_T]:
+        return self
+
+    def __next__(self) -> _T:
+        t0 = time.perf_counter()
+        try:
+            item = next(self._results)
+        except StopIteration:
+            self._stats.seconds += time.perf_counter() - t0
+            self.close()
+            raise
+        self._stats.seconds += time.perf_counter() - t0
+        return item
+
+    def close(self) -> None:
+        """Record the reads so far, if not already recorded, e.g. when not iterating to the end."""
+        if not self._recorded:
+            self._recorded = True
+            record_read(self._operation, self._stats, self._package)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._results, name)
+
+
+def instrument_query(operation: str, results: Any, package: str = __name__) -> InstrumentedResultIterator:
+    return InstrumentedResultIterator(operation, results, package)
+
+
+def add_span_hook(hook: Callable[[str, float], None]) -> None:
+    """Call `hook(name, seconds)` at the end of every span."""
+    with _lock:
+        _span_hooks.append(hook)
+
+
+def remove_span_hook(hook: Callable[[str, float], None]) -> None:
+    with _lock:
+        _span_hooks.remove(hook)
+
+
+def enable_span_profiling(enabled: bool = True) -> None:
+    """Run the outermost span of each thread under cProfile, collecting the profiles by span name."""
+    global _profiling
+    _profiling = enabled
+
+
+def span_profile(name: str) -> Optional[pstats.Stats]:
+    """The collected profile of a span, if span profiling was enabled while it ran."""
+    with _lock:
+        return _span_profiles.get(name)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the block, or the decorated function, as the named span."""
+    profiler = None
+    if _profiling and not getattr(_local, 'profiling', False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            _local.profiling = True
+        except ValueError:  # another profiler is active
+            profiler = None
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        if profiler is not None:
+            profiler.disable()
+            _local.profiling = False
+        with _lock:
+            stats = _span_stats.setdefault(name, SpanStats())
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            if profiler is not None:
+                if name in _span_profiles:
+                    _span_profiles[name].add(profiler)
+                else:
+                    _span_profiles[name] = pstats.Stats(profiler)
+            hooks = list(_span_hooks)
+        for hook in hooks:
+            hook(name, seconds)
@@ -1,31 +1,50 @@
 import logging
-from datetime import datetime as dt
+from typing import Optional, Set
 
+import numpy as np
 from pynamodb.attributes import ListAttribute, NumberAttribute, NumberSetAttribute, UnicodeAttribute
 from pynamodb.models import Model
 
-from .cloudwatch import ServerlessMetricWriter
-from .config import CLOUDWATCH_APP_NAME, DEPLOYMENT_STAGE, IS_OFFLINE, IS_TESTING, REGION
+from .attributes import DistancesAttribute, RuptureIdsAttribute
+from .config import (
+    FAULT_NAME_TABLE_NAME,
+    IS_OFFLINE,
+    IS_TESTING,
+    LOCATION_RADIUS_TABLE_NAME,
+    POPULATE_STAMP_TABLE_NAME,
+    REGION,
+)
+from .instrumentation import instrument_query
 
 log = logging.getLogger(__name__)
 
-db_metrics = ServerlessMetricWriter(lambda_name=CLOUDWATCH_APP_NAME, metric_name="MethodDuration", resolution=1)
-
 
 class MetricatedModel(Model):
     @classmethod
     def query(cls, *args, **kwargs):
-        t0 = dt.utcnow()
+        """As `Model.query`, with the reads measured while iterating, see `solvis_store.instrumentation`."""
         res = super(MetricatedModel, cls).query(*args, **kwargs)
-        t1 = dt.utcnow()
-        db_metrics.put_duration(__name__, f'{cls.__name__}.query', t1 - t0)
-        return res
+        return instrument_query(f'{cls.__name__}.query', res, __name__)
+
+
+class RuptureIdsMixin:
+    """Read rupture ids from either the legacy `ruptures` number set or the compact `packed_ruptures`."""
+
+    ruptures: Optional[Set[float]]
+    packed_ruptures: Optional[np.ndarray]
+
+    def rupture_ids(self) -> np.ndarray:
+        """The rupture ids as an int32 array, in stored order."""
+        if self.packed_ruptures is not None:
+            return self.packed_ruptures
+        # number sets are unordered, ruptures are written in ascending order aligned with any distances
+        return np.array(sorted(self.ruptures or ()), dtype=np.int32)
 
 
-class RuptureSetLocationDistances(MetricatedModel):
+class RuptureSetLocationDistances(RuptureIdsMixin, MetricatedModel):
     class Meta:
         billing_mode = 'PAY_PER_REQUEST'
-        table_name = f"SOLVIS_RuptureSetLocationDistances-{DEPLOYMENT_STAGE}"
+        table_name = LOCATION_RADIUS_TABLE_NAME
         region = REGION
 
     rupture_set_id = UnicodeAttribute(hash_key=True)
@@ -33,26 +52,63 @@ class RuptureSetLocationDistances(MetricatedModel):
 
     radius = NumberAttribute()
     location = UnicodeAttribute()
-    ruptures = NumberSetAttribute()  # Rupture Index,
-    distances = ListAttribute(of=NumberAttribute)  # distances, one for each rupture_index
+    ruptures = NumberSetAttribute(null=True)  # Rupture Index,
+    distances = ListAttribute(of=NumberAttribute, null=True)  # distances, one for each rupture_index
     rupture_count = NumberAttribute()
 
+    # compact layout, alternative to ruptures and distances
+    packed_ruptures = RuptureIdsAttribute(null=True)
+    packed_distances = DistancesAttribute(null=True)
 
-class RuptureSetParentFaultRuptures(MetricatedModel):
+    # see solvis_store.sharding
+    shard = NumberAttribute(null=True)
+    shard_count = NumberAttribute(null=True)
+
+    content_hash = UnicodeAttribute(null=True)  # see solvis_store.records.content_hash, on every shard
+
+    def rupture_distances(self) -> np.ndarray:
+        """The distances as a float array, aligned with `rupture_ids()`."""
+        if self.packed_distances is not None:
+            return self.packed_distances
+        return np.array(self.distances or (), dtype=float)
+
+
+class RuptureSetParentFaultRuptures(RuptureIdsMixin, MetricatedModel):
     class Meta:
         billing_mode = 'PAY_PER_REQUEST'
-        table_name = f"SOLVIS_RuptureSetParentFaultRuptures-{DEPLOYMENT_STAGE}"
+        table_name = FAULT_NAME_TABLE_NAME
         region = REGION
 
     rupture_set_id = UnicodeAttribute(hash_key=True)
     fault_name = UnicodeAttribute(range_key=True)
 
     fault_id = NumberAttribute()
-    ruptures = NumberSetAttribute()  # Rupture Index
+    ruptures = NumberSetAttribute(null=True)  # Rupture Index
     rupture_count = NumberAttribute()
 
+    # compact layout, alternative to ruptures
+    packed_ruptures = RuptureIdsAttribute(null=True)
+
+    # see solvis_store.sharding
+    shard = NumberAttribute(null=True)
+    shard_count = NumberAttribute(null=True)
+
+    content_hash = UnicodeAttribute(null=True)  # see solvis_store.records.content_hash, on every shard
+
+
+class RuptureSetPopulateStamp(Model):
+    """Changed each time the rupture set's items are stored, see `solvis_store.query.disk_cache`."""
+
+    class Meta:
+        billing_mode = 'PAY_PER_REQUEST'
+        table_name = POPULATE_STAMP_TABLE_NAME
+        region = REGION
+
+    rupture_set_id = UnicodeAttribute(hash_key=True)
+    stamp = UnicodeAttribute()
+
 
-table_classes = (RuptureSetLocationDistances, RuptureSetParentFaultRuptures)
+table_classes = (RuptureSetLocationDistances, RuptureSetParentFaultRuptures, RuptureSetPopulateStamp)
 
 
 def set_local_mode(host="http://localhost:8000"):
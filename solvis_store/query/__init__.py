@@ -1,2 +1,35 @@
-from .fault_name import get_fault_name_rupture_ids, get_fault_name_ruptures
-from .location_radius import get_location_radius_rupture_ids, get_location_radius_ruptures
+"""
+The rupture set queries.
+
+This is the query-only entry point: importing it loads NumPy and the query modules, but not solvis, geopandas or
+pyproj (needed only by `solvis_store.create`), nor boto3. The DynamoDB models and client are loaded by the first
+DynamoDB query, and the CloudWatch client by the first metric published.
+"""
+
+from .fault_name import (
+    FaultNameRuptureColumns,
+    get_fault_name_rupture_columns,
+    get_fault_name_rupture_id_array,
+    get_fault_name_rupture_ids,
+    get_fault_name_rupture_page,
+    get_fault_name_ruptures,
+    iter_fault_name_rupture_pages,
+)
+from .location_fault import (
+    LocationFaultRuptureColumns,
+    get_location_fault_rupture_columns,
+    get_location_fault_rupture_id_array,
+)
+from .location_radius import (
+    LocationRadiusRuptureColumns,
+    get_location_radius_rupture_columns,
+    get_location_radius_rupture_id_array,
+    get_location_radius_rupture_ids,
+    get_location_radius_rupture_page,
+    get_location_radius_ruptures,
+    get_nearest_rupture_columns,
+    get_nearest_ruptures,
+    iter_location_radius_rupture_pages,
+)
+from .pages import Page
+from .prefetch import prefetch_fault_names, warm_up
@@ -0,0 +1,239 @@
+"""
+A shared cache of decoded query records and results, bounded by their size in bytes and by age.
+
+Entries are keyed by `(rupture_set_id, namespace, key)`, so everything cached for a rupture set can be dropped
+with `invalidate(rupture_set_id)`, e.g. after the tables are repopulated. Cached NumPy arrays are made read-only.
+
+`get_records` layers `query_cache` over the optional `disk_cache` (see `solvis_store.query.disk_cache`).
+"""
+
+import functools
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+from solvis_store.backends import get_backend
+from solvis_store.config import (
+    QUERY_CACHE_MAX_BYTES,
+    QUERY_CACHE_TTL_SECONDS,
+    QUERY_DISK_CACHE_DIR,
+    QUERY_DISK_CACHE_TTL_SECONDS,
+    QUERY_DISK_CACHE_VERSION,
+)
+
+from .disk_cache import DiskCache
+
+log = logging.getLogger(__name__)
+
+ENTRY_OVERHEAD_BYTES = 200  # the key, bookkeeping and small python objects
+
+_F = TypeVar('_F', bound=Callable[..., Any])
+_R = TypeVar('_R')
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+
+class _Entry(NamedTuple):
+    value: Any
+    size: int
+    expires: float
+
+
+def entry_size(value: Any) -> int:
+    """Estimate the memory held by a cached value, making any arrays in it read-only."""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+        return value.nbytes
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(entry_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(entry_size(k) + entry_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    """
+    A least recently used cache with a byte budget and a time to live.
+
+    Misses may be cached too, with the value `None`. Values larger than the whole budget are not cached.
+    """
+
+    def __init__(
+        self, max_bytes: int, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: 'OrderedDict[Tuple[str, str, Hashable], _Entry]' = OrderedDict()
+        self._bytes = 0
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+        self._invalidation_hooks: List[Callable[[str], None]] = []
+
+    def get_many(self, rupture_set_id: str, namespace: str, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """Get the cached values for the keys, omitting those not in the cache."""
+        found = {}
+        now = self._clock()
+        with self._lock:
+            for key in keys:
+                entry_key = (rupture_set_id, namespace, key)
+                entry = self._entries.get(entry_key)
+                if entry is not None and entry.expires < now:
+                    self._remove(entry_key)
+                    self._stats.expirations += 1
+                    entry = None
+                if entry is None:
+                    self._stats.misses += 1
+                    continue
+                self._stats.hits += 1
+                self._entries.move_to_end(entry_key)
+                found[key] = entry.value
+        return found
+
+    def put(self, rupture_set_id: str, namespace: str, key: Hashable, value: Any) -> None:
+        size = ENTRY_OVERHEAD_BYTES + entry_size(value)
+        expires = self._clock() + self.ttl if self.ttl is not None else float('inf')
+        entry_key = (rupture_set_id, namespace, key)
+        with self._lock:
+            if entry_key in self._entries:
+                self._remove(entry_key)
+            if size > self.max_bytes:
+                return
+            self._entries[entry_key] = _Entry(value, size, expires)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats.evictions += 1
+
+    def memoize(self, namespace: str) -> Callable[[_F], _F]:
+        """Decorate a function of `(rupture_set_id, *hashable_args)` to cache its results."""
+
+        def decorator(fn: _F) -> _F:
+            @functools.wraps(fn)
+            def wrapper(rupture_set_id: str, *args: Hashable) -> Any:
+                cached = self.get_many(rupture_set_id, namespace, [args])
+                if cached:
+                    return cached[args]
+                value = fn(rupture_set_id, *args)
+                self.put(rupture_set_id, namespace, args, value)
+                return value
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+    def invalidate(self, rupture_set_id: str) -> int:
+        """Drop all the entries for the rupture set, and call the invalidation hooks, returning how many there were."""
+        with self._lock:
+            entry_keys = [entry_key for entry_key in self._entries if entry_key[0] == rupture_set_id]
+            for entry_key in entry_keys:
+                self._remove(entry_key)
+        for hook in self._invalidation_hooks:
+            hook(rupture_set_id)
+        return len(entry_keys)
+
+    def on_invalidate(self, hook: Callable[[str], None]) -> None:
+        """Call `hook(rupture_set_id)` on `invalidate`, to drop what is held for the rupture set outside the cache."""
+        self._invalidation_hooks.append(hook)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> CacheStats:
+        """A snapshot of the hit, miss, eviction and expiry counters, and the current size."""
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                expirations=self._stats.expirations,
+                entries=len(self._entries),
+                bytes=self._bytes,
+            )
+
+    def _remove(self, entry_key: Tuple[str, str, Hashable]) -> None:
+        self._bytes -= self._entries.pop(entry_key).size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+query_cache = QueryCache(max_bytes=QUERY_CACHE_MAX_BYTES, ttl=QUERY_CACHE_TTL_SECONDS)
+disk_cache: Optional[DiskCache] = (
+    DiskCache(QUERY_DISK_CACHE_DIR, QUERY_DISK_CACHE_VERSION, QUERY_DISK_CACHE_TTL_SECONDS)
+    if QUERY_DISK_CACHE_DIR
+    else None
+)
+
+
+_warned_no_stamps = False
+
+
+@query_cache.memoize(f'{__name__}.populate_stamp')
+def populate_stamp(rupture_set_id: str) -> Tuple[bool, Optional[str]]:
+    """
+    Whether the disk tier may be used for the rupture set, and its populate stamp, read once per query cache TTL.
+
+    Without anywhere to keep stamps (see `Backend.get_stamp`) a repopulation can't be seen, so the disk tier is
+    skipped.
+    """
+    global _warned_no_stamps
+    try:
+        return True, get_backend().get_stamp(rupture_set_id)
+    except LookupError as err:
+        if not _warned_no_stamps:
+            log.warning(f'populate_stamp: {err}, the disk cache is not used')
+            _warned_no_stamps = True
+        return False, None
+
+
+def get_records(
+    rupture_set_id: str,
+    table_name: str,
+    keys: Sequence[str],
+    record_type: Callable[..., _R],
+    fetch: Callable[[List[str]], Dict[str, Optional[_R]]],
+) -> Dict[str, Optional[_R]]:
+    """
+    Get the records for the keys from `query_cache`, then `disk_cache` if enabled, then `fetch(missing_keys)`.
+
+    Each tier is filled from the ones below it. `None` records (no such item) are cached in memory, not on disk.
+    """
+    records = query_cache.get_many(rupture_set_id, table_name, keys)
+    missing = [key for key in keys if key not in records]
+
+    disk, stamp = None, None
+    if missing and disk_cache is not None:
+        usable, stamp = populate_stamp(rupture_set_id)
+        disk = disk_cache if usable else None
+    if disk is not None:
+        for key, record in disk.get_many(table_name, rupture_set_id, missing, record_type, stamp).items():
+            records[key] = record
+            query_cache.put(rupture_set_id, table_name, key, record)
+        missing = [key for key in missing if key not in records]
+
+    if missing:
+        found = fetch(missing)
+        for key in missing:
+            records[key] = found.get(key)
+            query_cache.put(rupture_set_id, table_name, key, records[key])
+            if disk is not None and records[key] is not None:
+                disk.put(table_name, rupture_set_id, key, records[key], stamp)
+
+    return {key: records[key] for key in keys}
@@ -0,0 +1,36 @@
+"""
+Conversions of columnar query results to pandas DataFrames and, if `pyarrow` is installed, Arrow tables.
+
+Code columns (e.g. `location_id`) index into a tuple of names, they become categoricals and dictionary arrays.
+"""
+
+from typing import TYPE_CHECKING, Any, Dict, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def to_dataframe(columns: Dict[str, np.ndarray], categories: Dict[str, Sequence[str]]) -> 'pd.DataFrame':
+    import pandas as pd
+
+    data = {
+        name: (pd.Categorical.from_codes(values, categories=categories[name]) if name in categories else values)
+        for name, values in columns.items()
+    }
+    return pd.DataFrame(data, copy=False)
+
+
+def to_arrow(columns: Dict[str, np.ndarray], categories: Dict[str, Sequence[str]]) -> Any:
+    import pyarrow as pa
+
+    data = {
+        name: (
+            pa.DictionaryArray.from_arrays(pa.array(values), pa.array(list(categories[name]), type=pa.string()))
+            if name in categories
+            else pa.array(values)
+        )
+        for name, values in columns.items()
+    }
+    return pa.table(data)
@@ -0,0 +1,115 @@
+"""
+An optional on-disk tier under the in-process `query_cache`, shared by every process on the host.
+
+Records are stored as `.npy` files, one per array field, beside a small JSON file of the other fields, under
+`<directory>/<table_name>@<version>/<rupture_set_id>/<stamp>/`. The JSON file is written last and all files are
+written by atomic rename, so concurrent readers see whole records or none. Arrays are loaded memory-mapped and
+read-only, sharing the page cache between processes. Misses (no such item) are not stored.
+
+The stamp is the rupture set's populate stamp (see `Backend.get_stamp`), changed by the CLI each time it stores
+items, so records stored before a repopulation are not read. Records also expire after
+`SOLVIS_STORE_QUERY_DISK_CACHE_TTL_SECONDS`, by default the in-memory cache TTL.
+
+Set `SOLVIS_STORE_QUERY_DISK_CACHE_DIR` (e.g. `/tmp/solvis_store` on AWS Lambda) to enable it. Change
+`SOLVIS_STORE_QUERY_DISK_CACHE_VERSION` e.g. when the record layout changes, or use `invalidate(rupture_set_id)`.
+See `solvis_store.query.cache.get_records`.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, TypeVar, Union
+from urllib.parse import quote
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+_R = TypeVar('_R')
+
+
+class DiskCache:
+    def __init__(self, directory: Union[str, os.PathLike], version: str = '', ttl: Optional[float] = None) -> None:
+        self.directory = Path(directory)
+        self.version = version
+        self.ttl = ttl
+
+    def _path(self, table_name: str, rupture_set_id: str, stamp: Optional[str]) -> Path:
+        path = self.directory / quote(f'{table_name}@{self.version}', safe='@') / quote(rupture_set_id, safe='')
+        return path / quote(stamp, safe='') if stamp else path
+
+    def get_many(
+        self,
+        table_name: str,
+        rupture_set_id: str,
+        keys: Iterable[str],
+        record_type: Callable[..., _R],
+        stamp: Optional[str] = None,
+    ) -> Dict[str, _R]:
+        """Get the stored records for the keys, omitting those not stored or expired."""
+        path = self._path(table_name, rupture_set_id, stamp)
+        oldest = time.time() - self.ttl if self.ttl is not None else None
+        found: Dict[str, _R] = {}
+        for key in keys:
+            name = quote(key, safe='')
+            try:
+                json_path = path / f'{name}.json'
+                if oldest is not None and json_path.stat().st_mtime < oldest:
+                    continue
+                fields = json.loads(json_path.read_text())
+                if fields is None:  # a miss, as stored by earlier versions
+                    continue
+                for field in fields.pop('_arrays'):
+                    fields[field] = np.load(path / f'{name}.{field}.npy', mmap_mode='r')
+            except (OSError, ValueError) as err:
+                if not isinstance(err, FileNotFoundError):
+                    log.warning(f'DiskCache: ignoring unreadable {rupture_set_id} {key}: {err}')
+                continue
+            found[key] = record_type(**fields)
+        return found
+
+    def put(
+        self, table_name: str, rupture_set_id: str, key: str, record: NamedTuple, stamp: Optional[str] = None
+    ) -> None:
+        path = self._path(table_name, rupture_set_id, stamp)
+        name = quote(key, safe='')
+        try:
+            new = not path.exists()
+            path.mkdir(parents=True, exist_ok=True)
+            if new and stamp:
+                self._prune(path)
+            fields: Dict[str, Any] = {'_arrays': []}
+            for field, value in record._asdict().items():
+                if isinstance(value, np.ndarray):
+                    self._write(path / f'{name}.{field}.npy', lambda f: np.save(f, value, allow_pickle=False))
+                    fields['_arrays'].append(field)
+                else:
+                    fields[field] = value
+            self._write(path / f'{name}.json', lambda f: f.write(json.dumps(fields).encode()))
+        except OSError as err:
+            log.warning(f'DiskCache: could not store {rupture_set_id} {key}: {err}')
+
+    def _prune(self, path: Path) -> None:
+        """Remove the records of the rupture set's earlier stamps, once the first of a new stamp is stored."""
+        for other in path.parent.iterdir():
+            if other.is_dir() and other != path:
+                shutil.rmtree(other, ignore_errors=True)
+
+    def _write(self, target: Path, write: Any) -> None:
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp, target)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def invalidate(self, rupture_set_id: str) -> None:
+        """Remove every stored record of the rupture set, for all tables and versions."""
+        for path in self.directory.glob(f'*/{quote(rupture_set_id, safe="")}'):
+            shutil.rmtree(path, ignore_errors=True)
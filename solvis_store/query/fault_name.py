@@ -1,16 +1,27 @@
 import logging
 from datetime import datetime as dt
-from functools import lru_cache
-from typing import Iterable, Iterator, List, NamedTuple, Set, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, cast
 
-from solvis_store import model
+import numpy as np
+
+from solvis_store.backends import get_backend
 from solvis_store.cloudwatch import ServerlessMetricWriter
-from solvis_store.config import CLOUDWATCH_APP_NAME
+from solvis_store.config import CLOUDWATCH_APP_NAME, FAULT_NAME_TABLE_NAME
+from solvis_store.instrumentation import span
+from solvis_store.records import FaultNameRecord
+
+from . import columnar, id_sets, pages
+from .cache import get_records, query_cache
+from .pages import DEFAULT_LIMIT, Page
+from .prefetch import drop_prefetched, get_fault_name_index
+from .snapshot import get_snapshot
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 log = logging.getLogger(__name__)
 
-# mRLR = model.RuptureSetLocationDistances
-mFNR = model.RuptureSetParentFaultRuptures
+TABLE = 'fault_name'
 
 db_metrics = ServerlessMetricWriter(lambda_name=CLOUDWATCH_APP_NAME, metric_name="MethodDuration")
 # db_metrics_hr = ServerlessMetricWriter(lambda_name=CLOUDWATCH_APP_NAME, metric_name="MethodDuration", resolution=1)
@@ -22,43 +33,124 @@ class RuptureIndexFault(NamedTuple):
     fault_name: str
 
 
-@lru_cache(maxsize=256)
-def query_fn(rupture_set_id: str, fault_names: Tuple[str]) -> List[mFNR]:
+class FaultNameRuptureColumns(NamedTuple):
+    """
+    Aligned arrays of the ruptures on each fault, in fault name order.
+
+    `fault_name` holds int16 codes indexing `fault_names`, `fault_id` is the parent fault id.
+    """
+
+    rupt_id: np.ndarray
+    fault_id: np.ndarray
+    fault_name: np.ndarray
+    fault_names: Tuple[str, ...]
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        return dict(rupt_id=self.rupt_id, fault_id=self.fault_id, fault_name=self.fault_name)
+
+    def to_dataframe(self) -> 'pd.DataFrame':
+        """A DataFrame with `fault_name` as a categorical of the fault names."""
+        return columnar.to_dataframe(self._columns(), dict(fault_name=self.fault_names))
+
+    def to_arrow(self) -> Any:
+        """A `pyarrow.Table` with `fault_name` dictionary encoded, needs `pyarrow`."""
+        return columnar.to_arrow(self._columns(), dict(fault_name=self.fault_names))
+
+
+def fetch_records(rupture_set_id: str, fault_names: Iterable[str]) -> Dict[str, Optional[FaultNameRecord]]:
+    """Get the records for the fault_name keys, from a prefetched index, a snapshot, the caches or batched gets."""
+    keys = list(dict.fromkeys(fault_names))
+    index = get_fault_name_index(rupture_set_id)
+    if index is not None:
+        return index.fault_name_records(keys)
+    snapshot = get_snapshot(rupture_set_id)
+    if snapshot is not None:
+        return snapshot.fault_name_records(keys)
+
+    def fetch(keys: List[str]) -> Dict[str, Optional[FaultNameRecord]]:
+        log.debug(f'fetch_records: {rupture_set_id} {keys}')
+        return cast(Dict[str, Optional[FaultNameRecord]], get_backend().batch_get(TABLE, rupture_set_id, keys))
+
+    return get_records(rupture_set_id, FAULT_NAME_TABLE_NAME, keys, FaultNameRecord, fetch)
+
+
+def query_fn(rupture_set_id: str, fault_names: Tuple[str]) -> List[FaultNameRecord]:
     log.debug(f'query_fn: {rupture_set_id} {fault_names}')
-    items: List[mFNR] = []
-    for fault_name in fault_names:
-        for itm in mFNR.query(rupture_set_id, mFNR.fault_name == fault_name):
-            items.append(itm)
-    return items
+    records = fetch_records(rupture_set_id, fault_names)
+    return [record for record in (records[fault_name] for fault_name in fault_names) if record is not None]
+
 
+def clear_caches() -> None:
+    query_cache.clear()
+    drop_prefetched()
 
-@lru_cache(maxsize=256)
-def get_the_ids(rupture_set_id: str, fault_names: Tuple[str], union: bool) -> Set[int]:
+
+@query_cache.memoize(f'{__name__}.get_the_id_array')
+def get_the_id_array(rupture_set_id: str, fault_names: Tuple[str, ...], union: bool) -> np.ndarray:
+    """get the sorted array of rupture ids matching the query args, unknown fault names are ignored"""
+    records = fetch_records(rupture_set_id, fault_names)
+    arrays = [record.ruptures for record in records.values() if record is not None]
+    rupt_ids = id_sets.union(arrays) if union else id_sets.intersection(arrays)
+
+    log.debug(f'get_the_id_array({fault_names}) returns {len(rupt_ids)} rupture ids')
+    return rupt_ids
+
+
+@span(f'{__name__}.get_the_ids')
+def get_the_ids(rupture_set_id: str, fault_names: Tuple[str, ...], union: bool) -> Set[int]:
     """get the set of rupture ids matching the query args"""
-    first_set = True
-    items = query_fn(rupture_set_id, fault_names)
-    for item in items:
+    return set(get_the_id_array(rupture_set_id, fault_names, union).tolist())
+
+
+def the_columns(rupture_set_id: str, fault_names: Iterable[str], union: bool) -> FaultNameRuptureColumns:
+    """get the columns of ruptures matching the query args, with their parent fault"""
+    fault_names = tuple(dict.fromkeys(fault_names))
+    id_array = get_the_id_array(rupture_set_id, fault_names, union)
+    records = fetch_records(rupture_set_id, fault_names)
+
+    rupt_ids, fault_ids, name_codes = [], [], []
+    for code, fault_name in enumerate(fault_names):
+        item = records[fault_name]
+        if item is None:
+            continue
         log.debug(
-            f'SLR query item: {item} {item.fault_name}, '
-            f'ruptures: {len(item.ruptures)}  examples: {list(item.ruptures)[:10]}'
+            f'SLR query item: {item.fault_name}, '
+            f'ruptures: {len(item.ruptures)}  examples: {item.ruptures[:10].tolist()}'
         )
-        int_rupt_ids = [int(itm) for itm in item.ruptures]
-        if first_set:
-            rupt_ids: Set[int] = set(int_rupt_ids)
-            first_set = False
-            continue
+        rupt_ids.append(item.ruptures[id_sets.contains(id_array, item.ruptures)])
+        fault_ids.append(np.full(len(rupt_ids[-1]), item.fault_id, dtype=np.int32))
+        name_codes.append(np.full(len(rupt_ids[-1]), code, dtype=np.int16))
 
-        if union:
-            rupt_ids = rupt_ids.union(set(int_rupt_ids))
-        else:
-            rupt_ids = rupt_ids.intersection(set(int_rupt_ids))
-        if not union and len(rupt_ids) == 0:
-            log.info('break now, no point querying further')
-            break
-        log.debug(rupt_ids)
+    return FaultNameRuptureColumns(
+        rupt_id=np.concatenate(rupt_ids) if rupt_ids else np.empty(0, dtype=id_sets.ID_DTYPE),
+        fault_id=np.concatenate(fault_ids) if fault_ids else np.empty(0, dtype=np.int32),
+        fault_name=np.concatenate(name_codes) if name_codes else np.empty(0, dtype=np.int16),
+        fault_names=fault_names,
+    )
 
-    log.debug(f'get_the_ids({fault_names}) returns {len(list(rupt_ids))} rupture ids')
-    return rupt_ids
+
+def page_columns(
+    rupture_set_id: str, fault_names: Tuple[str, ...], union: bool, after: Optional[pages.Key], limit: int
+) -> FaultNameRuptureColumns:
+    """get the columns of the rows of the next `limit` matching ruptures after the cursor key, see `pages.id_window`"""
+    id_array = pages.id_window(get_the_id_array(rupture_set_id, fault_names, union), after, limit)
+    records = fetch_records(rupture_set_id, fault_names)
+
+    rupt_ids, fault_ids, name_codes = [], [], []
+    for code, fault_name in enumerate(fault_names):
+        item = records[fault_name]
+        if item is None:
+            continue
+        rupt_ids.append(id_array[id_sets.contains(item.ruptures, id_array)])
+        fault_ids.append(np.full(len(rupt_ids[-1]), item.fault_id, dtype=np.int32))
+        name_codes.append(np.full(len(rupt_ids[-1]), code, dtype=np.int16))
+
+    return FaultNameRuptureColumns(
+        rupt_id=np.concatenate(rupt_ids) if rupt_ids else np.empty(0, dtype=id_sets.ID_DTYPE),
+        fault_id=np.concatenate(fault_ids) if fault_ids else np.empty(0, dtype=np.int32),
+        fault_name=np.concatenate(name_codes) if name_codes else np.empty(0, dtype=np.int16),
+        fault_names=fault_names,
+    )
 
 
 # QUERY operations for the API get endpoint(s)
@@ -70,22 +162,16 @@ def get_fault_name_ruptures(
 
     log.debug(f'get_fault_name_ruptures({fault_names}, union: {union})')
 
-    def filter_ruptures(id_list: Iterable[int]) -> Iterator[RuptureIndexFault]:
-        items = query_fn(rupture_set_id, tuple(fault_names))
-        for item in items:
-            log.debug(
-                f'SLR query item: {item} {item.fault_name}, '
-                f'ruptures: {len(item.ruptures)}  examples: {list(item.ruptures)[:10]}'
-            )
+    def filter_ruptures(columns: FaultNameRuptureColumns) -> Iterator[RuptureIndexFault]:
+        fault_names = columns.fault_names
+        for rupt_id, fault_id, fault_name in zip(
+            columns.rupt_id.tolist(), columns.fault_id.tolist(), columns.fault_name.tolist()
+        ):
+            yield (RuptureIndexFault(rupt_id=rupt_id, fault_id=fault_id, fault_name=fault_names[fault_name]))
 
-            for idx, rupt_id in enumerate(item.ruptures):
-                if int(rupt_id) in id_list:
-                    yield (
-                        RuptureIndexFault(rupt_id=int(rupt_id), fault_id=int(item.fault_id), fault_name=item.fault_name)
-                    )
-
-    filtered_ids: Iterable[int] = get_the_ids(rupture_set_id, tuple(fault_names), union)
-    ruptures = filter_ruptures(filtered_ids)
+    with span(f'{__name__}.filter_ruptures'):
+        columns = the_columns(rupture_set_id, fault_names, union)
+    ruptures = filter_ruptures(columns)
 
     t1 = dt.utcnow()
     db_metrics.put_duration(__name__, 'get_fault_name_ruptures', t1 - t0)
@@ -104,3 +190,87 @@ def get_fault_name_rupture_ids(rupture_set_id: str, fault_names: Iterable[str],
     t1 = dt.utcnow()
     db_metrics.put_duration(__name__, 'get_fault_name_rupture_ids', t1 - t0)
     return ids
+
+
+def get_fault_name_rupture_id_array(rupture_set_id: str, fault_names: Iterable[str], union: bool = False) -> np.ndarray:
+    """As `get_fault_name_rupture_ids`, as a sorted read-only int32 array."""
+    t0 = dt.utcnow()
+
+    log.debug(f'get_fault_name_rupture_id_array({fault_names}, union: {union})')
+
+    ids = get_the_id_array(rupture_set_id, tuple(fault_names), union)
+
+    t1 = dt.utcnow()
+    db_metrics.put_duration(__name__, 'get_fault_name_rupture_id_array', t1 - t0)
+    return ids
+
+
+# QUERY operations for the API get endpoint(s)
+def get_fault_name_rupture_columns(
+    rupture_set_id: str, fault_names: Iterable[str], union: bool = False
+) -> FaultNameRuptureColumns:
+    """As `get_fault_name_ruptures`, as aligned arrays, see `FaultNameRuptureColumns`."""
+    t0 = dt.utcnow()
+
+    log.debug(f'get_fault_name_rupture_columns({fault_names}, union: {union})')
+
+    columns = the_columns(rupture_set_id, fault_names, union)
+
+    t1 = dt.utcnow()
+    db_metrics.put_duration(__name__, 'get_fault_name_rupture_columns', t1 - t0)
+    return columns
+
+
+def get_fault_name_rupture_page(
+    rupture_set_id: str,
+    fault_names: Iterable[str],
+    union: bool = False,
+    order: str = 'rupt_id',
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+) -> Page:
+    """
+    Get a page of up to `limit` of the `get_fault_name_ruptures`, after the `cursor` of the previous page.
+
+    The only `order` is `rupt_id` (then fault name). The page's cursor is None after the last page. See
+    `solvis_store.query.pages`.
+    """
+    t0 = dt.utcnow()
+
+    log.debug(f'get_fault_name_rupture_page({fault_names}, union: {union}, {order}, {limit}, {cursor})')
+
+    pages.check_args(order, limit, orders=('rupt_id',))
+    after = pages.decode_cursor(cursor, order)
+    columns = page_columns(rupture_set_id, tuple(dict.fromkeys(fault_names)), union, after, limit + 1)
+    keys = [columns.rupt_id, columns.fault_name]
+    rows = pages.page_rows(keys, after, limit + 1)
+    next_cursor = pages.page_cursor(order, keys, rows[limit - 1]) if len(rows) > limit else None
+    rows = rows[:limit]
+    ruptures = [
+        RuptureIndexFault(rupt_id=rupt_id, fault_id=fault_id, fault_name=columns.fault_names[fault_name])
+        for rupt_id, fault_id, fault_name in zip(
+            columns.rupt_id[rows].tolist(), columns.fault_id[rows].tolist(), columns.fault_name[rows].tolist()
+        )
+    ]
+
+    t1 = dt.utcnow()
+    db_metrics.put_duration(__name__, 'get_fault_name_rupture_page', t1 - t0)
+    return Page(ruptures, next_cursor)
+
+
+def iter_fault_name_rupture_pages(
+    rupture_set_id: str,
+    fault_names: Iterable[str],
+    union: bool = False,
+    order: str = 'rupt_id',
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+) -> Iterator[Page]:
+    """Get the pages of `get_fault_name_rupture_page` from the cursor on, each when it is asked for."""
+    fault_names = tuple(fault_names)
+    while True:
+        page = get_fault_name_rupture_page(rupture_set_id, fault_names, union, order, limit, cursor)
+        yield page
+        if page.cursor is None:
+            return
+        cursor = page.cursor
@@ -0,0 +1,75 @@
+"""
+Set algebra over rupture ids held as sorted, unique int32 NumPy arrays.
+
+Intersections probe the smallest operand into the others with `searchsorted`, unions use a dense bitmap
+sized to the largest rupture id when that is cheaper than sorting the concatenated ids.
+"""
+
+from typing import Iterable
+
+import numpy as np
+
+ID_DTYPE = np.int32
+
+# use a bitmap for unions when it has no more than this many slots per id in the operands
+BITMAP_DENSITY = 8
+
+
+def sorted_ids(ids: Iterable[int]) -> np.ndarray:
+    """The ids as a sorted, unique int32 array, without copying arrays that already are."""
+    arr = ids if isinstance(ids, np.ndarray) else np.fromiter(ids, dtype=ID_DTYPE)
+    arr = arr.astype(ID_DTYPE, copy=False)
+    if arr.size > 1 and not np.all(arr[1:] > arr[:-1]):
+        arr = np.unique(arr)
+    return arr
+
+
+def contains(haystack: np.ndarray, needles: np.ndarray) -> np.ndarray:
+    """A mask of the needles present in the sorted haystack, like `np.isin` without sorting the haystack."""
+    if haystack.size == 0:
+        return np.zeros(needles.size, dtype=bool)
+    idx = np.searchsorted(haystack, needles)
+    idx[idx == haystack.size] = 0
+    return haystack[idx] == needles
+
+
+def intersection(arrays: Iterable[np.ndarray]) -> np.ndarray:
+    """The ids in every one of the sorted id arrays, or an empty array if there are none."""
+    operands = sorted((sorted_ids(arr) for arr in arrays), key=len)
+    if not operands:
+        return np.empty(0, dtype=ID_DTYPE)
+    result = operands[0]
+    for arr in operands[1:]:
+        if result.size == 0:
+            break
+        result = result[contains(arr, result)]
+    return result
+
+
+def union(arrays: Iterable[np.ndarray]) -> np.ndarray:
+    """The ids in any of the sorted id arrays."""
+    operands = [sorted_ids(arr) for arr in arrays]
+    operands = [arr for arr in operands if arr.size]
+    if not operands:
+        return np.empty(0, dtype=ID_DTYPE)
+    if len(operands) == 1:
+        return operands[0]
+
+    total = sum(arr.size for arr in operands)
+    max_id = max(int(arr[-1]) for arr in operands)
+    if min(int(arr[0]) for arr in operands) >= 0 and max_id < BITMAP_DENSITY * total:
+        bitmap = np.zeros(max_id + 1, dtype=bool)
+        for arr in operands:
+            bitmap[arr] = True
+        return np.flatnonzero(bitmap).astype(ID_DTYPE)
+    return np.unique(np.concatenate(operands))
+
+
+def any_of(ids: np.ndarray, arrays: Iterable[np.ndarray]) -> np.ndarray:
+    """The ids present in any of the sorted id arrays, without building their union."""
+    found = np.zeros(ids.size, dtype=bool)
+    for arr in arrays:
+        if found.all():
+            break
+        found[~found] = contains(sorted_ids(arr), ids[~found])
+    return ids[found]
@@ -0,0 +1,268 @@
+"""
+The ruptures within radius of locations that are also on parent faults, e.g. within 50 km of WLG and on the
+Wellington fault.
+
+The location_radius and fault_name records are fetched together, the fault names in a worker thread, so a query
+that misses the caches waits for one round trip to the backend rather than two in turn. The rupture ids are
+intersected straight from the records, smallest first and stopping once nothing is left, then joined to the
+distances and fault ids of the matching rows. Neither side's ids are built as a set or cached on their own.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime as dt
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+from solvis_store.cloudwatch import ServerlessMetricWriter
+from solvis_store.config import CLOUDWATCH_APP_NAME
+from solvis_store.instrumentation import span
+from solvis_store.records import FaultNameRecord
+
+from . import columnar, fault_name, id_sets, location_radius
+from .cache import query_cache
+from .prefetch import get_fault_name_index
+from .snapshot import get_snapshot
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+log = logging.getLogger(__name__)
+
+FETCH_WORKERS = 4
+
+_L = TypeVar('_L')
+
+db_metrics = ServerlessMetricWriter(lambda_name=CLOUDWATCH_APP_NAME, metric_name="MethodDuration")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+class LocationFaultRuptureColumns(NamedTuple):
+    """
+    Aligned arrays of the ruptures within radius of each location and on each fault, in location, fault then
+    rupture order, one row for each (rupture, location, fault) match.
+
+    `location_id` holds int16 codes indexing `locations`, `fault_name` int16 codes indexing `fault_names`,
+    `fault_id` is the parent fault id.
+    """
+
+    rupt_id: np.ndarray
+    location_id: np.ndarray
+    distance: np.ndarray
+    fault_id: np.ndarray
+    fault_name: np.ndarray
+    locations: Tuple[str, ...]
+    fault_names: Tuple[str, ...]
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        return dict(
+            rupt_id=self.rupt_id,
+            location_id=self.location_id,
+            distance=self.distance,
+            fault_id=self.fault_id,
+            fault_name=self.fault_name,
+        )
+
+    def _categories(self) -> Dict[str, Sequence[str]]:
+        return dict(location_id=self.locations, fault_name=self.fault_names)
+
+    def to_dataframe(self) -> 'pd.DataFrame':
+        """A DataFrame with `location_id` and `fault_name` as categoricals."""
+        return columnar.to_dataframe(self._columns(), self._categories())
+
+    def to_arrow(self) -> Any:
+        """A `pyarrow.Table` with `location_id` and `fault_name` dictionary encoded, needs `pyarrow`."""
+        return columnar.to_arrow(self._columns(), self._categories())
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='location_fault')
+        return _executor
+
+
+def fetch_together(
+    rupture_set_id: str, fetch_locations: Callable[[], _L], fault_names: Sequence[str]
+) -> Tuple[_L, Dict[str, Optional[FaultNameRecord]]]:
+    """Get the location radius results of `fetch_locations()`, and the fault_name records, at the same time."""
+    if get_snapshot(rupture_set_id) is not None or get_fault_name_index(rupture_set_id) is not None:
+        # the fault names are in memory, there is no round trip to overlap
+        return fetch_locations(), fault_name.fetch_records(rupture_set_id, fault_names)
+
+    future = _get_executor().submit(fault_name.fetch_records, rupture_set_id, fault_names)
+    return fetch_locations(), future.result()
+
+
+def matching_ids(
+    location_arrays: List[np.ndarray], fault_arrays: List[np.ndarray], location_union: bool, fault_union: bool
+) -> np.ndarray:
+    """
+    The sorted ids within radius of the locations and on the faults, each side an intersection or a union.
+
+    The intersected arrays go first, smallest first. A union side then filters those ids with `id_sets.any_of`,
+    so it is only built when both sides are unions.
+    """
+    if not location_arrays or not fault_arrays:
+        return np.empty(0, dtype=id_sets.ID_DTYPE)
+
+    sides = [(location_arrays, location_union), (fault_arrays, fault_union)]
+    intersected = [arr for arrays, union in sides if not union for arr in arrays]
+    unions = sorted((arrays for arrays, union in sides if union), key=lambda arrays: sum(len(a) for a in arrays))
+    ids = id_sets.intersection(intersected) if intersected else id_sets.union(unions.pop(0))
+    for arrays in unions:
+        if ids.size == 0:
+            break
+        ids = id_sets.any_of(ids, arrays)
+    return ids
+
+
+def record_ids(
+    location_ids: Dict[str, Optional[np.ndarray]],
+    fault_records: Dict[str, Optional[FaultNameRecord]],
+    location_union: bool,
+    fault_union: bool,
+) -> np.ndarray:
+    """
+    The matching ids of the records, see `matching_ids`.
+
+    As for the single kind queries, a missing location empties an intersection, unknown fault names are ignored.
+    """
+    location_arrays = [arr for arr in location_ids.values() if arr is not None]
+    if not location_union and len(location_arrays) < len(location_ids):
+        return np.empty(0, dtype=id_sets.ID_DTYPE)
+    fault_arrays = [record.ruptures for record in fault_records.values() if record is not None]
+    return matching_ids(location_arrays, fault_arrays, location_union, fault_union)
+
+
+@query_cache.memoize(f'{__name__}.get_the_id_array')
+def get_the_id_array(
+    rupture_set_id: str,
+    locations: Tuple[str, ...],
+    radius: float,
+    fault_names: Tuple[str, ...],
+    location_union: bool,
+    fault_union: bool,
+) -> np.ndarray:
+    """get the sorted array of rupture ids matching the query args, read without the distances"""
+    location_ids, fault_records = fetch_together(
+        rupture_set_id, lambda: location_radius.location_rupture_ids(rupture_set_id, locations, radius), fault_names
+    )
+    rupt_ids = record_ids(location_ids, fault_records, location_union, fault_union)
+    log.debug(f'get_the_id_array({locations}, {radius}, {fault_names}) returns {len(rupt_ids)} rupture ids')
+    return rupt_ids
+
+
+def the_columns(
+    rupture_set_id: str,
+    locations: Iterable[str],
+    radius: float,
+    fault_names: Iterable[str],
+    location_union: bool,
+    fault_union: bool,
+) -> LocationFaultRuptureColumns:
+    """get the columns of ruptures matching the query args, with their distance and parent fault"""
+    locations = tuple(dict.fromkeys(locations))
+    fault_names = tuple(dict.fromkeys(fault_names))
+    location_records, fault_records = fetch_together(
+        rupture_set_id, lambda: location_radius.location_records(rupture_set_id, locations, radius), fault_names
+    )
+    location_ids = {key: None if record is None else record.ruptures for key, record in location_records.items()}
+    ids = record_ids(location_ids, fault_records, location_union, fault_union)
+
+    # the matching ruptures of each fault, sorted
+    faults = []
+    for code, name in enumerate(fault_names):
+        record = fault_records[name]
+        if record is not None and ids.size:
+            on_fault = id_sets.sorted_ids(record.ruptures)
+            faults.append((code, record.fault_id, on_fault[id_sets.contains(ids, on_fault)]))
+
+    rupt_ids, location_ids, distances, fault_ids, name_codes = [], [], [], [], []
+    for location_id, loc in enumerate(locations):
+        record = location_records[f"{loc}:{radius}"]
+        if record is None:
+            continue
+        for code, fault_id, on_fault in faults:
+            mask = id_sets.contains(on_fault, record.ruptures)
+            rupt_ids.append(record.ruptures[mask])
+            distances.append(record.distances[mask])
+            location_ids.append(np.full(len(rupt_ids[-1]), location_id, dtype=np.int16))
+            fault_ids.append(np.full(len(rupt_ids[-1]), fault_id, dtype=np.int32))
+            name_codes.append(np.full(len(rupt_ids[-1]), code, dtype=np.int16))
+
+    return LocationFaultRuptureColumns(
+        rupt_id=np.concatenate(rupt_ids) if rupt_ids else np.empty(0, dtype=id_sets.ID_DTYPE),
+        location_id=np.concatenate(location_ids) if location_ids else np.empty(0, dtype=np.int16),
+        distance=np.concatenate(distances) if distances else np.empty(0, dtype=np.float32),
+        fault_id=np.concatenate(fault_ids) if fault_ids else np.empty(0, dtype=np.int32),
+        fault_name=np.concatenate(name_codes) if name_codes else np.empty(0, dtype=np.int16),
+        locations=locations,
+        fault_names=fault_names,
+    )
+
+
+def clear_caches() -> None:
+    query_cache.clear()
+
+
+# QUERY operations for the API get endpoint(s)
+def get_location_fault_rupture_columns(
+    rupture_set_id: str,
+    locations: Iterable[str],
+    radius: float,
+    fault_names: Iterable[str],
+    location_union: bool = False,
+    fault_union: bool = False,
+) -> LocationFaultRuptureColumns:
+    """
+    Get the ruptures within radius of the locations and on the faults, with their distances and parent faults.
+
+    Each side is an intersection unless its `*_union`, as for `get_location_radius_ruptures` and
+    `get_fault_name_ruptures`. See `LocationFaultRuptureColumns`.
+    """
+    t0 = dt.utcnow()
+
+    log.debug(
+        f'get_location_fault_rupture_columns({locations}, {radius}, {fault_names}, '
+        f'location_union: {location_union}, fault_union: {fault_union})'
+    )
+
+    with span(f'{__name__}.the_columns'):
+        columns = the_columns(rupture_set_id, locations, radius, fault_names, location_union, fault_union)
+
+    t1 = dt.utcnow()
+    db_metrics.put_duration(__name__, 'get_location_fault_rupture_columns', t1 - t0)
+    return columns
+
+
+def get_location_fault_rupture_id_array(
+    rupture_set_id: str,
+    locations: Iterable[str],
+    radius: float,
+    fault_names: Iterable[str],
+    location_union: bool = False,
+    fault_union: bool = False,
+) -> np.ndarray:
+    """As `get_location_fault_rupture_columns`, the sorted read-only int32 array of the rupture ids."""
+    t0 = dt.utcnow()
+
+    log.debug(f'get_location_fault_rupture_id_array({locations}, {radius}, {fault_names})')
+
+    ids = get_the_id_array(
+        rupture_set_id,
+        tuple(dict.fromkeys(locations)),
+        radius,
+        tuple(dict.fromkeys(fault_names)),
+        location_union,
+        fault_union,
+    )
+
+    t1 = dt.utcnow()
+    db_metrics.put_duration(__name__, 'get_location_fault_rupture_id_array', t1 - t0)
+    return ids
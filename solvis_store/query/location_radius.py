@@ -1,15 +1,32 @@
 import logging
 from datetime import datetime as dt
-from functools import lru_cache
-from typing import Iterable, Iterator, NamedTuple, Set, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, cast
 
-from solvis_store import model
+import numpy as np
+
+from solvis_store.backends import get_backend
 from solvis_store.cloudwatch import ServerlessMetricWriter
-from solvis_store.config import CLOUDWATCH_APP_NAME
+from solvis_store.config import CLOUDWATCH_APP_NAME, LOCATION_RADIUS_TABLE_NAME
+from solvis_store.instrumentation import span
+from solvis_store.records import RADII, LocationRadiusRecord, RuptureIdsRecord, is_nearest_key, radius_cut
+
+from . import columnar, id_sets, pages
+from .cache import get_records, query_cache
+from .pages import DEFAULT_LIMIT, Page
+from .snapshot import get_snapshot
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 log = logging.getLogger(__name__)
 
-mRLR = model.RuptureSetLocationDistances
+TABLE = 'location_radius'
+
+# the query and disk cache namespace of the rupture ids read without distances
+IDS_NAMESPACE = f'{LOCATION_RADIUS_TABLE_NAME}.ids'
+
+# the query cache namespace noting a rupture set has nearest items, see `location_rupture_ids`
+NEAREST_NAMESPACE = f'{__name__}.has_nearest_items'
 
 db_metrics = ServerlessMetricWriter(lambda_name=CLOUDWATCH_APP_NAME, metric_name="MethodDuration")
 # db_metrics_hr = ServerlessMetricWriter(lambda_name=CLOUDWATCH_APP_NAME, metric_name="MethodDuration", resolution=1)
@@ -21,48 +38,320 @@ class RuptureIndexLocationDistance(NamedTuple):
     distance: float = float('nan')
 
 
-@lru_cache(maxsize=256)
-def query_fn(rupture_set_id, loc, radius):
-    return [i for i in mRLR.query(f'{rupture_set_id}', mRLR.location_radius == (f"{loc}:{radius}"))]
+class LocationRadiusRuptureColumns(NamedTuple):
+    """
+    Aligned arrays of the ruptures within radius of each location, in location order.
+
+    `location_id` holds int16 codes indexing `locations`.
+    """
+
+    rupt_id: np.ndarray
+    location_id: np.ndarray
+    distance: np.ndarray
+    locations: Tuple[str, ...]
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        return dict(rupt_id=self.rupt_id, location_id=self.location_id, distance=self.distance)
+
+    def to_dataframe(self) -> 'pd.DataFrame':
+        """A DataFrame with `location_id` as a categorical of the location codes."""
+        return columnar.to_dataframe(self._columns(), dict(location_id=self.locations))
+
+    def to_arrow(self) -> Any:
+        """A `pyarrow.Table` with `location_id` dictionary encoded, needs `pyarrow`."""
+        return columnar.to_arrow(self._columns(), dict(location_id=self.locations))
+
+
+def fetch_records(rupture_set_id: str, location_radii: Iterable[str]) -> Dict[str, Optional[LocationRadiusRecord]]:
+    """Get the records for the location_radius keys, from a snapshot, the caches or with batched gets."""
+    keys = list(dict.fromkeys(location_radii))
+    snapshot = get_snapshot(rupture_set_id)
+    if snapshot is not None:
+        return snapshot.location_radius_records(keys)
+
+    def fetch(keys: List[str]) -> Dict[str, Optional[LocationRadiusRecord]]:
+        log.debug(f'fetch_records: {rupture_set_id} {keys}')
+        return cast(Dict[str, Optional[LocationRadiusRecord]], get_backend().batch_get(TABLE, rupture_set_id, keys))
+
+    return get_records(rupture_set_id, LOCATION_RADIUS_TABLE_NAME, keys, LocationRadiusRecord, fetch)
+
+
+def location_records(
+    rupture_set_id: str, locations: Iterable[str], radius: float
+) -> Dict[str, Optional[LocationRadiusRecord]]:
+    """
+    Get the records of the ruptures within radius of each location, keyed `<location>:<radius>`.
+
+    An item stored for the exact radius is used if there is one, otherwise the ruptures are cut from the
+    location's nearest item (see `solvis_store.records.radius_cut`) if it reaches that far. Both are fetched
+    together, so any radius up to the nearest item radius costs no more requests than a stored radius.
+    """
+    locations = list(dict.fromkeys(locations))
+    keys = {loc: f"{loc}:{radius}" for loc in locations}
+    fetched = fetch_records(rupture_set_id, [*keys.values(), *locations])
+
+    records: Dict[str, Optional[LocationRadiusRecord]] = {}
+    for loc, key in keys.items():
+        record, nearest = fetched[key], fetched[loc]
+        if record is None and nearest is not None and nearest.radius is not None and radius <= nearest.radius:
+            record = radius_cut(nearest, key, radius)
+        records[key] = record
+    return records
+
+
+def fetch_rupture_ids(rupture_set_id: str, location_radii: Iterable[str]) -> Dict[str, Optional[np.ndarray]]:
+    """
+    Get just the rupture ids for the location_radius keys, reading the items without their distances.
+
+    From a snapshot, or records already in `query_cache` with their distances, otherwise from the ids cached under
+    `IDS_NAMESPACE`, or fetched with `Backend.batch_get_ids`.
+    """
+    keys = list(dict.fromkeys(location_radii))
+    snapshot = get_snapshot(rupture_set_id)
+    if snapshot is not None:
+        return {
+            key: None if rec is None else rec.ruptures for key, rec in snapshot.location_radius_records(keys).items()
+        }
+
+    ids = {
+        key: None if record is None else record.ruptures
+        for key, record in query_cache.get_many(rupture_set_id, LOCATION_RADIUS_TABLE_NAME, keys).items()
+    }
+    missing = [key for key in keys if key not in ids]
+    if missing:
+
+        def fetch(keys: List[str]) -> Dict[str, Optional[RuptureIdsRecord]]:
+            log.debug(f'fetch_rupture_ids: {rupture_set_id} {keys}')
+            return cast(Dict[str, Optional[RuptureIdsRecord]], get_backend().batch_get_ids(TABLE, rupture_set_id, keys))
+
+        for key, record in get_records(rupture_set_id, IDS_NAMESPACE, missing, RuptureIdsRecord, fetch).items():
+            ids[key] = None if record is None else record.ruptures
+    return {key: ids[key] for key in keys}
+
+
+def location_rupture_ids(
+    rupture_set_id: str, locations: Iterable[str], radius: float
+) -> Dict[str, Optional[np.ndarray]]:
+    """
+    As `location_records`, just the rupture ids in Rupture Index order.
+
+    At one of `RADII` the items stored for the radius are read without their distances (see `fetch_rupture_ids`),
+    together with the nearest items, in one batch. The ids of a location with only a nearest item are cut from its
+    record, read again with the distances. Then the rupture set is taken to have nearest items (see
+    `has_nearest_items`), so later queries read the records with their distances in one batch to begin with. Other
+    radii read the records with their distances.
+    """
+    locations = list(dict.fromkeys(locations))
+    keys = {loc: f"{loc}:{radius}" for loc in locations}
+    ids: Dict[str, Optional[np.ndarray]] = {}
+    if radius in RADII and not has_nearest_items(rupture_set_id):
+        fetched = fetch_rupture_ids(rupture_set_id, [*keys.values(), *locations])
+        ids = {key: fetched[key] for loc, key in keys.items() if fetched[key] is not None or fetched[loc] is None}
+        if len(ids) < len(keys):
+            query_cache.put(rupture_set_id, NEAREST_NAMESPACE, (), True)
+    rest = [loc for loc, key in keys.items() if key not in ids]
+    if rest:
+        for key, record in location_records(rupture_set_id, rest, radius).items():
+            ids[key] = None if record is None else record.ruptures
+    return {key: ids[key] for key in keys.values()}
+
+
+def has_nearest_items(rupture_set_id: str) -> bool:
+    """Has an id query found a location of the rupture set with only a nearest item, within the cache TTL."""
+    return bool(query_cache.get_many(rupture_set_id, NEAREST_NAMESPACE, [()]))
+
+
+def query_fn(rupture_set_id, loc, radius) -> List[LocationRadiusRecord]:
+    record = location_records(rupture_set_id, [loc], radius)[f"{loc}:{radius}"]
+    return [record] if record is not None else []
+
+
+def clear_caches() -> None:
+    query_cache.clear()
+
+
+@query_cache.memoize(f'{__name__}.get_the_id_array')
+def get_the_id_array(rupture_set_id: str, locations: Tuple[str, ...], radius: int, union: bool) -> np.ndarray:
+    """get the sorted array of rupture ids matching the query args, read without the distances"""
+    ids = location_rupture_ids(rupture_set_id, locations, radius)
+    arrays = [arr for arr in ids.values() if arr is not None]
+    if union:
+        rupt_ids = id_sets.union(arrays)
+    elif len(arrays) < len(ids):
+        rupt_ids = np.empty(0, dtype=id_sets.ID_DTYPE)
+    else:
+        rupt_ids = id_sets.intersection(arrays)
+
+    log.debug(f'get_the_id_array({locations}) returns {len(rupt_ids)} rupture ids')
+    return rupt_ids
 
 
-@lru_cache(maxsize=256)
-def get_the_ids(rupture_set_id: str, locations: Tuple[str], radius: int, union: bool) -> Set[int]:
+@span(f'{__name__}.get_the_ids')
+def get_the_ids(rupture_set_id: str, locations: Tuple[str, ...], radius: int, union: bool) -> Set[int]:
     """get the set of rupture ids matching the query args"""
-    first_set = True
-    rupt_ids = set()
-    for loc in locations:
-        items = query_fn(rupture_set_id, loc, radius)
-
-        assert len(items) in [0, 1]
-
-        if len(items) == 0 and not union:
-            return set()
-
-        for item in items:
-            log.debug(
-                f'SLR query item: {item} {item.location_radius}, '
-                f'ruptures: {len(item.ruptures)}  examples: {list(item.ruptures)[:10]}'
+    return set(get_the_id_array(rupture_set_id, locations, radius, union).tolist())
+
+
+def the_columns(
+    rupture_set_id: str, locations: Sequence[str], radius: int, union: bool
+) -> LocationRadiusRuptureColumns:
+    """get the columns of ruptures matching the query args, with their distance from each location"""
+    locations = tuple(dict.fromkeys(locations))
+    # the records first, so the ids are taken from the cached records rather than read again
+    records = location_records(rupture_set_id, locations, radius)
+    id_array = get_the_id_array(rupture_set_id, locations, radius, union)
+
+    rupt_ids, location_ids, distances = [], [], []
+    for location_id, loc in enumerate(locations):
+        item = records[f"{loc}:{radius}"]
+        if item is None:
+            continue
+        log.debug(
+            f'SLR query item: {item.location_radius}, '
+            f'ruptures: {len(item.ruptures)}  examples: {item.ruptures[:10].tolist()}'
+        )
+        mask = id_sets.contains(id_array, item.ruptures)
+        rupt_ids.append(item.ruptures[mask])
+        distances.append(item.distances[mask])
+        location_ids.append(np.full(len(rupt_ids[-1]), location_id, dtype=np.int16))
+
+    return LocationRadiusRuptureColumns(
+        rupt_id=np.concatenate(rupt_ids) if rupt_ids else np.empty(0, dtype=id_sets.ID_DTYPE),
+        location_id=np.concatenate(location_ids) if location_ids else np.empty(0, dtype=np.int16),
+        distance=np.concatenate(distances) if distances else np.empty(0, dtype=np.float32),
+        locations=locations,
+    )
+
+
+@query_cache.memoize(f'{__name__}.by_distance')
+def by_distance(rupture_set_id: str, loc: str, radius: float) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """The distances and rupture ids of the location's radius record, sorted by distance then rupture id."""
+    record = location_records(rupture_set_id, [loc], radius)[f"{loc}:{radius}"]
+    if record is None:
+        return None
+    order = np.lexsort((record.ruptures, record.distances))
+    return record.distances[order], record.ruptures[order]
+
+
+def page_columns(
+    rupture_set_id: str,
+    locations: Tuple[str, ...],
+    radius: int,
+    union: bool,
+    order: str,
+    after: Optional[pages.Key],
+    limit: int,
+) -> LocationRadiusRuptureColumns:
+    """
+    get the columns of the rows that may be among the `limit` after the cursor key, see `pages.page_rows`
+
+    In rupture id order those are the rows of the next `limit` matching ruptures (`pages.id_window`), each
+    location's rows in rupture id order. In distance order they are the next `limit` matching rows of each location,
+    from its rows sorted by distance (`by_distance`), so a page touches about `limit` rows per location however many
+    rows match.
+    """
+    records = location_records(rupture_set_id, locations, radius)
+    id_array = get_the_id_array(rupture_set_id, locations, radius, union)
+    if order == 'rupt_id':
+        id_array = pages.id_window(id_array, after, limit)
+
+    rupt_ids, location_ids, distances = [], [], []
+    for location_id, loc in enumerate(locations):
+        item = records[f"{loc}:{radius}"]
+        if item is None:
+            continue
+        if order == 'distance':
+            sorted_item = by_distance(rupture_set_id, loc, radius)
+            assert sorted_item is not None
+            item_distances, item_ruptures = sorted_item
+            start = 0
+            if after is not None:
+                # this location's rows with the cursor's distance and rupture id come after it if its code does
+                side = 'left' if location_id > after[2] else 'right'
+                start = pages.key_position([item_distances, item_ruptures], after[:2], side)
+            rows = pages.sorted_window(
+                start, len(item_ruptures), limit, lambda rows: id_sets.contains(id_array, item_ruptures[rows])
             )
-
-            if first_set:
-                rupt_ids = set(item.ruptures)
-                first_set = False
-                continue
-
-            if union:
-                rupt_ids = rupt_ids.union(set(item.ruptures))
-            else:
-                rupt_ids = rupt_ids.intersection(set(item.ruptures))
-
-            if not union and len(rupt_ids) == 0:
-                log.info('break now, no point querying further')
-                break
-
-            log.debug(rupt_ids)
-
-    log.debug(f'get_the_rupt_ids({locations}) returns {len(list(rupt_ids))} rupture ids')
-    return rupt_ids
+            rupt_ids.append(item_ruptures[rows])
+            distances.append(item_distances[rows])
+        else:
+            # the radius items are in Rupture Index order
+            found = id_array[id_sets.contains(item.ruptures, id_array)]
+            rupt_ids.append(found)
+            distances.append(item.distances[np.searchsorted(item.ruptures, found)])
+        location_ids.append(np.full(len(rupt_ids[-1]), location_id, dtype=np.int16))
+
+    return LocationRadiusRuptureColumns(
+        rupt_id=np.concatenate(rupt_ids) if rupt_ids else np.empty(0, dtype=id_sets.ID_DTYPE),
+        location_id=np.concatenate(location_ids) if location_ids else np.empty(0, dtype=np.int16),
+        distance=np.concatenate(distances) if distances else np.empty(0, dtype=np.float32),
+        locations=locations,
+    )
+
+
+def widest_records(rupture_set_id: str, locations: Iterable[str]) -> Dict[str, Optional[LocationRadiusRecord]]:
+    """
+    Get the record with the most ruptures for each location, keyed by location.
+
+    That is the location's nearest item if there is one, otherwise the item for the largest of `RADII`.
+    """
+    locations = list(dict.fromkeys(locations))
+    fetched = fetch_records(rupture_set_id, [*locations, *(f"{loc}:{max(RADII)}" for loc in locations)])
+    return {loc: fetched[loc] or fetched[f"{loc}:{max(RADII)}"] for loc in locations}
+
+
+def k_nearest(record: LocationRadiusRecord, k: int, max_distance: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """The k closest ruptures of the record, within max_distance, and their distances, in distance order."""
+    ruptures, distances = record.ruptures, record.distances
+    if is_nearest_key(record.location_radius):
+        # already in distance order
+        count = len(distances) if max_distance is None else int(np.searchsorted(distances, max_distance, 'left'))
+        count = min(k, count)
+        return ruptures[:count], distances[:count]
+    if max_distance is not None:
+        within = distances < max_distance
+        ruptures, distances = ruptures[within], distances[within]
+    if k < len(distances):
+        closest = np.argpartition(distances, k - 1)[:k]
+        ruptures, distances = ruptures[closest], distances[closest]
+    order = np.lexsort((ruptures, distances))
+    return ruptures[order], distances[order]
+
+
+def nearest_columns(
+    rupture_set_id: str, locations: Sequence[str], k: int, max_distance: Optional[float], union: bool
+) -> LocationRadiusRuptureColumns:
+    """get the columns of the k closest ruptures to each location, or of all the locations if union"""
+    locations = tuple(dict.fromkeys(locations))
+    records = widest_records(rupture_set_id, locations)
+
+    rupt_ids, location_ids, distances = [], [], []
+    for location_id, loc in enumerate(locations):
+        record = records[loc]
+        if record is None or k <= 0:
+            continue
+        ruptures, rupture_distances = k_nearest(record, k, max_distance)
+        rupt_ids.append(ruptures)
+        distances.append(rupture_distances)
+        location_ids.append(np.full(len(ruptures), location_id, dtype=np.int16))
+
+    rupt_id = np.concatenate(rupt_ids) if rupt_ids else np.empty(0, dtype=id_sets.ID_DTYPE)
+    location_id = np.concatenate(location_ids) if location_ids else np.empty(0, dtype=np.int16)
+    distance = np.concatenate(distances) if distances else np.empty(0, dtype=np.float32)
+
+    if union and len(rupt_id):
+        # each rupture at its closest location, then the k closest of those. Any of the overall k closest
+        # is among the k closest to its closest location, so the per location results are enough.
+        order = np.lexsort((location_id, distance, rupt_id))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = rupt_id[order][1:] != rupt_id[order][:-1]
+        order = order[first]
+        order = order[np.lexsort((rupt_id[order], distance[order]))][:k]
+        rupt_id, location_id, distance = rupt_id[order], location_id[order], distance[order]
+
+    return LocationRadiusRuptureColumns(
+        rupt_id=rupt_id, location_id=location_id, distance=distance, locations=locations
+    )
 
 
 # QUERY operations for the API get endpoint(s)
@@ -74,26 +363,16 @@ def get_location_radius_ruptures(
 
     log.debug(f'get_location_radius_rupture_ids({locations}, {radius}, union: {union})')
 
-    def filter_ruptures(id_list: Iterable[int]) -> Iterator[RuptureIndexLocationDistance]:
-        for loc in locations:
-            items = query_fn(rupture_set_id, loc, radius)
-            for item in items:
-                log.debug(
-                    f'SLR query item: {item} {item.location_radius}, '
-                    f'ruptures: {len(item.ruptures)}  examples: {list(item.ruptures)[:10]}'
-                )
-                # if not mapping.get(loc):
-                #     mapping[loc] = list()
-
-                # location = mapping.get(loc)
-                distances = list(item.distances)
-                for idx, rupt_id in enumerate(item.ruptures):
-                    if rupt_id in id_list:
-                        yield (RuptureIndexLocationDistance(rupt_id=rupt_id, location_id=loc, distance=distances[idx]))
+    def filter_ruptures(columns: LocationRadiusRuptureColumns) -> Iterator[RuptureIndexLocationDistance]:
+        locations = columns.locations
+        for rupt_id, location_id, distance in zip(
+            columns.rupt_id.tolist(), columns.location_id.tolist(), columns.distance.tolist()
+        ):
+            yield (RuptureIndexLocationDistance(rupt_id=rupt_id, location_id=locations[location_id], distance=distance))
 
-    filtered_ids = get_the_ids(rupture_set_id, locations, radius, union)
-
-    ruptures = filter_ruptures(filtered_ids)
+    with span(f'{__name__}.filter_ruptures'):
+        columns = the_columns(rupture_set_id, locations, radius, union)
+    ruptures = filter_ruptures(columns)
 
     t1 = dt.utcnow()
     db_metrics.put_duration(__name__, 'get_location_radius_ruptures', t1 - t0)
@@ -114,3 +393,141 @@ def get_location_radius_rupture_ids(
     t1 = dt.utcnow()
     db_metrics.put_duration(__name__, 'get_location_radius_rupture_ids', t1 - t0)
     return ids
+
+
+def get_location_radius_rupture_id_array(
+    rupture_set_id: str, locations: Tuple[str], radius: int, union: bool = False
+) -> np.ndarray:
+    """As `get_location_radius_rupture_ids`, as a sorted read-only int32 array."""
+    t0 = dt.utcnow()
+
+    log.debug(f'get_location_radius_rupture_id_array({locations}, {radius}, union: {union})')
+
+    ids = get_the_id_array(rupture_set_id, tuple(locations), radius, union)
+
+    t1 = dt.utcnow()
+    db_metrics.put_duration(__name__, 'get_location_radius_rupture_id_array', t1 - t0)
+    return ids
+
+
+# QUERY operations for the API get endpoint(s)
+def get_location_radius_rupture_columns(
+    rupture_set_id: str, locations: Tuple[str], radius: int, union: bool = False
+) -> LocationRadiusRuptureColumns:
+    """As `get_location_radius_ruptures`, as aligned arrays, see `LocationRadiusRuptureColumns`."""
+    t0 = dt.utcnow()
+
+    log.debug(f'get_location_radius_rupture_columns({locations}, {radius}, union: {union})')
+
+    columns = the_columns(rupture_set_id, locations, radius, union)
+
+    t1 = dt.utcnow()
+    db_metrics.put_duration(__name__, 'get_location_radius_rupture_columns', t1 - t0)
+    return columns
+
+
+def get_nearest_rupture_columns(
+    rupture_set_id: str,
+    locations: Tuple[str],
+    k: int,
+    max_distance: Optional[float] = None,
+    union: bool = False,
+) -> LocationRadiusRuptureColumns:
+    """As `get_nearest_ruptures`, as aligned arrays, see `LocationRadiusRuptureColumns`."""
+    t0 = dt.utcnow()
+
+    log.debug(f'get_nearest_rupture_columns({locations}, k: {k}, max_distance: {max_distance}, union: {union})')
+
+    columns = nearest_columns(rupture_set_id, locations, k, max_distance, union)
+
+    t1 = dt.utcnow()
+    db_metrics.put_duration(__name__, 'get_nearest_rupture_columns', t1 - t0)
+    return columns
+
+
+def get_nearest_ruptures(
+    rupture_set_id: str,
+    locations: Tuple[str],
+    k: int,
+    max_distance: Optional[float] = None,
+    union: bool = False,
+) -> Iterator[RuptureIndexLocationDistance]:
+    """
+    Get the k closest ruptures to each location, closer than max_distance, in location then distance order.
+
+    With `union=True`, get the k closest ruptures to any of the locations, each with its closest location, in
+    distance order. Distances are limited to the widest stored radius, see `widest_records`.
+    """
+    t0 = dt.utcnow()
+
+    log.debug(f'get_nearest_ruptures({locations}, k: {k}, max_distance: {max_distance}, union: {union})')
+
+    columns = nearest_columns(rupture_set_id, locations, k, max_distance, union)
+    ruptures = (
+        RuptureIndexLocationDistance(rupt_id=rupt_id, location_id=columns.locations[location_id], distance=distance)
+        for rupt_id, location_id, distance in zip(
+            columns.rupt_id.tolist(), columns.location_id.tolist(), columns.distance.tolist()
+        )
+    )
+
+    t1 = dt.utcnow()
+    db_metrics.put_duration(__name__, 'get_nearest_ruptures', t1 - t0)
+    return ruptures
+
+
+def get_location_radius_rupture_page(
+    rupture_set_id: str,
+    locations: Tuple[str],
+    radius: int,
+    union: bool = False,
+    order: str = 'rupt_id',
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+) -> Page:
+    """
+    Get a page of up to `limit` of the `get_location_radius_ruptures`, after the `cursor` of the previous page.
+
+    `order` is `rupt_id` (then location) or `distance` (then rupture id and location). The page's cursor is None
+    after the last page. See `solvis_store.query.pages`.
+    """
+    t0 = dt.utcnow()
+
+    log.debug(f'get_location_radius_rupture_page({locations}, {radius}, union: {union}, {order}, {limit}, {cursor})')
+
+    pages.check_args(order, limit)
+    after = pages.decode_cursor(cursor, order)
+    columns = page_columns(rupture_set_id, tuple(dict.fromkeys(locations)), radius, union, order, after, limit + 1)
+    keys = [columns.rupt_id, columns.location_id]
+    if order == 'distance':
+        keys.insert(0, columns.distance)
+    rows = pages.page_rows(keys, after, limit + 1)
+    next_cursor = pages.page_cursor(order, keys, rows[limit - 1]) if len(rows) > limit else None
+    rows = rows[:limit]
+    ruptures = [
+        RuptureIndexLocationDistance(rupt_id=rupt_id, location_id=columns.locations[location_id], distance=distance)
+        for rupt_id, location_id, distance in zip(
+            columns.rupt_id[rows].tolist(), columns.location_id[rows].tolist(), columns.distance[rows].tolist()
+        )
+    ]
+
+    t1 = dt.utcnow()
+    db_metrics.put_duration(__name__, 'get_location_radius_rupture_page', t1 - t0)
+    return Page(ruptures, next_cursor)
+
+
+def iter_location_radius_rupture_pages(
+    rupture_set_id: str,
+    locations: Tuple[str],
+    radius: int,
+    union: bool = False,
+    order: str = 'rupt_id',
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+) -> Iterator[Page]:
+    """Get the pages of `get_location_radius_rupture_page` from the cursor on, each when it is asked for."""
+    while True:
+        page = get_location_radius_rupture_page(rupture_set_id, locations, radius, union, order, limit, cursor)
+        yield page
+        if page.cursor is None:
+            return
+        cursor = page.cursor
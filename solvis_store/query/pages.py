@@ -0,0 +1,117 @@
+"""
+Keyset pagination of the query results, in pages of at most `limit` rows with a cursor to resume from.
+
+The rows of a query are ordered by a tuple of key columns, `(rupt_id, code)` by rupture id or
+`(distance, rupt_id, code)` by distance, where `code` is the location or fault name code, so the order is total and
+stable. A cursor holds the key of the last row served. The next page is the rows after it, found without counting
+an offset through the earlier pages. Only a window of rows that may be on the page is taken, see `id_window` and
+`key_position` with `sorted_window`.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+ORDERS = ('rupt_id', 'distance')
+DEFAULT_LIMIT = 1000
+
+Key = Tuple[Any, ...]
+
+
+class Page(NamedTuple):
+    """Up to `limit` rows, and the cursor of the next page, None after the last page."""
+
+    rows: List[Any]
+    cursor: Optional[str]
+
+
+def check_args(order: str, limit: int, orders: Sequence[str] = ORDERS) -> None:
+    if order not in orders:
+        raise ValueError(f'unknown order: {order}, expected one of {", ".join(orders)}')
+    if limit < 1:
+        raise ValueError(f'limit must be at least 1, got {limit}')
+
+
+def encode_cursor(order: str, key: Key) -> str:
+    return base64.urlsafe_b64encode(json.dumps([order, list(key)]).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str], order: str) -> Optional[Key]:
+    """The key of the last row served, or None for the first page."""
+    if cursor is None:
+        return None
+    try:
+        cursor_order, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as err:
+        raise ValueError(f'invalid cursor: {cursor}') from err
+    if cursor_order != order:
+        raise ValueError(f'the cursor is for {cursor_order} order, not {order}')
+    return tuple(key)
+
+
+def page_rows(keys: Sequence[np.ndarray], after: Optional[Key], limit: int) -> np.ndarray:
+    """
+    The indices of the first `limit` rows with a key greater than `after`, in key order.
+
+    Only the rows up to the `limit`th smallest first key are sorted, so a page costs a linear pass over the rows
+    and a sort of about `limit` of them.
+    """
+    rows = np.arange(len(keys[0]))
+    if after is not None:
+        later = np.zeros(len(rows), dtype=bool)
+        equal = np.ones(len(rows), dtype=bool)
+        for column, value in zip(keys, after):
+            later |= equal & (column > value)
+            equal &= column == value
+        rows = rows[later]
+    if len(rows) > limit:
+        first = keys[0][rows]
+        rows = rows[first <= np.partition(first, limit - 1)[limit - 1]]
+    order = np.lexsort([column[rows] for column in reversed(keys)])
+    return rows[order[:limit]]
+
+
+def id_window(ids: np.ndarray, after: Optional[Key], count: int) -> np.ndarray:
+    """
+    The sorted ids with rows that may be among the next `count` rows in rupture id order.
+
+    Those are the ids of the cursor's rupture, which may have rows left for later codes, and the `count` after it.
+    """
+    if after is None:
+        return ids[:count]
+    start, end = np.searchsorted(ids, after[0], 'left'), np.searchsorted(ids, after[0], 'right')
+    return ids[start : end + count]
+
+
+def key_position(columns: Sequence[np.ndarray], key: Key, side: str = 'left') -> int:
+    """As `np.searchsorted`, the position of the key in rows sorted by the columns, then by the next column, ..."""
+    start, end = 0, len(columns[0])
+    for column, value in zip(columns, key):
+        window = column[start:end]
+        start, end = start + int(np.searchsorted(window, value, 'left')), start + int(
+            np.searchsorted(window, value, 'right')
+        )
+    return start if side == 'left' else end
+
+
+def sorted_window(start: int, end: int, count: int, matches: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """
+    The first `count` of the rows from `start` to `end` that `matches(rows)` masks in, scanning forward in chunks of
+    `count` and doubling, so a page touches about as many rows as it needs.
+    """
+    found: List[np.ndarray] = []
+    size = count
+    while start < end and sum(len(rows) for rows in found) < count:
+        rows = np.arange(start, min(start + size, end))
+        found.append(rows[matches(rows)])
+        start += size
+        size *= 2
+    return np.concatenate(found)[:count] if found else np.empty(0, dtype=np.intp)
+
+
+def page_cursor(order: str, keys: Sequence[np.ndarray], row: int) -> str:
+    """The cursor of the page after the row."""
+    return encode_cursor(order, tuple(column[row].item() for column in keys))
@@ -0,0 +1,136 @@
+"""
+Whole-partition prefetch of the fault_name items of a rupture set.
+
+`prefetch_fault_names(rupture_set_id)` reads every parent fault of the rupture set with one paginated partition
+query (see `Backend.scan`) and keeps them in a `FaultNameIndex`: one int32 array of all the rupture ids, with
+offsets by fault name and fault id. The fault name queries are then served from memory.
+
+List the rupture sets to prefetch in `SOLVIS_STORE_PREFETCH_FAULT_NAMES` (comma separated), and call `warm_up()`
+when an API container starts, so the load is not paid by the first request. `*` prefetches every rupture set on
+its first fault name query.
+
+An index is loaded again on the first query after the `query_cache` TTL, and dropped by
+`query_cache.invalidate(rupture_set_id)`.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, cast
+
+import numpy as np
+
+from solvis_store.backends import get_backend
+from solvis_store.config import PREFETCH_FAULT_NAMES
+from solvis_store.records import FaultNameRecord
+
+from .cache import query_cache
+
+log = logging.getLogger(__name__)
+
+_indexes: Dict[str, 'FaultNameIndex'] = {}
+_load_locks: Dict[str, threading.Lock] = {}
+_lock = threading.Lock()
+
+
+class FaultNameIndex:
+    """The fault_name records of one rupture set, with their rupture ids in one read-only array."""
+
+    def __init__(self, rupture_set_id: str, records: Sequence[FaultNameRecord]) -> None:
+        self.rupture_set_id = rupture_set_id
+        self.fault_names = [record.fault_name for record in records]
+        self.fault_ids = np.array([record.fault_id for record in records], dtype=np.int32)
+        self.offsets = np.concatenate([[0], np.cumsum([len(record.ruptures) for record in records])]).astype(np.int64)
+        self.ruptures = (
+            np.concatenate([record.ruptures for record in records]).astype(np.int32, copy=False)
+            if records
+            else np.empty(0, dtype=np.int32)
+        )
+        self.ruptures.flags.writeable = False
+        self._by_name = {name: idx for idx, name in enumerate(self.fault_names)}
+        self._by_id = {int(fault_id): idx for idx, fault_id in enumerate(self.fault_ids)}
+        self.loaded = time.monotonic()
+
+    def expired(self) -> bool:
+        """Is the index older than the `query_cache` TTL."""
+        return query_cache.ttl is not None and time.monotonic() - self.loaded > query_cache.ttl
+
+    def _record(self, idx: int) -> FaultNameRecord:
+        return FaultNameRecord(
+            fault_name=self.fault_names[idx],
+            fault_id=int(self.fault_ids[idx]),
+            ruptures=self.ruptures[self.offsets[idx] : self.offsets[idx + 1]],
+        )
+
+    def fault_name_records(self, keys: Iterable[str]) -> Dict[str, Optional[FaultNameRecord]]:
+        records: Dict[str, Optional[FaultNameRecord]] = {}
+        for key in keys:
+            idx = self._by_name.get(key)
+            records[key] = None if idx is None else self._record(idx)
+        return records
+
+    def fault_id_record(self, fault_id: int) -> Optional[FaultNameRecord]:
+        idx = self._by_id.get(int(fault_id))
+        return None if idx is None else self._record(idx)
+
+    @property
+    def nbytes(self) -> int:
+        return self.ruptures.nbytes + self.offsets.nbytes + self.fault_ids.nbytes
+
+    def __len__(self) -> int:
+        return len(self.fault_names)
+
+
+def prefetch_fault_names(rupture_set_id: str) -> FaultNameIndex:
+    """Load every fault_name item of the rupture set, and serve the fault name queries from memory."""
+    t0 = time.perf_counter()
+    records = cast(List[FaultNameRecord], list(get_backend().scan('fault_name', rupture_set_id)))
+    index = FaultNameIndex(rupture_set_id, records)
+    with _lock:
+        _indexes[rupture_set_id] = index
+    log.info(
+        f'prefetch_fault_names: {rupture_set_id} {len(index)} faults, {index.nbytes} bytes '
+        f'in {time.perf_counter() - t0:.3f}s'
+    )
+    return index
+
+
+def drop_prefetched(rupture_set_id: Optional[str] = None) -> None:
+    """Drop the prefetched index of the rupture set, or of all rupture sets."""
+    with _lock:
+        if rupture_set_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(rupture_set_id, None)
+
+
+def get_fault_name_index(rupture_set_id: str) -> Optional[FaultNameIndex]:
+    """
+    The prefetched index of the rupture set, prefetching it now if configured for all rupture sets, or again if it
+    has expired.
+
+    One thread loads the index, concurrent queries of the rupture set wait for it.
+    """
+    index = _indexes.get(rupture_set_id)
+    if index is not None and not index.expired():
+        return index
+    if index is None and '*' not in PREFETCH_FAULT_NAMES:
+        return None
+    with _lock:
+        load_lock = _load_locks.setdefault(rupture_set_id, threading.Lock())
+    with load_lock:
+        with _lock:
+            index = _indexes.get(rupture_set_id)
+        if index is None or index.expired():
+            index = prefetch_fault_names(rupture_set_id)
+    return index
+
+
+query_cache.on_invalidate(drop_prefetched)
+
+
+def warm_up(rupture_set_ids: Optional[Iterable[str]] = None) -> List[FaultNameIndex]:
+    """Prefetch the rupture sets, by default those listed in `SOLVIS_STORE_PREFETCH_FAULT_NAMES`."""
+    if rupture_set_ids is None:
+        rupture_set_ids = [rupture_set_id for rupture_set_id in PREFETCH_FAULT_NAMES if rupture_set_id != '*']
+    return [prefetch_fault_names(rupture_set_id) for rupture_set_id in rupture_set_ids]
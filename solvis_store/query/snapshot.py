@@ -0,0 +1,203 @@
+"""
+Snapshots: every location_radius and fault_name item of a rupture set, in one self-describing file.
+
+A snapshot is an uncompressed `.npz` file (readable with `numpy.load`) holding, for each table, the sorted
+range keys, `offsets` into the concatenated rupture id (and distance) arrays, and a `__meta__` JSON document.
+`Snapshot` memory-maps the arrays in place, so queries on a registered snapshot read no more than the pages
+they touch and make no DynamoDB requests.
+
+Register snapshots with `use_snapshot(path)`, or list their paths in `SOLVIS_STORE_SNAPSHOTS` (separated by
+`os.pathsep`). Create them with `export_snapshot` or the `export` CLI command.
+"""
+
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import zipfile
+from datetime import datetime as dt
+from datetime import timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union, cast
+
+import numpy as np
+
+from solvis_store.backends import get_backend
+from solvis_store.config import FAULT_NAME_TABLE_NAME, LOCATION_RADIUS_TABLE_NAME, SNAPSHOT_PATHS
+from solvis_store.records import FaultNameRecord, LocationRadiusRecord
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 'solvis_store.snapshot'
+SNAPSHOT_VERSION = 1
+
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')  # a zip local file header, ending with the name and extra lengths
+
+_snapshots: Dict[str, 'Snapshot'] = {}
+_lock = threading.Lock()
+_configured = False
+
+
+def _concatenate(arrays: List[np.ndarray], dtype: Any) -> np.ndarray:
+    return np.concatenate(arrays).astype(dtype, copy=False) if arrays else np.empty(0, dtype=dtype)
+
+
+def _offsets(records: Sequence[Union[LocationRadiusRecord, FaultNameRecord]]) -> np.ndarray:
+    return np.concatenate([[0], np.cumsum([len(record.ruptures) for record in records])]).astype(np.int64)
+
+
+def export_snapshot(rupture_set_id: str, path: Union[str, os.PathLike]) -> Path:
+    """Write all the stored items of the rupture set to a snapshot file at path."""
+    backend = get_backend()
+    locations = cast(List[LocationRadiusRecord], list(backend.scan('location_radius', rupture_set_id)))
+    faults = cast(List[FaultNameRecord], list(backend.scan('fault_name', rupture_set_id)))
+
+    distance_dtype = np.result_type(*{record.distances.dtype for record in locations}) if locations else np.float32
+    arrays: Dict[str, Any] = {
+        'location_radius.keys': np.array([record.location_radius for record in locations], dtype=str),
+        'location_radius.offsets': _offsets(locations),
+        'location_radius.ruptures': _concatenate([record.ruptures for record in locations], np.int32),
+        'location_radius.distances': _concatenate([record.distances for record in locations], distance_dtype),
+        'location_radius.radii': np.array(
+            [np.nan if record.radius is None else record.radius for record in locations], dtype=np.float64
+        ),
+        'fault_name.keys': np.array([record.fault_name for record in faults], dtype=str),
+        'fault_name.offsets': _offsets(faults),
+        'fault_name.ruptures': _concatenate([record.ruptures for record in faults], np.int32),
+        'fault_name.fault_ids': np.array([record.fault_id for record in faults], dtype=np.int32),
+    }
+
+    meta = dict(
+        format=SNAPSHOT_FORMAT,
+        version=SNAPSHOT_VERSION,
+        rupture_set_id=rupture_set_id,
+        created=dt.now(timezone.utc).isoformat(),
+        tables=dict(
+            location_radius=LOCATION_RADIUS_TABLE_NAME,
+            fault_name=FAULT_NAME_TABLE_NAME,
+        ),
+        counts=dict(location_radius=len(locations), fault_name=len(faults)),
+    )
+    arrays['__meta__'] = np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)
+
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.npz')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    log.info(f'export_snapshot: {rupture_set_id} {len(locations)} location_radius, {len(faults)} fault_name to {path}')
+    return path
+
+
+def _memmap_npz(path: Path) -> Dict[str, np.ndarray]:
+    """Memory-map the arrays of an uncompressed `.npz` file."""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f'{path}: {info.filename} is compressed, snapshots must be written uncompressed')
+            f.seek(info.header_offset)
+            *_, name_length, extra_length = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            f.seek(info.header_offset + _LOCAL_HEADER.size + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[: -len('.npy')] if info.filename.endswith('.npy') else info.filename
+            if fortran_order:
+                raise ValueError(f'{path}: {info.filename} is in Fortran order')
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape)
+    return arrays
+
+
+class Snapshot:
+    """A read-only, memory-mapped snapshot of one rupture set, see `export_snapshot`."""
+
+    def __init__(self, path: Union[str, os.PathLike]) -> None:
+        self.path = Path(path)
+        self._arrays = _memmap_npz(self.path)
+        self.meta = json.loads(self._arrays.pop('__meta__').tobytes())
+        if self.meta.get('format') != SNAPSHOT_FORMAT or self.meta.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f'{self.path} is not a version {SNAPSHOT_VERSION} snapshot')
+        self.rupture_set_id: str = self.meta['rupture_set_id']
+        self._positions = {
+            table: {str(key): idx for idx, key in enumerate(self._arrays[f'{table}.keys'])}
+            for table in ('location_radius', 'fault_name')
+        }
+
+    def _slice(self, table: str, name: str, idx: int) -> np.ndarray:
+        offsets = self._arrays[f'{table}.offsets']
+        return self._arrays[f'{table}.{name}'][offsets[idx] : offsets[idx + 1]]
+
+    def keys(self, table: str) -> List[str]:
+        """The range keys in the table (`location_radius` or `fault_name`)."""
+        return list(self._positions[table])
+
+    def location_radius_records(self, keys: Iterable[str]) -> Dict[str, Optional[LocationRadiusRecord]]:
+        positions = self._positions['location_radius']
+        radii = self._arrays['location_radius.radii']
+        records: Dict[str, Optional[LocationRadiusRecord]] = {}
+        for key in keys:
+            idx = positions.get(key)
+            radius = None if idx is None or np.isnan(radii[idx]) else float(radii[idx])
+            records[key] = (
+                None
+                if idx is None
+                else LocationRadiusRecord(
+                    location_radius=key,
+                    ruptures=self._slice('location_radius', 'ruptures', idx),
+                    distances=self._slice('location_radius', 'distances', idx),
+                    radius=radius,
+                )
+            )
+        return records
+
+    def fault_name_records(self, keys: Iterable[str]) -> Dict[str, Optional[FaultNameRecord]]:
+        positions = self._positions['fault_name']
+        records: Dict[str, Optional[FaultNameRecord]] = {}
+        for key in keys:
+            idx = positions.get(key)
+            records[key] = (
+                None
+                if idx is None
+                else FaultNameRecord(
+                    fault_name=key,
+                    fault_id=int(self._arrays['fault_name.fault_ids'][idx]),
+                    ruptures=self._slice('fault_name', 'ruptures', idx),
+                )
+            )
+        return records
+
+
+def use_snapshot(path: Union[str, os.PathLike]) -> Snapshot:
+    """Answer queries for the snapshot's rupture set from the snapshot file."""
+    snapshot = Snapshot(path)
+    with _lock:
+        _snapshots[snapshot.rupture_set_id] = snapshot
+    log.info(f'use_snapshot: {snapshot.rupture_set_id} from {snapshot.path}')
+    return snapshot
+
+
+def drop_snapshot(rupture_set_id: str) -> None:
+    """Stop using any snapshot of the rupture set."""
+    with _lock:
+        _snapshots.pop(rupture_set_id, None)
+
+
+def get_snapshot(rupture_set_id: str) -> Optional[Snapshot]:
+    global _configured
+    if not _configured:
+        _configured = True
+        for path in SNAPSHOT_PATHS:
+            use_snapshot(path)
+    return _snapshots.get(rupture_set_id)
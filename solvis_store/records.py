@@ -0,0 +1,161 @@
+"""
+The decoded form of the stored items, as kept by the storage backends, query caches and snapshots.
+"""
+
+import hashlib
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from pynamodb.models import Model
+
+    from solvis_store import model
+
+
+# the radii stored by the `radius` CLI command
+RADII = [10, 20, 30, 40, 50, 100, 200]
+
+
+class LocationRadiusRecord(NamedTuple):
+    """
+    The decoded ruptures of a location_radius item, reassembled from any shards.
+
+    Items keyed `<location>:<radius>` hold the ruptures within that radius in Rupture Index order. Nearest items,
+    keyed by the location alone, hold all the ruptures within `radius` in distance order, see `radius_cut`.
+    """
+
+    location_radius: str
+    ruptures: np.ndarray
+    distances: np.ndarray
+    radius: Optional[float] = None
+
+
+class FaultNameRecord(NamedTuple):
+    """The decoded ruptures of a fault_name item, reassembled from any shards."""
+
+    fault_name: str
+    fault_id: int
+    ruptures: np.ndarray
+
+
+def location_radius_record(
+    location_radius: str, shards: Optional[Sequence['model.RuptureSetLocationDistances']]
+) -> Optional[LocationRadiusRecord]:
+    if not shards:
+        return None
+    ruptures = np.concatenate([shard.rupture_ids() for shard in shards])
+    distances = np.concatenate([shard.rupture_distances() for shard in shards])
+    if is_nearest_key(location_radius):
+        # legacy number sets are stored in Rupture Index order
+        ruptures, distances = by_distance(ruptures, distances)
+    return LocationRadiusRecord(
+        location_radius=location_radius,
+        ruptures=ruptures,
+        distances=distances,
+        radius=float(shards[0].radius) if shards[0].radius is not None else None,
+    )
+
+
+def is_nearest_key(location_radius: str) -> bool:
+    """Is the range key that of a nearest item, i.e. just a location."""
+    return ':' not in location_radius
+
+
+def by_distance(ruptures: np.ndarray, distances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """The ruptures and distances in ascending distance order."""
+    if len(distances) < 2 or np.all(distances[1:] >= distances[:-1]):
+        return ruptures, distances
+    order = np.argsort(distances, kind='stable')
+    return ruptures[order], distances[order]
+
+
+def radius_cut(nearest: LocationRadiusRecord, location_radius: str, radius: float) -> LocationRadiusRecord:
+    """
+    The record of the ruptures within radius, cut from a nearest record, in Rupture Index order.
+
+    The nearest ruptures are in distance order, so those within the radius are found with a binary search.
+    """
+    if nearest.radius is None or radius > nearest.radius:
+        raise ValueError(f'radius {radius} is beyond the {nearest.radius} of {nearest.location_radius}')
+    count = int(np.searchsorted(nearest.distances, radius, side='left'))
+    order = np.argsort(nearest.ruptures[:count], kind='stable')
+    return LocationRadiusRecord(
+        location_radius=location_radius,
+        ruptures=nearest.ruptures[:count][order],
+        distances=nearest.distances[:count][order],
+        radius=radius,
+    )
+
+
+def fault_name_record(
+    fault_name: str, shards: Optional[Sequence['model.RuptureSetParentFaultRuptures']]
+) -> Optional[FaultNameRecord]:
+    if not shards:
+        return None
+    return FaultNameRecord(
+        fault_name=fault_name,
+        fault_id=int(shards[0].fault_id),
+        ruptures=np.concatenate([shard.rupture_ids() for shard in shards]),
+    )
+
+
+class RuptureIdsRecord(NamedTuple):
+    """The rupture ids of an item of either table, in stored order, read without its other attributes."""
+
+    key: str
+    ruptures: np.ndarray
+
+
+def rupture_ids_record(key: str, shards: Optional[Sequence['model.RuptureIdsMixin']]) -> Optional[RuptureIdsRecord]:
+    if not shards:
+        return None
+    return RuptureIdsRecord(key=key, ruptures=np.concatenate([shard.rupture_ids() for shard in shards]))
+
+
+Record = Union[LocationRadiusRecord, FaultNameRecord]
+
+# the record types by table, named for their range keys
+TABLES = {'location_radius': LocationRadiusRecord, 'fault_name': FaultNameRecord}
+
+
+def content_hash(record: Record) -> str:
+    """
+    A digest of the record's ruptures, and distances or fault id, to detect unchanged items.
+
+    The ruptures are hashed in Rupture Index order, so the digest doesn't depend on the stored order or layout.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    ruptures = np.asarray(record.ruptures)
+    order = np.argsort(ruptures, kind='stable')
+    digest.update(np.ascontiguousarray(ruptures[order], dtype='<i4').tobytes())
+    if isinstance(record, LocationRadiusRecord):
+        digest.update(np.ascontiguousarray(np.asarray(record.distances)[order], dtype='<f8').tobytes())
+        digest.update(repr(None if record.radius is None else float(record.radius)).encode())
+    else:
+        digest.update(str(record.fault_id).encode())
+    return digest.hexdigest()
+
+
+def records_from_models(models: Iterable['Model']) -> Iterator[Tuple[str, Record]]:
+    """
+    Decode models, as yielded by the `solvis_store.create` functions, to `(rupture_set_id, record)` pairs.
+
+    The shards of a model must be consecutive, as `solvis_store.sharding.shard_model` returns them.
+    """
+    from solvis_store import model
+
+    shards: List[Any] = []
+    for mod in models:
+        shards.append(mod)
+        if len(shards) < int(getattr(mod, 'shard_count', None) or 1):
+            continue
+        if isinstance(mod, model.RuptureSetLocationDistances):
+            record: Optional[Record] = location_radius_record(shards[0].location_radius, shards)
+        elif isinstance(mod, model.RuptureSetParentFaultRuptures):
+            record = fault_name_record(shards[0].fault_name, shards)
+        else:
+            raise TypeError(f'not a rupture set model: {mod!r}')
+        assert record is not None
+        yield mod.rupture_set_id, record
+        shards = []
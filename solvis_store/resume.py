@@ -0,0 +1,117 @@
+"""
+Resumable, incremental population of the tables.
+
+A `Journal` is a local JSON lines file of the completed units of a run, the range keys (e.g. `WLG:100`) stored
+for a fault system and rupture set. A rerun with the same journal skips the completed units, so an interrupted
+run resumes where it stopped.
+
+Every created item has a `content_hash` (see `solvis_store.records.content_hash`). `ChangedModels` drops the
+models whose hash matches the stored item, so a rerun only writes the items that changed.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar, Union
+
+from pynamodb.models import Model
+
+from solvis_store.sharding import base_key
+
+log = logging.getLogger(__name__)
+
+_M = TypeVar('_M', bound=Model)
+
+
+def location_keys(location: str, radii: Iterable[int], nearest: bool = False) -> List[str]:
+    """The location_radius range keys created for the location."""
+    return [location] if nearest else [f'{location}:{radius}' for radius in radii]
+
+
+def location_chunks(models: Iterable[_M], size: int) -> Iterator[Tuple[List[str], Iterator[_M]]]:
+    """
+    Split models, yielded location by location, into the models of each `size` locations in turn.
+
+    Yields `(locations, chunk)` pairs. Each chunk must be consumed before the next pair is taken, `locations` is
+    complete once it is. Locations without models have no chunk.
+    """
+    models = iter(models)
+    pending = next(models, None)
+    while pending is not None:
+        locations: List[str] = []
+
+        def chunk(locations: List[str] = locations) -> Iterator[_M]:
+            nonlocal pending
+            while pending is not None:
+                if pending.location not in locations:
+                    if len(locations) == size:
+                        return
+                    locations.append(pending.location)
+                yield pending
+                pending = next(models, None)
+
+        yield locations, chunk()
+
+
+class Journal:
+    """The completed units of a run, in a file appended to as each unit completes."""
+
+    def __init__(self, path: Union[str, os.PathLike]) -> None:
+        self.path = Path(path)
+        self._done: Dict[Tuple[str, str], Set[str]] = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        log.warning(f'Journal: skipping a partly written entry in {self.path}')
+                        continue
+                    self._done.setdefault((entry['fault_system'], entry['rupture_set_id']), set()).update(entry['keys'])
+
+    def done(self, fault_system: str, rupture_set_id: str) -> Set[str]:
+        """The completed keys of the fault system."""
+        return set(self._done.get((fault_system, rupture_set_id), ()))
+
+    def record(self, fault_system: str, rupture_set_id: str, keys: Iterable[str]) -> None:
+        """Record the keys as completed, durably, before returning."""
+        keys = list(keys)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(dict(fault_system=fault_system, rupture_set_id=rupture_set_id, keys=keys)) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._done.setdefault((fault_system, rupture_set_id), set()).update(keys)
+
+    def pending_locations(
+        self, fault_system: str, rupture_set_id: str, locations: Iterable[str], radii: Iterable[int], nearest: bool
+    ) -> List[str]:
+        """The locations with any key not yet completed."""
+        done = self.done(fault_system, rupture_set_id)
+        radii = list(radii)
+        return [location for location in locations if not done.issuperset(location_keys(location, radii, nearest))]
+
+
+class ChangedModels:
+    """
+    Filter models, as yielded by the `solvis_store.create` functions, to those changed from the stored items.
+
+    Arguments:
+        stored_hashes: the stored content hash by key, see `Backend.content_hashes`.
+    """
+
+    def __init__(self, stored_hashes: Dict[str, Optional[str]]) -> None:
+        self.stored_hashes = stored_hashes
+        self.changed = 0
+        self.unchanged = 0
+
+    def __call__(self, models: Iterable[_M]) -> Iterator[_M]:
+        for mod in models:
+            key = base_key(getattr(mod, type(mod)._range_key_attribute().attr_name))
+            first = not getattr(mod, 'shard', None)
+            stored = self.stored_hashes.get(key)
+            if stored is not None and stored == getattr(mod, 'content_hash', None):
+                self.unchanged += first
+                continue
+            self.changed += first
+            yield mod
@@ -1,15 +1,22 @@
 """Console script for solvis."""
+
 # noqa
 import logging
 import pathlib
 import sys
+from datetime import datetime, timezone
 
 import click
 import nzshm_model
 from nzshm_common.location.location import LOCATION_LISTS
 from solvis import CompositeSolution
 
-from solvis_store import create
+from solvis_store import create, model
+from solvis_store.backends import get_backend
+from solvis_store.bulk_load import DEFAULT_WRITERS
+from solvis_store.query.snapshot import Snapshot, export_snapshot
+from solvis_store.records import RADII
+from solvis_store.resume import ChangedModels, Journal, location_chunks, location_keys
 
 SKIP_FS_NAMES = ['SLAB']
 
@@ -35,6 +42,23 @@ log.addHandler(screen_handler)
 # |_| |_| |_|\__,_|_|_| |_|
 
 
+def save_models(models, rupture_set_id, dry_run, writers):
+    """
+    Consume the models, storing them in the configured backend unless this is a dry run.
+
+    A new populate stamp is set if any were stored, so disk cached records of the rupture set are not read again.
+    """
+    if dry_run:
+        for _ in models:
+            pass
+        return
+    backend = get_backend()
+    count = backend.put_models(models, writers=writers)
+    if count:
+        backend.put_stamp(rupture_set_id, datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S.%fZ'))
+    click.echo(f"saved {count} records")
+
+
 @click.group()
 def cli():
     click.echo("solvis-store tasks - populate store.")
@@ -46,13 +70,38 @@ def cli():
 @click.option('--model_id', '-M', default="NSHM_v1.0.4", help="default value is `NSHM_v1.0.4`")
 @click.option('--dry_run', '-D', is_flag=True, help="do everything except save the data")
 @click.option('--create_tables', '-T', is_flag=True, help="ensure that the tables exist")
+@click.option('--writers', '-W', default=DEFAULT_WRITERS, help=f"number of writer threads, default {DEFAULT_WRITERS}")
+@click.option('--workers', '-P', default=1, help="number of worker processes for the locations, default 1")
+@click.option('--compact', '-C', is_flag=True, help="store ruptures and distances in compact binary attributes")
+@click.option(
+    '--nearest', '-N', is_flag=True, help=f"store one item per location, queryable at any radius up to {max(RADII)}"
+)
+@click.option('--journal', '-J', type=click.Path(), help="record completed locations in this file, and skip them")
+@click.option('--checkpoint', default=10, help="locations per journal entry, with --journal, default 10")
+@click.option('--rewrite', '-R', is_flag=True, help="write every item, even those with unchanged content")
 @click.pass_context
-def radius(ctx, archive_path, model_id, dry_run, create_tables):
+def radius(
+    ctx,
+    archive_path,
+    model_id,
+    dry_run,
+    create_tables,
+    writers,
+    workers,
+    compact,
+    nearest,
+    journal,
+    checkpoint,
+    rewrite,
+):
     """Create pynamoDB records for rupture sets based on radius from standard locations.
 
     from the CompositeSolution file at ARCHIVE_PATH, using model model_id
 
     NB these two must be compatible.
+
+    Items with the same content as the stored item are not written, unless --rewrite. With --journal, a rerun
+    resumes after the last completed checkpoint.
     """
     assert pathlib.Path(archive_path).exists()
 
@@ -62,6 +111,11 @@ def radius(ctx, archive_path, model_id, dry_run, create_tables):
     # get the composite solution
     comp = CompositeSolution.from_archive(pathlib.Path(archive_path), slt)
 
+    if create_tables:
+        model.migrate()
+    locations = LOCATION_LISTS['NZ']['locations']
+    run_journal = Journal(journal) if journal else None
+
     for fslt in slt.fault_system_lts:
 
         fault_system_key = fslt.short_name
@@ -73,18 +127,49 @@ def radius(ctx, archive_path, model_id, dry_run, create_tables):
         ruptset_ids = list(set([branch.rupture_set_id for branch in fslt.branches]))
         assert len(ruptset_ids) == 1
         rupture_set_id = ruptset_ids[0]
-        click.echo(f"fault system key: {fault_system_key}")
-        # build the models
-        for mod in create.create_location_radius_rupture_models(
-            comp._solutions[fault_system_key],
-            rupture_set_id,
-            locations=LOCATION_LISTS['NZ']['locations'],
-            distances=[10, 20, 30, 40, 50, 100, 200],
-            create_tables=create_tables,
-        ):
-            click.echo(f"model: {mod}, radius: {mod.radius}, ruptures: {mod.rupture_count}")
-            if not dry_run:
-                mod.save()
+
+        pending = (
+            run_journal.pending_locations(fault_system_key, rupture_set_id, locations, RADII, nearest)
+            if run_journal
+            else list(locations)
+        )
+        click.echo(f"fault system key: {fault_system_key}, {len(pending)} of {len(locations)} locations to do")
+        if not pending:
+            continue
+
+        stored_hashes = {} if rewrite or dry_run else get_backend().content_hashes('location_radius', rupture_set_id)
+        changed = ChangedModels(stored_hashes)
+
+        def build_models():
+            for mod in create.create_location_radius_rupture_models(
+                comp._solutions[fault_system_key],
+                rupture_set_id,
+                locations=pending,
+                distances=RADII,
+                workers=workers,
+                compact=compact,
+                nearest=nearest,
+            ):
+                click.echo(f"model: {mod}, radius: {mod.radius}, ruptures: {mod.rupture_count}")
+                yield mod
+
+        def journal_keys(done):
+            return [key for loc in done for key in location_keys(loc, RADII, nearest)]
+
+        # the distances are calculated once for all the pending locations, which are journalled in chunks
+        if not run_journal or dry_run:
+            save_models(changed(build_models()), rupture_set_id, dry_run, writers)
+        else:
+            recorded = set()
+            for done, chunk in location_chunks(build_models(), checkpoint):
+                save_models(changed(chunk), rupture_set_id, dry_run, writers)
+                run_journal.record(fault_system_key, rupture_set_id, journal_keys(done))
+                recorded.update(done)
+            # and the locations without any ruptures
+            rest = [loc for loc in pending if loc not in recorded]
+            if rest:
+                run_journal.record(fault_system_key, rupture_set_id, journal_keys(rest))
+        click.echo(f"{fault_system_key}: {changed.changed} items changed, {changed.unchanged} unchanged")
 
 
 @cli.command()
@@ -92,13 +177,18 @@ def radius(ctx, archive_path, model_id, dry_run, create_tables):
 @click.option('--model_id', '-M', default="NSHM_v1.0.4", help="default value is `NSHM_v1.0.4`")
 @click.option('--dry_run', '-D', is_flag=True, help="do everything except save the data")
 @click.option('--create_tables', '-T', is_flag=True, help="ensure that the tables exist")
+@click.option('--writers', '-W', default=DEFAULT_WRITERS, help=f"number of writer threads, default {DEFAULT_WRITERS}")
+@click.option('--compact', '-C', is_flag=True, help="store ruptures in compact binary attributes")
+@click.option('--rewrite', '-R', is_flag=True, help="write every item, even those with unchanged content")
 @click.pass_context
-def parents(ctx, archive_path, model_id, dry_run, create_tables):
+def parents(ctx, archive_path, model_id, dry_run, create_tables, writers, compact, rewrite):
     """Create pynamoDB records for rupture sets tha include each parent fault name.
 
     from the CompositeSolution file at ARCHIVE_PATH, using model model_id
 
     NB these two must be compatible.
+
+    Items with the same content as the stored item are not written, unless --rewrite.
     """
     assert pathlib.Path(archive_path).exists()
 
@@ -108,6 +198,9 @@ def parents(ctx, archive_path, model_id, dry_run, create_tables):
     # get the composite solution
     comp = CompositeSolution.from_archive(pathlib.Path(archive_path), slt)
 
+    if create_tables:
+        model.migrate()
+
     fslt = None
     for fslt in slt.fault_system_lts:
         if fslt.short_name == 'CRU':
@@ -126,10 +219,30 @@ def parents(ctx, archive_path, model_id, dry_run, create_tables):
 
     fss = comp._solutions[fault_system_key]
 
-    for mod in create.create_parent_fault_rupture_models(fss, rupture_set_id, create_tables):
-        click.echo(f"model: {mod}, {mod.fault_name}, {mod.fault_id}, {mod.rupture_count}")
-        if not dry_run:
-            mod.save()
+    stored_hashes = {} if rewrite or dry_run else get_backend().content_hashes('fault_name', rupture_set_id)
+    changed = ChangedModels(stored_hashes)
+
+    def build_models():
+        for mod in create.create_parent_fault_rupture_models(fss, rupture_set_id, compact=compact):
+            click.echo(f"model: {mod}, {mod.fault_name}, {mod.fault_id}, {mod.rupture_count}")
+            yield mod
+
+    save_models(changed(build_models()), rupture_set_id, dry_run, writers)
+    click.echo(f"{fault_system_key}: {changed.changed} items changed, {changed.unchanged} unchanged")
+
+
+@cli.command()
+@click.argument('rupture_set_id')
+@click.argument('snapshot_path')
+@click.pass_context
+def export(ctx, rupture_set_id, snapshot_path):
+    """Export the stored ruptures of RUPTURE_SET_ID to a snapshot file at SNAPSHOT_PATH.
+
+    The snapshot can then be queried without DynamoDB, see `solvis_store.query.snapshot`.
+    """
+    path = export_snapshot(rupture_set_id, snapshot_path)
+    snapshot = Snapshot(path)
+    click.echo(f"exported {snapshot.meta['counts']} items for {rupture_set_id} to {path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+"""
+Split rupture lists that would exceed the DynamoDB item size limit across numbered shard items.
+
+Shard 0 keeps the plain range key (e.g. `WLG:200`), further shards append the shard number (`WLG:200#1`,
+`WLG:200#2`, ...) under the same hash key. Every shard has `shard` and `shard_count` attributes, unsharded
+items have neither. Shard 0 has the shard count, so the other shards are then got by key, see
+`solvis_store.batch_get.batch_get_shards`. `shard_keys_condition` queries for the other shards of a key.
+"""
+
+import logging
+import math
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Sequence, TypeVar
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from pynamodb.attributes import Attribute
+    from pynamodb.expressions.condition import Condition
+    from pynamodb.models import Model
+
+log = logging.getLogger(__name__)
+
+SHARD_SEPARATOR = '#'
+MAX_ITEM_BYTES = 350 * 1024  # the DynamoDB limit is 400 KB, leave some headroom as item_size() is an estimate
+
+# the aligned array attributes that are split across shards
+SHARDED_ATTRIBUTES = ('ruptures', 'distances', 'packed_ruptures', 'packed_distances')
+
+_M = TypeVar('_M', bound='Model')
+
+
+def shard_key(key: str, shard: int) -> str:
+    return key if shard == 0 else f"{key}{SHARD_SEPARATOR}{shard}"
+
+
+def base_key(range_key: str) -> str:
+    """The key a range key is a shard of, or the range key itself."""
+    key, _, shard = range_key.rpartition(SHARD_SEPARATOR)
+    return key if key and shard.isdigit() else range_key
+
+
+def is_shard_key(range_key: str, key: str) -> bool:
+    """Is `range_key` the key, or a shard of it."""
+    if range_key == key:
+        return True
+    prefix = key + SHARD_SEPARATOR
+    return range_key.startswith(prefix) and range_key[len(prefix) :].isdigit()
+
+
+def shard_keys_condition(range_key_attribute: 'Attribute', key: str) -> 'Condition':
+    """A range key condition matching the shard keys of `key` after shard 0, and maybe others, see `is_shard_key`."""
+    return range_key_attribute.startswith(key + SHARD_SEPARATOR)
+
+
+def _value_size(value: Dict[str, Any]) -> int:
+    (attr_type, data), *_ = value.items()
+    if attr_type in ('S', 'N'):
+        return len(data.encode()) if isinstance(data, str) else len(str(data))
+    if attr_type == 'B':
+        return len(data)
+    if attr_type in ('SS', 'NS', 'BS'):
+        return sum(len(v) + 1 for v in data)
+    if attr_type == 'L':
+        return 3 + sum(_value_size(v) + 1 for v in data)
+    if attr_type == 'M':
+        return 3 + sum(len(k) + _value_size(v) + 1 for k, v in data.items())
+    return 1
+
+
+def raw_item_size(raw_item: Dict[str, Any]) -> int:
+    """Estimate the size in bytes of a serialized item, per the DynamoDB item size rules."""
+    return sum(len(name) + _value_size(value) for name, value in raw_item.items())
+
+
+def item_size(mod: 'Model') -> int:
+    """Estimate the stored size of a model instance in bytes, per the DynamoDB item size rules."""
+    return raw_item_size(mod.serialize(null_check=False))
+
+
+def _split(value: Any, sections: int) -> List[Any]:
+    if isinstance(value, np.ndarray):
+        return np.array_split(value, sections)
+    values = sorted(value) if isinstance(value, (set, frozenset)) else list(value)
+    return [chunk.tolist() for chunk in np.array_split(np.array(values, dtype=object), sections)]
+
+
+def shard_model(mod: _M, max_item_bytes: int = MAX_ITEM_BYTES) -> List[_M]:
+    """
+    Split the model into shards that each fit in `max_item_bytes`.
+
+    Returns:
+        `[mod]` if the model fits, else the shard models, with `rupture_count` being the shard rupture count.
+    """
+    size = item_size(mod)
+    if size <= max_item_bytes:
+        return [mod]
+
+    model_class = type(mod)
+    range_key_name = model_class._range_key_attribute().attr_name
+    key = getattr(mod, range_key_name)
+    arrays = {name: getattr(mod, name) for name in SHARDED_ATTRIBUTES if getattr(mod, name, None) is not None}
+
+    shard_count = math.ceil(size / max_item_bytes)
+    while True:
+        chunks = {name: _split(value, shard_count) for name, value in arrays.items()}
+        shards = []
+        for shard in range(shard_count):
+            values = dict(mod.attribute_values)
+            values.update({name: chunk[shard] for name, chunk in chunks.items()})
+            values.update(
+                {
+                    range_key_name: shard_key(key, shard),
+                    'shard': shard,
+                    'shard_count': shard_count,
+                    'rupture_count': len(next(iter(chunks.values()))[shard]),
+                }
+            )
+            shards.append(model_class(**values))
+        if all(item_size(shard) <= max_item_bytes for shard in shards):
+            log.debug(f'shard_model: {key} {size} bytes in {shard_count} shards')
+            return shards
+        shard_count += 1
+
+
+def group_shards(items: Iterable[_M], keys: Sequence[str], range_key_name: str) -> Dict[str, List[_M]]:
+    """
+    Group items (shards) by the key they belong to, in shard order.
+
+    Items that don't belong to any of `keys` are dropped. The shard count is shard 0's, so shards left over from
+    an item with more shards are ignored, a key is dropped only if shard 0 or a shard below its count is missing.
+    """
+    wanted = set(keys)
+    grouped: Dict[str, Dict[int, _M]] = {}
+    for item in items:
+        range_key = getattr(item, range_key_name)
+        key = base_key(range_key)
+        if key not in wanted:
+            key = range_key
+        if key in wanted:
+            grouped.setdefault(key, {})[_shard_number(item)] = item
+
+    complete = {}
+    for key, shards in grouped.items():
+        shard_count = int(getattr(shards[0], 'shard_count', None) or 1) if 0 in shards else 0
+        missing = [shard for shard in range(max(shard_count, 1)) if shard not in shards]
+        if missing:
+            log.warning(f'group_shards: {key} is missing shards {missing} of {shard_count or "?"}')
+            continue
+        stale = sorted(shard for shard in shards if shard >= shard_count)
+        if stale:
+            log.debug(f'group_shards: {key} ignoring stale shards {stale}')
+        complete[key] = [shards[shard] for shard in range(shard_count)]
+    return complete
+
+
+def stale_shard_keys(key: str, shard_count: int, range_keys: Iterable[str]) -> List[str]:
+    """The range keys of shards of `key` numbered from `shard_count` on, left over from an item with more shards."""
+    prefix = key + SHARD_SEPARATOR
+    return [
+        range_key
+        for range_key in range_keys
+        if is_shard_key(range_key, key) and range_key != key and int(range_key[len(prefix) :]) >= shard_count
+    ]
+
+
+def _shard_number(item: 'Model') -> int:
+    return int(getattr(item, 'shard', None) or 0)
@@ -0,0 +1,55 @@
+"""A synthetic stand-in for `solvis.FaultSystemSolution`, with just the parts used by `solvis_store.create`."""
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import LineString
+
+
+class SyntheticFaultSystemSolution:
+    def __init__(
+        self,
+        n_sections: int = 300,
+        n_ruptures: int = 3000,
+        max_sections_per_rupture: int = 10,
+        sections_per_parent: int = 5,
+        rated_fraction: float = 0.8,
+        seed: int = 1,
+    ):
+        rng = np.random.default_rng(seed)
+        lons = rng.uniform(166.0, 179.0, n_sections)
+        lats = rng.uniform(-47.0, -35.0, n_sections)
+        self._fault_surfaces = gpd.GeoDataFrame(
+            dict(
+                UpDepth=rng.uniform(0.0, 5.0, n_sections),
+                LowDepth=rng.uniform(10.0, 25.0, n_sections),
+                geometry=[LineString([(x, y), (x + 0.05, y + 0.05)]) for x, y in zip(lons, lats)],
+            )
+        )
+
+        # each rupture is a run of adjacent sections
+        sizes = rng.integers(1, max_sections_per_rupture, n_ruptures)
+        starts = rng.integers(0, n_sections - max_sections_per_rupture, n_ruptures)
+        ruptures = np.repeat(np.arange(n_ruptures), sizes)
+        sections = np.repeat(starts, sizes) + (np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes))
+        self.rupture_sections = pd.DataFrame(dict(rupture=ruptures, section=sections))
+
+        rated = np.sort(rng.choice(n_ruptures, int(n_ruptures * rated_fraction), replace=False))
+        self.ruptures_with_rates = pd.DataFrame(
+            {'fault_system': 'CRU', 'Rupture Index': rated, 'rate_weighted_mean': rng.uniform(0, 1e-4, len(rated))}
+        )
+        self.rates = self.ruptures_with_rates.set_index(
+            [self.ruptures_with_rates.fault_system, self.ruptures_with_rates['Rupture Index']]
+        )
+
+        parent_ids = np.arange(n_sections) // sections_per_parent
+        self.fault_sections = pd.DataFrame(
+            dict(ParentID=parent_ids, ParentName=[f'Parent Fault {pid}' for pid in parent_ids])
+        )
+
+    def fault_surfaces(self) -> gpd.GeoDataFrame:
+        return self._fault_surfaces.copy()
+
+    def get_ruptures_for_parent_fault(self, parent_fault_name: str) -> pd.Series:
+        sections = self.fault_sections.index[self.fault_sections.ParentName == parent_fault_name]
+        return self.rupture_sections[self.rupture_sections.section.isin(sections)].rupture.drop_duplicates()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.attributes` module."""
+
+import unittest
+
+import numpy as np
+
+from solvis_store.attributes import (
+    BITMAP,
+    VARINT_DELTA,
+    decode_distances,
+    decode_rupture_ids,
+    encode_distances,
+    encode_rupture_ids,
+)
+
+
+class TestRuptureIdEncoding(unittest.TestCase):
+    def test_round_trip(self):
+        rng = np.random.default_rng(42)
+        for ids in [
+            [],
+            [7],
+            [3, 1, 2],
+            [0, 2**31 - 1, 300],
+            np.sort(rng.choice(400_000, 20_000, replace=False)),
+            rng.choice(400_000, 2_000, replace=False),
+        ]:
+            for compression in ['none', 'zlib']:
+                decoded = decode_rupture_ids(encode_rupture_ids(ids, compression))
+                self.assertEqual(decoded.dtype, np.int32)
+                self.assertEqual(decoded.tolist(), list(ids))
+
+    def test_encoding_choice(self):
+        dense = np.arange(1000, 5000)
+        sparse = np.array([10, 200_000, 399_999])
+        self.assertEqual(encode_rupture_ids(dense)[0], BITMAP)
+        self.assertEqual(encode_rupture_ids(sparse)[0], VARINT_DELTA)
+        self.assertEqual(encode_rupture_ids(dense[::-1])[0], VARINT_DELTA)
+
+    def test_unknown_compression(self):
+        with self.assertRaises(ValueError):
+            encode_rupture_ids([1, 2], 'lzma')
+
+
+class TestDistanceEncoding(unittest.TestCase):
+    def test_round_trip(self):
+        distances = [0.0, 1.5, 12.125, 199.75]
+        for dtype in ['float16', 'float32']:
+            encoded = encode_distances(distances, dtype, 'zlib')
+            self.assertEqual(decode_distances(encoded).tolist(), distances)
+            self.assertEqual(decode_distances(encoded).dtype, np.dtype(dtype))
+
+    def test_unsupported_dtype(self):
+        with self.assertRaises(ValueError):
+            encode_distances([1.0], 'int16')
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.backends` package."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from moto import mock_dynamodb
+
+from solvis_store import model
+from solvis_store.backends import create_backend, set_backend
+from solvis_store.backends.dynamodb import DynamoDBBackend
+from solvis_store.backends.sqlite import SQLiteBackend
+from solvis_store.query import (
+    fault_name,
+    get_fault_name_rupture_ids,
+    get_location_radius_rupture_ids,
+    location_radius,
+    snapshot,
+)
+from solvis_store.records import FaultNameRecord, LocationRadiusRecord, content_hash, records_from_models
+from solvis_store.sharding import shard_model
+
+
+def records():
+    return [
+        ('RUPSET_ZZ', LocationRadiusRecord('WLG:10', np.array([1, 2, 3]), np.array([0.5, 1.25, 9.75]))),
+        ('RUPSET_ZZ', LocationRadiusRecord('MRO:10', np.array([2, 3, 4]), np.array([1.0, 2.0, 3.0]))),
+        ('RUPSET_ZZ', LocationRadiusRecord('WLG:100', np.arange(0, 3000, 3), np.linspace(0, 99, 1000))),
+        ('RUPSET_ZZ', LocationRadiusRecord('AKL', np.array([9, 4, 6]), np.array([1.0, 2.5, 7.0]), radius=200)),
+        ('RUPSET_ZZ', FaultNameRecord('Alpine: Kaniere', 3, np.array([1, 2, 3]))),
+        ('RUPSET_ZZ', FaultNameRecord('Big', 7, np.arange(0, 2000, 2))),
+        ('RUPSET_YY', FaultNameRecord('Big', 1, np.array([99]))),
+    ]
+
+
+class BackendTests:
+    """The behaviour common to all backends, mixed in to a `unittest.TestCase` that sets `self.backend`."""
+
+    backend: object
+
+    def test_batch_put_and_get(self):
+        self.assertEqual(self.backend.batch_put(records()), 7)
+        record = self.backend.get('location_radius', 'RUPSET_ZZ', 'WLG:10')
+        self.assertEqual(record.ruptures.tolist(), [1, 2, 3])
+        self.assertEqual(record.distances.tolist(), [0.5, 1.25, 9.75])
+        self.assertIsNone(self.backend.get('location_radius', 'RUPSET_ZZ', 'WLG:1'))
+        self.assertEqual(self.backend.get('fault_name', 'RUPSET_YY', 'Big').fault_id, 1)
+        nearest = self.backend.get('location_radius', 'RUPSET_ZZ', 'AKL')
+        self.assertEqual((nearest.ruptures.tolist(), nearest.radius), ([9, 4, 6], 200))
+
+    def test_batch_get(self):
+        self.backend.batch_put(records())
+        found = self.backend.batch_get('location_radius', 'RUPSET_ZZ', ['WLG:10', 'WLG:100', 'ZZZ:10'])
+        self.assertEqual(sorted(found), ['WLG:10', 'WLG:100'])
+        self.assertEqual(found['WLG:100'].ruptures.tolist(), list(range(0, 3000, 3)))
+
+    def test_batch_get_ids(self):
+        self.backend.batch_put(records())
+        found = self.backend.batch_get_ids('location_radius', 'RUPSET_ZZ', ['WLG:10', 'WLG:100', 'ZZZ:10'])
+        self.assertEqual(sorted(found), ['WLG:10', 'WLG:100'])
+        self.assertEqual(found['WLG:100'].ruptures.tolist(), list(range(0, 3000, 3)))
+        found = self.backend.batch_get_ids('fault_name', 'RUPSET_ZZ', ['Big'])
+        self.assertEqual(found['Big'].ruptures.tolist(), list(range(0, 2000, 2)))
+
+    def test_scan(self):
+        self.backend.batch_put(records())
+        keys = [record.location_radius for record in self.backend.scan('location_radius', 'RUPSET_ZZ')]
+        self.assertEqual(keys, ['AKL', 'MRO:10', 'WLG:10', 'WLG:100'])
+        faults = list(self.backend.scan('fault_name', 'RUPSET_ZZ'))
+        self.assertEqual([(f.fault_name, f.fault_id) for f in faults], [('Alpine: Kaniere', 3), ('Big', 7)])
+
+    def test_put_replaces(self):
+        self.backend.batch_put(records())
+        self.backend.batch_put([('RUPSET_YY', FaultNameRecord('Big', 2, np.array([5, 6])))])
+        record = self.backend.get('fault_name', 'RUPSET_YY', 'Big')
+        self.assertEqual((record.fault_id, record.ruptures.tolist()), (2, [5, 6]))
+
+    def test_content_hashes(self):
+        self.backend.batch_put(records())
+        hashes = self.backend.content_hashes('location_radius', 'RUPSET_ZZ')
+        self.assertEqual(sorted(hashes), ['AKL', 'MRO:10', 'WLG:10', 'WLG:100'])
+        self.assertEqual(hashes['WLG:100'], content_hash(records()[2][1]))
+        self.assertEqual(self.backend.content_hashes('fault_name', 'RUPSET_YY'), {'Big': content_hash(records()[6][1])})
+
+    def test_stamps(self):
+        self.assertIsNone(self.backend.get_stamp('RUPSET_ZZ'))
+        self.backend.put_stamp('RUPSET_ZZ', 'first')
+        self.backend.put_stamp('RUPSET_ZZ', 'second')
+        self.assertEqual(self.backend.get_stamp('RUPSET_ZZ'), 'second')
+        self.assertIsNone(self.backend.get_stamp('RUPSET_YY'))
+
+    def test_queries(self):
+        self.backend.batch_put(records())
+        set_backend(self.backend)
+        self.addCleanup(set_backend, None)
+        location_radius.clear_caches()
+        self.addCleanup(location_radius.clear_caches)
+
+        self.assertEqual(get_location_radius_rupture_ids('RUPSET_ZZ', ('WLG', 'MRO'), 10), {2, 3})
+        self.assertEqual(get_location_radius_rupture_ids('RUPSET_ZZ', ('WLG', 'MRO'), 10, union=True), {1, 2, 3, 4})
+        self.assertEqual(location_radius.query_fn('RUPSET_ZZ', 'MRO', 10)[0].ruptures.tolist(), [2, 3, 4])
+        self.assertEqual(get_fault_name_rupture_ids('RUPSET_ZZ', ('Alpine: Kaniere', 'Big')), {2})
+        self.assertEqual(fault_name.query_fn('RUPSET_YY', ('Big',))[0].ruptures.tolist(), [99])
+        self.assertEqual(get_location_radius_rupture_ids('RUPSET_ZZ', ('AKL',), 5), {4, 9})
+
+
+class TestSQLiteBackend(BackendTests, unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = Path(self.tmpdir.name) / 'store.sqlite'
+        self.backend = SQLiteBackend(self.path)
+        self.addCleanup(self.backend.close)
+
+    def test_shared_file(self):
+        self.backend.batch_put(records())
+        other = SQLiteBackend(self.path)
+        self.addCleanup(other.close)
+        self.assertEqual(other.get('fault_name', 'RUPSET_ZZ', 'Big').ruptures.tolist(), list(range(0, 2000, 2)))
+
+    def test_put_models(self):
+        models = [
+            *shard_model(
+                model.RuptureSetLocationDistances(
+                    rupture_set_id='RUPSET_ZZ',
+                    location_radius='WLG:100',
+                    radius=100,
+                    location='WLG',
+                    rupture_count=1000,
+                    packed_ruptures=np.arange(1000),
+                    packed_distances=np.linspace(0, 99, 1000, dtype=np.float32),
+                ),
+                max_item_bytes=2000,
+            ),
+            model.RuptureSetParentFaultRuptures(
+                rupture_set_id='RUPSET_ZZ', fault_name='Big', fault_id=7, ruptures=[1, 2], rupture_count=2
+            ),
+        ]
+        self.assertGreater(len(models), 2)
+        self.assertEqual(self.backend.put_models(models), 2)
+        record = self.backend.get('location_radius', 'RUPSET_ZZ', 'WLG:100')
+        self.assertEqual(record.ruptures.tolist(), list(range(1000)))
+        self.assertEqual(self.backend.get('fault_name', 'RUPSET_ZZ', 'Big').fault_id, 7)
+
+    def test_export_snapshot(self):
+        self.backend.batch_put(records())
+        set_backend(self.backend)
+        self.addCleanup(set_backend, None)
+        snap = snapshot.Snapshot(snapshot.export_snapshot('RUPSET_ZZ', Path(self.tmpdir.name) / 'RUPSET_ZZ.npz'))
+        self.assertEqual(snap.meta['counts'], dict(location_radius=4, fault_name=2))
+
+
+class TestDynamoDBBackend(BackendTests, unittest.TestCase):
+    def setUp(self):
+        mock = mock_dynamodb()  # the inherited tests are not decorated by a class decorator
+        mock.start()
+        self.addCleanup(mock.stop)
+        model.set_local_mode()
+        model.migrate()
+        self.backend = DynamoDBBackend(writers=2)
+
+
+class TestRecordsFromModels(unittest.TestCase):
+    def test_not_a_rupture_set_model(self):
+        with self.assertRaises(TypeError):
+            list(records_from_models([object()]))
+
+
+class TestCreateBackend(unittest.TestCase):
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_backend('nope')
+
+    def test_dynamodb(self):
+        self.assertIsInstance(create_backend('dynamodb'), DynamoDBBackend)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.batch_get` module."""
+
+import unittest
+from unittest import mock
+
+from moto import mock_dynamodb
+from pynamodb.constants import KEYS, RESPONSES, UNPROCESSED_KEYS
+
+from solvis_store import model
+from solvis_store.batch_get import batch_get, batch_get_shards
+from solvis_store.bulk_load import bulk_load
+from solvis_store.query import fault_name, get_fault_name_rupture_ids, get_location_radius_rupture_ids, location_radius
+from solvis_store.sharding import shard_model
+
+mRLR = model.RuptureSetLocationDistances
+
+
+def location_model(loc, radius, ruptures):
+    return mRLR(
+        rupture_set_id='RUPSET_ZZ',
+        location_radius=f'{loc}:{radius}',
+        radius=radius,
+        location=loc,
+        ruptures=ruptures,
+        distances=[float(r) for r in ruptures],
+        rupture_count=len(ruptures),
+    )
+
+
+@mock_dynamodb
+class TestBatchGet(unittest.TestCase):
+    def setUp(self):
+        model.set_local_mode()
+        model.migrate()
+        location_radius.clear_caches()
+        fault_name.clear_caches()
+        bulk_load(location_model(f'L{idx:03d}', 10, [idx, idx + 1]) for idx in range(250))
+        return super(TestBatchGet, self).setUp()
+
+    def test_more_keys_than_a_page(self):
+        keys = [('RUPSET_ZZ', f'L{idx:03d}:10') for idx in range(250)] + [('RUPSET_ZZ', 'NOPE:10')]
+        items = list(batch_get(mRLR, keys))
+        self.assertEqual(sorted(item.location_radius for item in items), [key for _, key in keys[:-1]])
+
+    def test_unprocessed_keys_are_retried(self):
+        connection = mRLR._get_connection()
+        batch_get_item = connection.batch_get_item
+        calls = []
+
+        def throttled(keys, **kwargs):
+            calls.append(len(keys))
+            if len(calls) > 1:
+                return batch_get_item(keys, **kwargs)
+            return {RESPONSES: {}, UNPROCESSED_KEYS: {mRLR.Meta.table_name: {KEYS: keys}}}
+
+        with mock.patch.object(connection, 'batch_get_item', side_effect=throttled):
+            with mock.patch('solvis_store.batch_get.backoff_delay', return_value=0):
+                items = list(batch_get(mRLR, [('RUPSET_ZZ', 'L001:10'), ('RUPSET_ZZ', 'L002:10')]))
+        self.assertEqual(calls, [2, 2])
+        self.assertEqual(len(items), 2)
+
+    def test_batch_get_shards_projection(self):
+        bulk_load(shard_model(location_model('BIG', 10, list(range(2000))), max_item_bytes=4000))
+        found = batch_get_shards(mRLR, 'RUPSET_ZZ', ['BIG:10', 'L000:10'], attributes_to_get=['ruptures'])
+        self.assertEqual(sorted(found), ['BIG:10', 'L000:10'])
+        self.assertGreater(len(found['BIG:10']), 1)
+        self.assertEqual(sum((sorted(shard.ruptures) for shard in found['BIG:10']), []), list(range(2000)))
+        self.assertIsNone(found['L000:10'][0].distances)
+
+    def test_location_query_is_batched_and_cached(self):
+        locations = tuple(f'L{idx:03d}' for idx in range(0, 250, 2))
+        with mock.patch.object(mRLR, 'query') as query:
+            rids = get_location_radius_rupture_ids('RUPSET_ZZ', locations, 10, union=True)
+        query.assert_not_called()
+        self.assertEqual(sorted(rids), list(range(0, 250)))
+
+        with mock.patch('solvis_store.backends.dynamodb.batch_get_shards') as fetch:
+            ids = location_radius.fetch_rupture_ids('RUPSET_ZZ', ['L000:10', 'L002:10'])
+        fetch.assert_not_called()
+        self.assertEqual(ids['L002:10'].tolist(), [2, 3])
+
+    def test_fault_names_all_missing(self):
+        self.assertEqual(get_fault_name_rupture_ids('RUPSET_ZZ', ['NOPE', 'NADA']), set())
+
+    def tearDown(self):
+        model.drop_all()
+        return super(TestBatchGet, self).tearDown()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+"""Tests for the `benchmarks` package."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from benchmarks.harness import Result, load_results, measure, regressions, save_results
+from benchmarks.suite import run
+
+
+class TestHarness(unittest.TestCase):
+    def test_measure(self):
+        setups = []
+        result = measure('sum', lambda: sum(range(1000)), rounds=2, setup=lambda: setups.append(1))
+        self.assertEqual((result.name, result.rounds, len(setups)), ('sum', 2, 3))
+        self.assertLessEqual(result.min_seconds, result.median_seconds)
+        self.assertIsNotNone(result.peak_bytes)
+        self.assertIsNone(measure('sum', lambda: None, rounds=1, memory=False).peak_bytes)
+
+    def test_save_and_compare(self):
+        results = [Result('fast', 3, 0.1, 0.1, 1000), Result('slow', 3, 0.1, 0.1, 1000)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / 'results.json'
+            save_results(results, path, scale='small')
+            baseline = load_results(path)
+        self.assertEqual(baseline['fast'], results[0])
+
+        current = [Result('fast', 3, 0.1, 0.11, 1000), Result('slow', 3, 0.2, 0.2, 2000), Result('new', 3, 1, 1, 1)]
+        found = regressions(current, baseline, threshold=1.25)
+        self.assertEqual(len(found), 2)
+        self.assertTrue(all(line.startswith('slow:') for line in found))
+
+
+class TestSuite(unittest.TestCase):
+    def test_small_scale(self):
+        results = list(run('small', backends=['sqlite'], rounds=1, memory=False, imports=False))
+        names = [result.name for result in results]
+        self.assertIn('create_parent_fault_rupture_models', names)
+        self.assertIn('get_location_radius_rupture_ids[union][sqlite]', names)
+        self.assertIn('get_nearest_ruptures[k=200][sqlite]', names)
+        self.assertTrue(all(result.median_seconds > 0 for result in results))
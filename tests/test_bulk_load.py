@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.bulk_load` module."""
+
+import unittest
+from unittest import mock
+
+from moto import mock_dynamodb
+from pynamodb.constants import UNPROCESSED_ITEMS
+
+from solvis_store import model
+from solvis_store.bulk_load import bulk_load
+
+
+def fault_models(count):
+    for idx in range(count):
+        yield model.RuptureSetParentFaultRuptures(
+            rupture_set_id='RUPSET_ZZ',
+            fault_id=idx,
+            fault_name=f"FAULT_{idx}",
+            ruptures=[idx, idx + 1],
+            rupture_count=2,
+        )
+
+
+@mock_dynamodb
+class TestBulkLoad(unittest.TestCase):
+    def setUp(self):
+        model.set_local_mode()
+        model.migrate()
+        return super(TestBulkLoad, self).setUp()
+
+    def test_bulk_load_mixed_models(self):
+        location_model = model.RuptureSetLocationDistances(
+            rupture_set_id='RUPSET_ZZ',
+            location_radius='WLG:10',
+            radius=10,
+            location='WLG',
+            ruptures=[1, 2],
+            distances=[1.0, 2.0],
+            rupture_count=2,
+        )
+        stats = bulk_load([location_model, *fault_models(60)], writers=3)
+        self.assertEqual(stats.items, 61)
+        self.assertEqual(stats.batches, 4)
+        self.assertEqual(stats.throttled, 0)
+        self.assertEqual(model.RuptureSetParentFaultRuptures.count('RUPSET_ZZ'), 60)
+        self.assertEqual(model.RuptureSetLocationDistances.get('RUPSET_ZZ', 'WLG:10').rupture_count, 2)
+
+    def test_bulk_load_retries_unprocessed_items(self):
+        connection = model.RuptureSetParentFaultRuptures._get_connection()
+        original = connection.batch_write_item
+        calls = []
+
+        def throttle_first_call(put_items):
+            calls.append(len(put_items))
+            if len(calls) == 1:
+                unprocessed = [{'PutRequest': {'Item': item}} for item in put_items[:5]]
+                original(put_items=put_items[5:])
+                return {UNPROCESSED_ITEMS: {model.RuptureSetParentFaultRuptures.Meta.table_name: unprocessed}}
+            return original(put_items=put_items)
+
+        with mock.patch.object(connection, 'batch_write_item', side_effect=throttle_first_call):
+            stats = bulk_load(fault_models(10), writers=1)
+
+        self.assertEqual(calls, [10, 5])
+        self.assertEqual(stats.items, 10)
+        self.assertEqual(stats.throttled, 1)
+        self.assertEqual(stats.retries, 1)
+        self.assertEqual(model.RuptureSetParentFaultRuptures.count('RUPSET_ZZ'), 10)
+
+    def tearDown(self):
+        model.drop_all()
+        return super(TestBulkLoad, self).tearDown()
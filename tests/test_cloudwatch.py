@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.cloudwatch` module."""
+
+import datetime
+import signal
+import subprocess
+import sys
+import threading
+import unittest
+from unittest import mock
+
+from solvis_store import cloudwatch
+from solvis_store.cloudwatch import MetricBuffer, ServerlessMetricWriter
+
+T0 = datetime.datetime(2026, 1, 1, 12, 30, 15, 500, tzinfo=datetime.timezone.utc)
+
+
+class TestMetricBuffer(unittest.TestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+        self.buffer = MetricBuffer(self.client, max_queue=5000, flush_seconds=60, flush_size=5000)
+
+    def test_aggregates_statistic_sets(self):
+        for value in [3.0, 1.0, 2.0]:
+            self.buffer.put('NS', 'MethodDuration', dict(Operation='q'), value, 'Milliseconds', timestamp=T0)
+        self.buffer.put('NS', 'MethodDuration', dict(Operation='other'), 7.0, 'Milliseconds', timestamp=T0)
+        self.client.put_metric_data.assert_not_called()
+
+        self.assertEqual(self.buffer.flush(), 4)
+        self.client.put_metric_data.assert_called_once()
+        kwargs = self.client.put_metric_data.call_args.kwargs
+        self.assertEqual(kwargs['Namespace'], 'NS')
+        datum = next(d for d in kwargs['MetricData'] if d['Dimensions'] == [{'Name': 'Operation', 'Value': 'q'}])
+        self.assertEqual(datum['StatisticValues'], dict(SampleCount=3, Sum=6.0, Minimum=1.0, Maximum=3.0))
+        self.assertEqual(datum['Timestamp'], T0.replace(second=0, microsecond=0))
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_high_resolution_periods(self):
+        for second in [1, 1, 2]:
+            self.buffer.put('NS', 'M', {}, 1.0, resolution=1, timestamp=T0.replace(second=second))
+        self.buffer.flush()
+        data = self.client.put_metric_data.call_args.kwargs['MetricData']
+        self.assertEqual(sorted(d['StatisticValues']['SampleCount'] for d in data), [1, 2])
+
+    def test_batches_of_1000(self):
+        for idx in range(2500):
+            self.buffer.put('NS', 'M', dict(Operation=str(idx)), 1.0, timestamp=T0)
+        self.assertEqual(self.buffer.flush(), 2500)
+        sizes = [len(call.kwargs['MetricData']) for call in self.client.put_metric_data.call_args_list]
+        self.assertEqual(sizes, [1000, 1000, 500])
+        self.assertEqual(self.buffer.stats().requests, 3)
+
+    def test_drops_when_full(self):
+        buffer = MetricBuffer(self.client, max_queue=2, flush_seconds=60, flush_size=10)
+        self.assertEqual([buffer.put('NS', 'M', {}, 1.0) for _ in range(3)], [True, True, False])
+        self.assertEqual(buffer.stats().dropped, 1)
+
+    def test_errors_are_counted_not_raised(self):
+        self.client.put_metric_data.side_effect = RuntimeError('throttled')
+        self.buffer.put('NS', 'M', {}, 1.0)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.stats().errors, 1)
+
+    def test_background_flush_on_size(self):
+        published = threading.Event()
+        self.client.put_metric_data.side_effect = lambda **kwargs: published.set()
+        buffer = MetricBuffer(self.client, max_queue=100, flush_seconds=60, flush_size=3)
+        for _ in range(3):
+            buffer.put('NS', 'M', {}, 1.0)
+        self.assertTrue(published.wait(5))
+
+
+class TestShutdownFlush(unittest.TestCase):
+    def run_python(self, code):
+        return subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=30)
+
+    def test_import_leaves_sigterm_alone(self):
+        code = 'import signal, solvis_store.cloudwatch; print(signal.getsignal(signal.SIGTERM) == signal.SIG_DFL)'
+        self.assertEqual(self.run_python(code).stdout.strip(), 'True')
+
+    def test_sigterm_flushes_then_terminates(self):
+        code = (
+            'import os, signal\n'
+            'from solvis_store import cloudwatch\n'
+            'cloudwatch.flush_metrics = lambda: print("flushed", flush=True)\n'
+            'cloudwatch.install_shutdown_flush()\n'
+            'cloudwatch.install_shutdown_flush()\n'
+            'os.kill(os.getpid(), signal.SIGTERM)\n'
+            'print("survived")\n'
+        )
+        result = self.run_python(code)
+        self.assertEqual(result.returncode, -signal.SIGTERM)
+        self.assertEqual(result.stdout.split(), ['flushed'])
+
+    def test_sigterm_calls_the_previous_handler(self):
+        previous = mock.Mock()
+        with mock.patch.object(cloudwatch, 'flush_metrics') as flush_metrics:
+            cloudwatch._on_sigterm(previous)(signal.SIGTERM, None)
+        flush_metrics.assert_called_once_with()
+        previous.assert_called_once_with(signal.SIGTERM, None)
+
+
+class TestServerlessMetricWriter(unittest.TestCase):
+    def test_put_duration_is_buffered(self):
+        buffer = mock.Mock()
+        writer = ServerlessMetricWriter(lambda_name='APP', metric_name='MethodDuration', resolution=1, buffer=buffer)
+        with mock.patch.object(cloudwatch, 'IS_TESTING', False), mock.patch.object(cloudwatch, 'get_client') as client:
+            writer.put_duration('pkg', 'op', datetime.timedelta(milliseconds=12))
+        client.assert_not_called()
+        buffer.put.assert_called_once_with(
+            'AWS/Lambda/APP',
+            'MethodDuration',
+            dict(Package='pkg', Operation='op'),
+            12.0,
+            unit='Milliseconds',
+            resolution=1,
+        )
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.create.create_location_radius_rupture_models` module."""
+
+import unittest
+
+import numpy as np
+
+from solvis_store.create.create_location_radius_rupture_models import (
+    RatedRuptureSections,
+    create_location_radius_rupture_models,
+    nearest_rupture_distances,
+    radius_cuts,
+)
+from solvis_store.records import radius_cut, records_from_models
+
+from .synthetic_solution import SyntheticFaultSystemSolution
+
+
+class TestRadiusCuts(unittest.TestCase):
+    def setUp(self):
+        # rupture 7 has no rate, so it is not in the rated rupture sections
+        self.rupture_sections = RatedRuptureSections(
+            ruptures=np.array([1, 1, 2, 2, 3, 4, 4]),
+            section_rows=np.array([0, 1, 1, 2, 3, 0, 3]),
+        )
+        self.section_distances = np.array([45.0, 12.5, 8.0, 250.0])
+
+    def test_nearest_rupture_distances(self):
+        ruptures, distances = nearest_rupture_distances(self.rupture_sections, self.section_distances, 200)
+        assert ruptures.tolist() == [2, 1, 4]
+        assert distances.tolist() == [8.0, 12.5, 45.0]
+
+    def test_radius_cuts(self):
+        ruptures, distances = nearest_rupture_distances(self.rupture_sections, self.section_distances, 300)
+        cuts = list(radius_cuts(ruptures, distances, [10, 12.5, 50, 300]))
+        assert [cut.radius for cut in cuts] == [10, 12.5, 50, 300]
+        assert [cut.ruptures.tolist() for cut in cuts] == [[2], [2], [1, 2, 4], [1, 2, 3, 4]]
+        assert cuts[3].distances.tolist() == [12.5, 8.0, 250.0, 45.0]
+
+
+class TestCreateLocationRadiusRuptureModels(unittest.TestCase):
+    def setUp(self):
+        self.fss = SyntheticFaultSystemSolution()
+
+    def models(self, **kwargs):
+        return sorted(
+            (
+                (mod.location_radius, sorted(mod.ruptures), list(mod.distances))
+                for mod in create_location_radius_rupture_models(
+                    self.fss,
+                    'RUPSET_ZZ',
+                    locations=['WLG', 'AKL', 'CHC', 'DUD', 'NPE'],
+                    distances=[10, 50, 200],
+                    **kwargs,
+                )
+            ),
+        )
+
+    def test_models(self):
+        models = self.models()
+        assert 'WLG:200' in [location_radius for location_radius, _, _ in models]
+        for location_radius, ruptures, distances in models:
+            radius = int(location_radius.split(':')[1])
+            assert len(ruptures) == len(distances)
+            assert all(distance < radius for distance in distances)
+
+    def test_parallel_models_match_serial(self):
+        self.assertEqual(self.models(workers=2), self.models())
+
+    def test_nearest_models_cut_to_radius_models(self):
+        kwargs = dict(locations=['WLG', 'AKL', 'CHC', 'DUD', 'NPE'], distances=[10, 50, 200], compact=True)
+        models = create_location_radius_rupture_models(self.fss, 'RUPSET_ZZ', **kwargs)
+        expected = {record.location_radius: record for _, record in records_from_models(models)}
+        models = create_location_radius_rupture_models(self.fss, 'RUPSET_ZZ', nearest=True, **kwargs)
+        nearest = {record.location_radius: record for _, record in records_from_models(models)}
+
+        assert sorted(nearest) == sorted(kwargs['locations'])
+        for loc, record in nearest.items():
+            assert record.radius == 200
+            assert np.all(np.diff(record.distances) >= 0)
+            for radius in [10, 50, 200]:
+                key = f'{loc}:{radius}'
+                if key not in expected:  # no ruptures within radius
+                    assert not len(radius_cut(record, key, radius).ruptures)
+                    continue
+                cut = radius_cut(record, key, radius)
+                assert cut.ruptures.tolist() == expected[key].ruptures.tolist()
+                assert cut.distances.tolist() == expected[key].distances.tolist()
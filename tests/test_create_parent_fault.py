@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.create.create_parent_fault_rupture_models` module."""
+
+import unittest
+
+import numpy as np
+
+from solvis_store.create.create_parent_fault_rupture_models import (
+    create_parent_fault_rupture_models,
+    parent_fault_ruptures,
+    parent_faults,
+)
+
+from .synthetic_solution import SyntheticFaultSystemSolution
+
+
+def reference_ruptures(fss, fault_id):
+    """The rated ruptures with any section of the parent fault, one fault at a time."""
+    sections = fss.fault_sections.index[fss.fault_sections.ParentID == fault_id]
+    ruptures = fss.rupture_sections[fss.rupture_sections.section.isin(sections)].rupture.unique()
+    return sorted(set(ruptures) & set(fss.ruptures_with_rates['Rupture Index']))
+
+
+class TestParentFaultRuptures(unittest.TestCase):
+    def setUp(self):
+        self.fss = SyntheticFaultSystemSolution(n_sections=120, n_ruptures=1500)
+
+    def test_matches_per_fault_queries(self):
+        faults = list(parent_fault_ruptures(self.fss))
+        self.assertEqual(len(faults), 24)
+        for fault in faults:
+            self.assertEqual(fault.ruptures.tolist(), reference_ruptures(self.fss, fault.fault_id))
+            self.assertEqual(fault.ruptures.dtype, np.int32)
+
+    def test_ids_and_names_stay_aligned(self):
+        # a name shared by two parents misaligned ids and names zipped from independently unique() columns
+        names = self.fss.fault_sections.ParentName.where(self.fss.fault_sections.ParentID != 3, 'Parent Fault 2')
+        self.fss.fault_sections = self.fss.fault_sections.assign(ParentName=names)
+        expected = [(2, 'Parent Fault 2'), (3, 'Parent Fault 2'), (4, 'Parent Fault 4')]
+        self.assertEqual(parent_faults(self.fss)[2:5], expected)
+        faults = {fault.fault_id: fault for fault in parent_fault_ruptures(self.fss)}
+        self.assertEqual(faults[4].fault_name, 'Parent Fault 4')
+        self.assertEqual(faults[4].ruptures.tolist(), reference_ruptures(self.fss, 4))
+
+    def test_parent_without_rated_ruptures(self):
+        self.fss.ruptures_with_rates = self.fss.ruptures_with_rates.iloc[:0]
+        faults = list(parent_fault_ruptures(self.fss))
+        self.assertEqual(len(faults), 24)
+        self.assertTrue(all(len(fault.ruptures) == 0 for fault in faults))
+
+    def test_models(self):
+        for compact in (False, True):
+            models = list(create_parent_fault_rupture_models(self.fss, 'RS_1', compact=compact))
+            self.assertEqual(
+                [(mod.fault_id, mod.fault_name, mod.rupture_ids().tolist()) for mod in models],
+                [
+                    (fault_id, name, reference_ruptures(self.fss, fault_id))
+                    for fault_id, name in parent_faults(self.fss)
+                ],
+            )
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.query.id_sets` module."""
+
+import unittest
+
+import numpy as np
+
+from solvis_store.query import id_sets
+
+
+class TestIdSets(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.sets = [set(rng.integers(0, 5000, size).tolist()) for size in (3000, 800, 2500, 10)]
+
+    def check(self, actual, expected):
+        self.assertEqual(actual.dtype, id_sets.ID_DTYPE)
+        self.assertEqual(actual.tolist(), sorted(expected))
+
+    def test_sorted_ids(self):
+        self.check(id_sets.sorted_ids([5, 1, 5, 3]), {1, 3, 5})
+        arr = np.array([1, 2, 3], dtype=np.int32)
+        assert id_sets.sorted_ids(arr) is arr
+
+    def test_intersection(self):
+        self.check(id_sets.intersection(np.array(list(s)) for s in self.sets), set.intersection(*self.sets))
+        self.check(id_sets.intersection(np.array(list(s)) for s in self.sets[:3]), set.intersection(*self.sets[:3]))
+        self.check(id_sets.intersection([np.array([1, 2]), np.array([], dtype=np.int32)]), set())
+        self.check(id_sets.intersection([]), set())
+
+    def test_union_bitmap(self):
+        self.check(id_sets.union(np.array(list(s)) for s in self.sets), set.union(*self.sets))
+
+    def test_union_sparse(self):
+        sets = [{1, 10**9}, {5, 2 * 10**9}, {-3, 1}]
+        self.check(id_sets.union(np.array(list(s)) for s in sets), set.union(*sets))
+        self.check(id_sets.union([np.array([], dtype=np.int32)]), set())
+
+    def test_contains(self):
+        haystack = np.array([2, 4, 6], dtype=np.int32)
+        needles = np.array([7, 6, 1, 2, 3])
+        self.assertEqual(id_sets.contains(haystack, needles).tolist(), [False, True, False, True, False])
+        self.assertEqual(id_sets.contains(haystack[:0], needles).tolist(), [False] * 5)
+
+    def test_any_of(self):
+        ids = id_sets.sorted_ids(np.array(list(self.sets[0])))
+        others = [np.array(list(s)) for s in self.sets[1:]]
+        self.check(id_sets.any_of(ids, others), self.sets[0] & set.union(*self.sets[1:]))
+        self.check(id_sets.any_of(ids, []), set())
+        self.check(id_sets.any_of(ids[:0], others), set())
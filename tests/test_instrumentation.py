@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.instrumentation` module."""
+
+import unittest
+
+from moto import mock_dynamodb
+
+from solvis_store import instrumentation, model
+from solvis_store.batch_get import batch_get
+from solvis_store.bulk_load import bulk_load
+from solvis_store.instrumentation import span
+from solvis_store.query import fault_name, get_fault_name_rupture_ids
+
+
+def fault_models(count):
+    for idx in range(count):
+        yield model.RuptureSetParentFaultRuptures(
+            rupture_set_id='RUPSET_ZZ',
+            fault_id=idx,
+            fault_name=f"FAULT_{idx:03d}",
+            ruptures=list(range(idx, idx + 100)),
+            rupture_count=100,
+        )
+
+
+@mock_dynamodb
+class TestReadInstrumentation(unittest.TestCase):
+    def setUp(self):
+        model.set_local_mode()
+        model.migrate()
+        bulk_load(fault_models(50))
+        instrumentation.reset_stats()
+        fault_name.clear_caches()
+
+    def test_query_is_measured_while_iterating(self):
+        results = model.RuptureSetParentFaultRuptures.query('RUPSET_ZZ', page_size=20)
+        self.assertEqual(instrumentation.read_stats(), {})
+
+        self.assertEqual(len(list(results)), 50)
+        stats = instrumentation.read_stats()['RuptureSetParentFaultRuptures.query']
+        self.assertEqual((stats.reads, stats.pages, stats.items), (1, 3, 50))
+        self.assertGreater(stats.bytes, 50 * 100)
+        self.assertGreater(stats.seconds, 0)
+        self.assertIsNone(results.last_evaluated_key)
+
+    def test_abandoned_query_is_recorded_on_close(self):
+        results = model.RuptureSetParentFaultRuptures.query('RUPSET_ZZ', page_size=20)
+        next(results)
+        results.close()
+        results.close()
+        stats = instrumentation.read_stats()['RuptureSetParentFaultRuptures.query']
+        self.assertEqual((stats.reads, stats.pages, stats.items), (1, 1, 20))
+
+    def test_batch_get(self):
+        keys = [('RUPSET_ZZ', f'FAULT_{idx:03d}') for idx in range(0, 60, 2)]
+        self.assertEqual(len(list(batch_get(model.RuptureSetParentFaultRuptures, keys))), 25)
+        stats = instrumentation.read_stats()['RuptureSetParentFaultRuptures.batch_get']
+        self.assertEqual((stats.reads, stats.pages, stats.items), (1, 1, 25))
+
+    def test_query_functions(self):
+        self.assertEqual(get_fault_name_rupture_ids('RUPSET_ZZ', ('FAULT_000', 'FAULT_001')), set(range(1, 100)))
+        self.assertEqual(instrumentation.read_stats()['RuptureSetParentFaultRuptures.batch_get'].items, 2)
+        self.assertEqual(instrumentation.span_stats()['solvis_store.query.fault_name.get_the_ids'].calls, 1)
+
+
+class TestSpans(unittest.TestCase):
+    def setUp(self):
+        instrumentation.reset_stats()
+
+    def test_span_stats_and_hooks(self):
+        calls = []
+        instrumentation.add_span_hook(lambda name, seconds: calls.append(name))
+        self.addCleanup(instrumentation._span_hooks.clear)
+
+        @span('decorated')
+        def work():
+            return sum(range(1000))
+
+        work()
+        work()
+        with span('block'):
+            pass
+        stats = instrumentation.span_stats()
+        self.assertEqual((stats['decorated'].calls, stats['block'].calls), (2, 1))
+        self.assertGreaterEqual(stats['decorated'].seconds, stats['decorated'].max_seconds)
+        self.assertEqual(calls, ['decorated', 'decorated', 'block'])
+
+    def test_span_profiling(self):
+        instrumentation.enable_span_profiling()
+        self.addCleanup(instrumentation.enable_span_profiling, False)
+        with span('outer'):
+            with span('inner'):
+                sorted(range(1000), reverse=True)
+        self.assertIsNotNone(instrumentation.span_profile('outer'))
+        self.assertIsNone(instrumentation.span_profile('inner'))
+        self.assertEqual(instrumentation.span_stats()['inner'].calls, 1)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.query.cache` module."""
+
+import unittest
+
+import numpy as np
+
+from solvis_store.query.cache import ENTRY_OVERHEAD_BYTES, QueryCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.array_bytes = ENTRY_OVERHEAD_BYTES + 8000
+        self.cache = QueryCache(max_bytes=3 * self.array_bytes, ttl=60, clock=self.clock)
+
+    def test_hits_and_misses(self):
+        self.cache.put('RS', 'ns', 'a', np.arange(1000))
+        self.cache.put('RS', 'ns', 'missing', None)
+        found = self.cache.get_many('RS', 'ns', ['a', 'b', 'missing'])
+        self.assertEqual(sorted(found), ['a', 'missing'])
+        self.assertIsNone(found['missing'])
+        self.assertEqual(self.cache.get_many('RS', 'other', ['a']), {})
+        stats = self.cache.stats()
+        self.assertEqual((stats.hits, stats.misses, stats.entries), (2, 2, 2))
+
+    def test_arrays_are_read_only(self):
+        self.cache.put('RS', 'ns', 'a', (np.arange(3), np.arange(3.0)))
+        for arr in self.cache.get_many('RS', 'ns', ['a'])['a']:
+            assert not arr.flags.writeable
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        for key in 'abc':
+            self.cache.put('RS', 'ns', key, np.arange(1000))
+        self.cache.get_many('RS', 'ns', ['a'])
+        self.cache.put('RS', 'ns', 'd', np.arange(1000))
+        self.assertEqual(sorted(self.cache.get_many('RS', 'ns', 'abcd')), ['a', 'c', 'd'])
+        stats = self.cache.stats()
+        self.assertEqual(stats.evictions, 1)
+        self.assertLessEqual(stats.bytes, self.cache.max_bytes)
+
+    def test_too_big_is_not_cached(self):
+        self.cache.put('RS', 'ns', 'big', np.arange(10_000))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_ttl(self):
+        self.cache.put('RS', 'ns', 'a', 1)
+        self.clock.now = 59
+        self.assertEqual(self.cache.get_many('RS', 'ns', ['a']), {'a': 1})
+        self.clock.now = 61
+        self.assertEqual(self.cache.get_many('RS', 'ns', ['a']), {})
+        self.assertEqual(self.cache.stats().expirations, 1)
+        self.assertEqual(self.cache.stats().bytes, 0)
+
+    def test_invalidate(self):
+        self.cache.put('RS', 'ns', 'a', 1)
+        self.cache.put('RS', 'other', 'a', 1)
+        self.cache.put('RS2', 'ns', 'a', 2)
+        self.assertEqual(self.cache.invalidate('RS'), 2)
+        self.assertEqual(self.cache.get_many('RS2', 'ns', ['a']), {'a': 2})
+        self.assertEqual(len(self.cache), 1)
+
+    def test_memoize(self):
+        calls = []
+
+        @self.cache.memoize('fn')
+        def fn(rupture_set_id, x, y):
+            calls.append((rupture_set_id, x, y))
+            return x + y
+
+        self.assertEqual([fn('RS', 1, 2), fn('RS', 1, 2), fn('RS2', 1, 2)], [3, 3, 3])
+        self.assertEqual(calls, [('RS', 1, 2), ('RS2', 1, 2)])
+        self.cache.invalidate('RS')
+        fn('RS', 1, 2)
+        self.assertEqual(len(calls), 3)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.query.disk_cache` module."""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+from moto import mock_dynamodb
+
+from solvis_store import model
+from solvis_store.backends.dynamodb import DynamoDBBackend
+from solvis_store.config import LOCATION_RADIUS_TABLE_NAME
+from solvis_store.query import cache, get_location_radius_rupture_ids, location_radius
+from solvis_store.query.disk_cache import DiskCache
+from solvis_store.query.fault_name import FaultNameRecord
+from solvis_store.query.location_radius import LocationRadiusRecord
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(self.tmpdir.name, version='v1')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip(self):
+        record = LocationRadiusRecord('WLG:10', np.array([1, 5, 7], dtype=np.int32), np.array([1.5, 2.5, 3.5]))
+        self.cache.put('TABLE', 'RS/1', 'WLG:10', record)
+
+        found = self.cache.get_many('TABLE', 'RS/1', ['WLG:10', 'AKL:10'], LocationRadiusRecord)
+        self.assertEqual(sorted(found), ['WLG:10'])
+        self.assertEqual(found['WLG:10'].location_radius, 'WLG:10')
+        np.testing.assert_array_equal(found['WLG:10'].ruptures, record.ruptures)
+        np.testing.assert_array_equal(found['WLG:10'].distances, record.distances)
+        self.assertIsInstance(found['WLG:10'].ruptures, np.memmap)
+        assert not found['WLG:10'].ruptures.flags.writeable
+
+    def test_scalar_fields_and_awkward_keys(self):
+        record = FaultNameRecord('Alpine: Kaniere / Springs #2', 7, np.arange(4, dtype=np.int32))
+        self.cache.put('TABLE', 'RS', record.fault_name, record)
+        found = self.cache.get_many('TABLE', 'RS', [record.fault_name], FaultNameRecord)[record.fault_name]
+        self.assertEqual((found.fault_name, found.fault_id), (record.fault_name, 7))
+
+    def test_versions_and_invalidate(self):
+        record = FaultNameRecord('A', 1, np.arange(4, dtype=np.int32))
+        self.cache.put('TABLE', 'RS', 'A', record)
+        self.cache.put('TABLE', 'RS2', 'A', record)
+        self.assertEqual(DiskCache(self.tmpdir.name, version='v2').get_many('TABLE', 'RS', ['A'], FaultNameRecord), {})
+
+        self.cache.invalidate('RS')
+        self.assertEqual(self.cache.get_many('TABLE', 'RS', ['A'], FaultNameRecord), {})
+        self.assertEqual(list(self.cache.get_many('TABLE', 'RS2', ['A'], FaultNameRecord)), ['A'])
+
+    def test_stamps(self):
+        record = FaultNameRecord('A', 1, np.arange(4, dtype=np.int32))
+        self.cache.put('TABLE', 'RS', 'A', record, stamp='first')
+        self.assertEqual(list(self.cache.get_many('TABLE', 'RS', ['A'], FaultNameRecord, 'first')), ['A'])
+        self.assertEqual(self.cache.get_many('TABLE', 'RS', ['A'], FaultNameRecord, 'second'), {})
+
+        # the first record stored for a new stamp removes those of earlier stamps
+        self.cache.put('TABLE', 'RS', 'B', record._replace(fault_name='B'), stamp='second')
+        self.assertEqual(self.cache.get_many('TABLE', 'RS', ['A'], FaultNameRecord, 'first'), {})
+        self.assertEqual(list(self.cache.get_many('TABLE', 'RS', ['A', 'B'], FaultNameRecord, 'second')), ['B'])
+
+    def test_expiry(self):
+        record = FaultNameRecord('A', 1, np.arange(4, dtype=np.int32))
+        expiring = DiskCache(self.tmpdir.name, version='v1', ttl=60)
+        expiring.put('TABLE', 'RS', 'A', record)
+        self.assertEqual(list(expiring.get_many('TABLE', 'RS', ['A'], FaultNameRecord)), ['A'])
+
+        an_hour_ago = time.time() - 3600
+        os.utime(expiring._path('TABLE', 'RS', None) / 'A.json', (an_hour_ago, an_hour_ago))
+        self.assertEqual(expiring.get_many('TABLE', 'RS', ['A'], FaultNameRecord), {})
+        self.assertEqual(list(self.cache.get_many('TABLE', 'RS', ['A'], FaultNameRecord)), ['A'])
+
+
+@mock_dynamodb
+class TestDiskCacheTier(unittest.TestCase):
+    def setUp(self):
+        model.set_local_mode()
+        model.migrate()
+        location_radius.clear_caches()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        model.RuptureSetLocationDistances(
+            rupture_set_id='RUPSET_ZZ',
+            location_radius='WLG:10',
+            radius=10,
+            location='WLG',
+            ruptures=[1, 2, 3],
+            distances=[1.0, 2.0, 3.0],
+            rupture_count=3,
+        ).save()
+
+    def tearDown(self):
+        model.drop_all()
+        location_radius.clear_caches()
+        self.tmpdir.cleanup()
+
+    def test_records_are_read_from_disk_after_a_cold_start(self):
+        with mock.patch.object(cache, 'disk_cache', DiskCache(self.tmpdir.name)):
+            self.assertEqual(get_location_radius_rupture_ids('RUPSET_ZZ', ('WLG', 'AKL'), 10, union=True), {1, 2, 3})
+            location_radius.query_fn('RUPSET_ZZ', 'WLG', 10)  # id queries cache just the ids
+            location_radius.clear_caches()  # as if a new process
+            with mock.patch('solvis_store.backends.dynamodb.batch_get_shards') as fetch:
+                rids = get_location_radius_rupture_ids('RUPSET_ZZ', ('WLG', 'AKL'), 10, union=True)
+                records = location_radius.query_fn('RUPSET_ZZ', 'WLG', 10)
+        # only the misses, which are not stored on disk, are fetched again
+        fetched = [key for call in fetch.call_args_list if call.args for key in call.args[2]]
+        self.assertNotIn('WLG:10', fetched)
+        self.assertEqual(rids, {1, 2, 3})
+        self.assertEqual(records[0].ruptures.tolist(), [1, 2, 3])
+
+    def test_misses_are_not_stored(self):
+        disk_cache = DiskCache(self.tmpdir.name)
+        with mock.patch.object(cache, 'disk_cache', disk_cache):
+            self.assertEqual(location_radius.query_fn('RUPSET_ZZ', 'AKL', 10), [])
+        self.assertEqual(disk_cache.get_many(LOCATION_RADIUS_TABLE_NAME, 'RUPSET_ZZ', ['AKL:10'], dict), {})
+
+    def test_a_new_populate_stamp_hides_stored_records(self):
+        backend = DynamoDBBackend()
+        backend.put_stamp('RUPSET_ZZ', 'first')
+        with mock.patch.object(cache, 'disk_cache', DiskCache(self.tmpdir.name)):
+            self.assertEqual(get_location_radius_rupture_ids('RUPSET_ZZ', ('WLG', 'AKL'), 10, union=True), {1, 2, 3})
+            backend.batch_put([('RUPSET_ZZ', LocationRadiusRecord('WLG:10', np.array([4]), np.array([4.0]), 10))])
+            backend.put_stamp('RUPSET_ZZ', 'second')
+            location_radius.clear_caches()  # as if a new process
+            self.assertEqual(get_location_radius_rupture_ids('RUPSET_ZZ', ('WLG',), 10), {4})
+
+    def test_no_stamp_table_skips_the_disk_tier(self):
+        model.RuptureSetPopulateStamp.delete_table()  # as deployed before the table was added
+        disk_cache = DiskCache(self.tmpdir.name)
+        with mock.patch.multiple(cache, disk_cache=disk_cache, _warned_no_stamps=False), self.assertLogs(cache.log):
+            self.assertEqual(get_location_radius_rupture_ids('RUPSET_ZZ', ('WLG',), 10), {1, 2, 3})
+            self.assertEqual(location_radius.query_fn('RUPSET_ZZ', 'WLG', 10)[0].ruptures.tolist(), [1, 2, 3])
+        self.assertEqual(disk_cache.get_many(LOCATION_RADIUS_TABLE_NAME, 'RUPSET_ZZ', ['WLG:10'], dict), {})
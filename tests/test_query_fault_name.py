@@ -2,9 +2,16 @@
 """Tests for `solvis_store.model` package."""
 
 import unittest
+
 from moto import mock_dynamodb
+
 from solvis_store import model
-from solvis_store.query import get_fault_name_rupture_ids, get_fault_name_ruptures
+from solvis_store.query import (
+    get_fault_name_rupture_columns,
+    get_fault_name_rupture_id_array,
+    get_fault_name_rupture_ids,
+    get_fault_name_ruptures,
+)
 
 
 @mock_dynamodb
@@ -40,6 +47,13 @@ class TestRuptureIds(unittest.TestCase):
             ruptures=[1, 2, 3, 7, 8, 9],
             rupture_count=6,
         ).save()
+        model.RuptureSetParentFaultRuptures(
+            rupture_set_id='RUPSET_ZZ',
+            fault_id=5,
+            fault_name='PILSNER',
+            packed_ruptures=[3, 4, 5],
+            rupture_count=3,
+        ).save()
         return super(TestRuptureIds, self).setUp()
 
     def test_get_fault_name_rupture_ids_STOUT(self):
@@ -62,6 +76,12 @@ class TestRuptureIds(unittest.TestCase):
         self.assertEqual(len(rids), 4)
         assert sorted(rids) == [1, 2, 3, 4]
 
+    def test_get_fault_name_rupture_id_array_APA_STOUT(self):
+        rids = get_fault_name_rupture_id_array(rupture_set_id='RUPSET_ZZ', fault_names=['APA', 'STOUT'])
+        self.assertEqual(rids.tolist(), [2, 3])
+        rids = get_fault_name_rupture_id_array(rupture_set_id='RUPSET_ZZ', fault_names=['APA', 'STOUT'], union=True)
+        self.assertEqual(rids.tolist(), [1, 2, 3, 4])
+
     def test_get_fault_name_rupture_ids_APA_STOUT_IPA_intersection(self):
         rids = list(get_fault_name_rupture_ids(rupture_set_id='RUPSET_ZZ', fault_names=['STOUT', 'APA', 'IPA']))
         self.assertEqual(len(rids), 0)
@@ -82,6 +102,17 @@ class TestRuptureIds(unittest.TestCase):
         for rsd in rsds:
             assert 'DRAUGHT' == rsd.fault_name
 
+    def test_get_fault_name_rupture_columns_APA_STOUT_IPA_union(self):
+        columns = get_fault_name_rupture_columns(
+            rupture_set_id='RUPSET_ZZ', fault_names=['STOUT', 'APA', 'IPA', 'NOPE'], union=True
+        )
+        self.assertEqual(columns.rupt_id.tolist(), [1, 2, 3, 2, 3, 4, 44, 45])
+        self.assertEqual(columns.fault_id.tolist(), [0, 0, 0, 2, 2, 2, 3, 3])
+
+        df = columns.to_dataframe()
+        self.assertEqual(df.fault_name.tolist(), ['STOUT'] * 3 + ['APA'] * 3 + ['IPA'] * 2)
+        self.assertEqual(list(df.fault_name.cat.categories), ['STOUT', 'APA', 'IPA', 'NOPE'])
+
     def test_get_fault_name_ruptures_APA_STOUT_IPA_union(self):
         rids = list(
             get_fault_name_ruptures(rupture_set_id='RUPSET_ZZ', fault_names=['STOUT', 'APA', 'IPA'], union=True)
@@ -90,6 +121,18 @@ class TestRuptureIds(unittest.TestCase):
         self.assertEqual(len(rids), 8)
         assert sorted(set([rid.rupt_id for rid in rids])) == [1, 2, 3, 4, 44, 45]
 
+    def test_get_fault_name_rupture_ids_compact_APA_PILSNER_intersection(self):
+        rids = list(get_fault_name_rupture_ids(rupture_set_id='RUPSET_ZZ', fault_names=['APA', 'PILSNER']))
+        assert sorted(rids) == [3, 4]
+
+    def test_get_fault_name_ruptures_compact_PILSNER(self):
+        rsds = list(get_fault_name_ruptures(rupture_set_id='RUPSET_ZZ', fault_names=['PILSNER']))
+        assert [(rsd.rupt_id, rsd.fault_id, rsd.fault_name) for rsd in rsds] == [
+            (3, 5, 'PILSNER'),
+            (4, 5, 'PILSNER'),
+            (5, 5, 'PILSNER'),
+        ]
+
     def tearDown(self):
         # with app.app_context():
         model.RuptureSetParentFaultRuptures.delete_table()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+"""Tests for the `solvis_store.query` entry point staying light to import."""
+
+import json
+import subprocess
+import sys
+import unittest
+
+HEAVY = ('solvis', 'geopandas', 'pyproj', 'shapely', 'pandas', 'nzshm_common', 'boto3', 'botocore')
+
+
+def imported_packages(statement):
+    """The top level packages imported by the statement, in a new interpreter."""
+    code = f'import json, sys; {statement}; print(json.dumps(sorted({{m.split(".")[0] for m in sys.modules}})))'
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    return set(json.loads(output.splitlines()[-1]))
+
+
+class TestQueryImports(unittest.TestCase):
+    def test_query_imports_no_heavy_packages(self):
+        self.assertEqual(imported_packages('import solvis_store.query') & set(HEAVY), set())
+
+    def test_cloudwatch_client_is_lazy(self):
+        packages = imported_packages('import solvis_store.cloudwatch; solvis_store.cloudwatch.flush_metrics()')
+        self.assertNotIn('boto3', packages)
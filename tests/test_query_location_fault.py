@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.query.location_fault` module."""
+
+import unittest
+
+import numpy as np
+from moto import mock_dynamodb
+
+from solvis_store import instrumentation, model
+from solvis_store.bulk_load import bulk_load
+from solvis_store.query import (
+    fault_name,
+    get_fault_name_rupture_ids,
+    get_location_fault_rupture_columns,
+    get_location_fault_rupture_id_array,
+    get_location_radius_rupture_ids,
+    location_fault,
+    prefetch_fault_names,
+)
+
+LOCATIONS = {'WLG': [1, 2, 3, 4, 5, 6], 'MRO': [2, 4, 6, 8], 'IVC': [40, 41]}
+FAULTS = {'Wellington': (10, [2, 3, 4, 40]), 'Ohariu': (11, [4, 5, 6, 7, 8]), 'Alpine': (12, [99])}
+
+
+def models():
+    for loc, ruptures in LOCATIONS.items():
+        yield model.RuptureSetLocationDistances(
+            rupture_set_id='RS_1',
+            location_radius=f'{loc}:50',
+            radius=50,
+            location=loc,
+            packed_ruptures=ruptures,
+            packed_distances=[float(rupt * 1000) for rupt in ruptures],
+            rupture_count=len(ruptures),
+        )
+    for name, (fault_id, ruptures) in FAULTS.items():
+        yield model.RuptureSetParentFaultRuptures(
+            rupture_set_id='RS_1',
+            fault_name=name,
+            fault_id=fault_id,
+            packed_ruptures=ruptures,
+            rupture_count=len(ruptures),
+        )
+
+
+@mock_dynamodb
+class TestLocationFault(unittest.TestCase):
+    def setUp(self):
+        model.set_local_mode()
+        model.migrate()
+        bulk_load(models())
+        fault_name.clear_caches()
+        self.addCleanup(fault_name.clear_caches)
+        instrumentation.reset_stats()
+
+    def ids(self, locations, fault_names, location_union=False, fault_union=False):
+        return get_location_fault_rupture_id_array(
+            'RS_1', locations, 50, fault_names, location_union, fault_union
+        ).tolist()
+
+    def test_matches_separate_queries(self):
+        for locations in (['WLG'], ['WLG', 'MRO'], ['WLG', 'IVC'], ['NOPE']):
+            for fault_names in (['Wellington'], ['Wellington', 'Ohariu'], ['Alpine', 'NOPE'], ['NOPE']):
+                for location_union in (False, True):
+                    for fault_union in (False, True):
+                        with self.subTest(query=(locations, fault_names, location_union, fault_union)):
+                            expected = get_location_radius_rupture_ids(
+                                'RS_1', tuple(locations), 50, location_union
+                            ) & get_fault_name_rupture_ids('RS_1', fault_names, fault_union)
+                            self.assertEqual(
+                                self.ids(locations, fault_names, location_union, fault_union), sorted(expected)
+                            )
+
+    def test_one_batched_read_of_each_kind(self):
+        self.assertEqual(self.ids(['WLG'], ['Wellington']), [2, 3, 4])
+        stats = instrumentation.read_stats()
+        self.assertEqual(
+            {name: stat.reads for name, stat in stats.items()},
+            {'RuptureSetLocationDistances.batch_get': 1, 'RuptureSetParentFaultRuptures.batch_get': 1},
+        )
+
+    def test_columns(self):
+        columns = get_location_fault_rupture_columns(
+            'RS_1', ['WLG', 'MRO'], 50, ['Wellington', 'Ohariu'], location_union=True, fault_union=True
+        )
+        rows = [
+            (rupt_id, columns.locations[loc], distance, fault_id, columns.fault_names[code])
+            for rupt_id, loc, distance, fault_id, code in zip(
+                columns.rupt_id.tolist(),
+                columns.location_id.tolist(),
+                columns.distance.tolist(),
+                columns.fault_id.tolist(),
+                columns.fault_name.tolist(),
+            )
+        ]
+        self.assertEqual(
+            rows,
+            [
+                (2, 'WLG', 2000.0, 10, 'Wellington'),
+                (3, 'WLG', 3000.0, 10, 'Wellington'),
+                (4, 'WLG', 4000.0, 10, 'Wellington'),
+                (4, 'WLG', 4000.0, 11, 'Ohariu'),
+                (5, 'WLG', 5000.0, 11, 'Ohariu'),
+                (6, 'WLG', 6000.0, 11, 'Ohariu'),
+                (2, 'MRO', 2000.0, 10, 'Wellington'),
+                (4, 'MRO', 4000.0, 10, 'Wellington'),
+                (4, 'MRO', 4000.0, 11, 'Ohariu'),
+                (6, 'MRO', 6000.0, 11, 'Ohariu'),
+                (8, 'MRO', 8000.0, 11, 'Ohariu'),
+            ],
+        )
+        df = columns.to_dataframe()
+        self.assertEqual(list(df.columns), ['rupt_id', 'location_id', 'distance', 'fault_id', 'fault_name'])
+        self.assertEqual(df.fault_name.iloc[-1], 'Ohariu')
+
+    def test_no_match(self):
+        columns = get_location_fault_rupture_columns('RS_1', ['IVC'], 50, ['Ohariu'])
+        self.assertEqual(len(columns.rupt_id), 0)
+        self.assertEqual((columns.locations, columns.fault_names), (('IVC',), ('Ohariu',)))
+
+    def test_prefetched_fault_names(self):
+        prefetch_fault_names('RS_1')
+        instrumentation.reset_stats()
+        self.assertEqual(self.ids(['WLG', 'MRO'], ['Ohariu']), [4, 6])
+        self.assertEqual(list(instrumentation.read_stats()), ['RuptureSetLocationDistances.batch_get'])
+
+
+class TestMatchingIds(unittest.TestCase):
+    def arrays(self, *ids):
+        return [np.array(arr, dtype=np.int32) for arr in ids]
+
+    def test_union_sides_filter(self):
+        locations = self.arrays([1, 2, 3, 4], [2, 3, 4, 5])
+        faults = self.arrays([3], [5, 9])
+        self.assertEqual(location_fault.matching_ids(locations, faults, False, True).tolist(), [3])
+        self.assertEqual(location_fault.matching_ids(locations, faults, True, True).tolist(), [3, 5])
+        self.assertEqual(location_fault.matching_ids(locations, faults, True, False).tolist(), [])
+        self.assertEqual(location_fault.matching_ids(locations, [], True, True).tolist(), [])
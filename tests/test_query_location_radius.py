@@ -1,11 +1,25 @@
 #!/usr/bin/env python
 """Tests for `solvis_store.model` package."""
 
-import unittest
 import random
+import unittest
+
+import numpy as np
 from moto import mock_dynamodb
-from solvis_store import model
-from solvis_store.query import get_location_radius_rupture_ids, get_location_radius_ruptures
+
+from solvis_store import instrumentation, model
+from solvis_store.config import LOCATION_RADIUS_TABLE_NAME
+from solvis_store.query import (
+    get_location_radius_rupture_columns,
+    get_location_radius_rupture_id_array,
+    get_location_radius_rupture_ids,
+    get_location_radius_ruptures,
+    get_nearest_rupture_columns,
+    get_nearest_ruptures,
+    location_radius,
+)
+from solvis_store.query.cache import query_cache
+from solvis_store.records import LocationRadiusRecord, radius_cut
 
 
 @mock_dynamodb
@@ -49,6 +63,15 @@ class TestRuptureIds(unittest.TestCase):
             distances=[float(random.randint(1000, 10000)) for n in range(6)],
             rupture_count=6,
         ).save()
+        model.RuptureSetLocationDistances(
+            rupture_set_id='test_ruptset_id',
+            location_radius='CMP:10000',
+            radius=10000,
+            location='CMP',
+            packed_ruptures=[2, 3, 5],
+            packed_distances=[1000.0, 2000.0, 3000.0],
+            rupture_count=3,
+        ).save()
         return super(TestRuptureIds, self).setUp()
 
     def test_get_location_radius_rupture_ids_miss_union(self):
@@ -84,6 +107,17 @@ class TestRuptureIds(unittest.TestCase):
         self.assertEqual(len(rids), 2)
         assert sorted(rids) == [2, 3]
 
+    def test_get_location_radius_rupture_id_array_MRO_WLG(self):
+        rids = get_location_radius_rupture_id_array(
+            rupture_set_id='test_ruptset_id', locations=('MRO', 'WLG'), radius=10000, union=True
+        )
+        self.assertEqual(rids.tolist(), [1, 2, 3, 4])
+        rids = get_location_radius_rupture_id_array(
+            rupture_set_id='test_ruptset_id', locations=('MRO', 'WLG'), radius=10000, union=False
+        )
+        self.assertEqual(rids.tolist(), [2, 3])
+        assert not rids.flags.writeable
+
     def test_get_location_radius_rupture_ids_MRO_WLG_union(self):
         rids = list(
             get_location_radius_rupture_ids(
@@ -120,6 +154,23 @@ class TestRuptureIds(unittest.TestCase):
             assert 1000 <= rsd.distance <= 10000
             assert 'ZSD' == rsd.location_id
 
+    def test_get_location_radius_rupture_columns_MRO_WLG_IVC_union(self):
+        columns = get_location_radius_rupture_columns(
+            rupture_set_id='test_ruptset_id', locations=('MRO', 'WLG', 'IVC'), radius=10000, union=True
+        )
+        rsds = list(
+            get_location_radius_ruptures(
+                rupture_set_id='test_ruptset_id', locations=('MRO', 'WLG', 'IVC'), radius=10000, union=True
+            )
+        )
+        self.assertEqual(columns.rupt_id.tolist(), [rsd.rupt_id for rsd in rsds])
+        self.assertEqual([columns.locations[code] for code in columns.location_id], [rsd.location_id for rsd in rsds])
+        self.assertEqual(columns.distance.tolist(), [rsd.distance for rsd in rsds])
+
+        df = columns.to_dataframe()
+        self.assertEqual(list(df.columns), ['rupt_id', 'location_id', 'distance'])
+        self.assertEqual(df.location_id.tolist(), [rsd.location_id for rsd in rsds])
+
     def test_get_location_radius_ruptures_MRO_WLG_IVC_union(self):
         rids = list(
             get_location_radius_ruptures(
@@ -130,7 +181,176 @@ class TestRuptureIds(unittest.TestCase):
         self.assertEqual(len(rids), 8)
         assert sorted(set([rid.rupt_id for rid in rids])) == [1, 2, 3, 4, 44, 45]
 
+    def test_get_location_radius_rupture_ids_compact_MRO_CMP_intersection(self):
+        rids = list(
+            get_location_radius_rupture_ids(rupture_set_id='test_ruptset_id', locations=('MRO', 'CMP'), radius=10000)
+        )
+        assert sorted(rids) == [2, 3]
+
+    def test_get_location_radius_ruptures_compact_CMP(self):
+        rsds = list(get_location_radius_ruptures(rupture_set_id='test_ruptset_id', locations=('CMP',), radius=10000))
+        assert [(rsd.rupt_id, rsd.distance) for rsd in rsds] == [(2, 1000.0), (3, 2000.0), (5, 3000.0)]
+
     def tearDown(self):
         # with app.app_context():
         model.RuptureSetLocationDistances.delete_table()
         return super(TestRuptureIds, self).tearDown()
+
+
+@mock_dynamodb
+class TestNearestRuptureIds(unittest.TestCase):
+    def setUp(self):
+        model.set_local_mode()
+        model.RuptureSetLocationDistances.create_table(wait=True)
+        location_radius.clear_caches()
+        # nearest items, keyed by location, with the ruptures within radius 200
+        model.RuptureSetLocationDistances(
+            rupture_set_id='RUPSET_NN',
+            location_radius='WLG',
+            radius=200,
+            location='WLG',
+            packed_ruptures=[5, 1, 9, 2, 7],
+            packed_distances=[3.0, 12.0, 40.0, 75.0, 150.0],
+            rupture_count=5,
+        ).save()
+        model.RuptureSetLocationDistances(
+            rupture_set_id='RUPSET_NN',
+            location_radius='MRO',
+            radius=200,
+            location='MRO',
+            ruptures=[1, 2, 3, 9],
+            distances=[60.0, 20.0, 199.0, 74.0],
+            rupture_count=4,
+        ).save()
+        # a stored radius takes precedence
+        model.RuptureSetLocationDistances(
+            rupture_set_id='RUPSET_NN',
+            location_radius='MRO:10',
+            radius=10,
+            location='MRO',
+            ruptures=[4],
+            distances=[1.0],
+            rupture_count=1,
+        ).save()
+
+        # an item for the largest of the stored radii
+        model.RuptureSetLocationDistances(
+            rupture_set_id='RUPSET_NN',
+            location_radius='AKL:200',
+            radius=200,
+            location='AKL',
+            ruptures=[4, 6, 8],
+            distances=[30.0, 5.0, 90.0],
+            rupture_count=3,
+        ).save()
+
+    def tearDown(self):
+        model.RuptureSetLocationDistances.delete_table()
+        location_radius.clear_caches()
+
+    def test_any_radius(self):
+        self.assertEqual(get_location_radius_rupture_ids('RUPSET_NN', ('WLG',), 12), {5})
+        self.assertEqual(get_location_radius_rupture_ids('RUPSET_NN', ('WLG',), 12.5), {1, 5})
+        self.assertEqual(get_location_radius_rupture_ids('RUPSET_NN', ('WLG',), 75), {1, 5, 9})
+        self.assertEqual(get_location_radius_rupture_ids('RUPSET_NN', ('WLG', 'MRO'), 75), {1, 9})
+        self.assertEqual(get_location_radius_rupture_ids('RUPSET_NN', ('WLG', 'MRO'), 200), {1, 2, 9})
+
+    def test_columns_are_in_rupture_order(self):
+        columns = get_location_radius_rupture_columns('RUPSET_NN', ('WLG',), 100, union=True)
+        self.assertEqual(columns.rupt_id.tolist(), [1, 2, 5, 9])
+        self.assertEqual(columns.distance.tolist(), [12.0, 75.0, 3.0, 40.0])
+        record = location_radius.query_fn('RUPSET_NN', 'MRO', 70)[0]
+        self.assertEqual((record.ruptures.tolist(), record.distances.tolist()), ([1, 2], [60.0, 20.0]))
+
+    def test_stored_radius_and_beyond_nearest(self):
+        self.assertEqual(get_location_radius_rupture_ids('RUPSET_NN', ('MRO',), 10), {4})
+        self.assertEqual(get_location_radius_rupture_ids('RUPSET_NN', ('WLG',), 201, union=True), set())
+
+    def test_batch_gets_per_id_query(self):
+        def batch_gets(locations, radius):
+            instrumentation.reset_stats()
+            get_location_radius_rupture_ids('RUPSET_NN', locations, radius, union=True)
+            return instrumentation.read_stats()['RuptureSetLocationDistances.batch_get'].reads
+
+        # the first finds only a nearest item, and reads it again with its distances
+        self.assertEqual(batch_gets(('WLG',), 20), 2)
+        # then the rupture set is known to have nearest items
+        self.assertEqual(batch_gets(('AKL', 'NADA'), 20), 1)
+        self.assertEqual(batch_gets(('MRO',), 25), 1)
+
+    def test_nearest_ruptures(self):
+        def nearest(*args, **kwargs):
+            return [tuple(rsd) for rsd in get_nearest_ruptures('RUPSET_NN', *args, **kwargs)]
+
+        self.assertEqual(nearest(('WLG',), 2), [(5, 'WLG', 3.0), (1, 'WLG', 12.0)])
+        self.assertEqual(nearest(('WLG',), 2, max_distance=10), [(5, 'WLG', 3.0)])
+        self.assertEqual(
+            nearest(('AKL', 'MRO'), 2), [(6, 'AKL', 5.0), (4, 'AKL', 30.0), (2, 'MRO', 20.0), (1, 'MRO', 60.0)]
+        )
+        self.assertEqual(nearest(('NADA',), 2), [])
+
+    def test_nearest_ruptures_union(self):
+        columns = get_nearest_rupture_columns('RUPSET_NN', ('WLG', 'MRO', 'AKL'), 4, union=True)
+        self.assertEqual(columns.rupt_id.tolist(), [5, 6, 1, 2])
+        self.assertEqual(columns.distance.tolist(), [3.0, 5.0, 12.0, 20.0])
+        self.assertEqual([columns.locations[idx] for idx in columns.location_id], ['WLG', 'AKL', 'WLG', 'MRO'])
+
+
+@mock_dynamodb
+class TestIdOnlyReads(unittest.TestCase):
+    def setUp(self):
+        model.set_local_mode()
+        model.RuptureSetLocationDistances.create_table(wait=True)
+        location_radius.clear_caches()
+        for loc, compact in (('WLG', False), ('MRO', True)):
+            arrays = dict(ruptures=list(range(1000)), distances=[n / 7 for n in range(1000)])
+            if compact:
+                arrays = dict(packed_ruptures=arrays['ruptures'], packed_distances=arrays['distances'])
+            model.RuptureSetLocationDistances(
+                rupture_set_id='RUPSET_ID',
+                location_radius=f'{loc}:100',
+                radius=100,
+                location=loc,
+                rupture_count=1000,
+                **arrays,
+            ).save()
+        instrumentation.reset_stats()
+
+    def tearDown(self):
+        model.RuptureSetLocationDistances.delete_table()
+        location_radius.clear_caches()
+
+    def bytes_read(self):
+        return sum(stats.bytes for stats in instrumentation.read_stats().values())
+
+    def test_ids_are_read_without_distances(self):
+        for loc in ('WLG', 'MRO'):
+            with self.subTest(loc=loc):
+                instrumentation.reset_stats()
+                self.assertEqual(len(get_location_radius_rupture_id_array('RUPSET_ID', (loc,), 100)), 1000)
+                ids_bytes = self.bytes_read()
+                self.assertEqual(query_cache.get_many('RUPSET_ID', LOCATION_RADIUS_TABLE_NAME, [f'{loc}:100']), {})
+
+                instrumentation.reset_stats()
+                self.assertEqual(len(get_location_radius_rupture_columns('RUPSET_ID', (loc,), 100).distance), 1000)
+                self.assertLess(ids_bytes, self.bytes_read() * 0.6)
+
+    def test_missing_locations_cost_no_more_batch_gets(self):
+        ids = get_location_radius_rupture_ids('RUPSET_ID', ('WLG', 'NADA'), 100, union=True)
+        self.assertEqual(ids, set(range(1000)))
+        self.assertEqual(instrumentation.read_stats()['RuptureSetLocationDistances.batch_get'].reads, 1)
+
+    def test_cached_records_serve_id_queries(self):
+        location_radius.query_fn('RUPSET_ID', 'WLG', 100)
+        instrumentation.reset_stats()
+        self.assertEqual(get_location_radius_rupture_ids('RUPSET_ID', ('WLG', 'MRO'), 100), set(range(1000)))
+        self.assertEqual(instrumentation.read_stats()['RuptureSetLocationDistances.batch_get'].items, 1)
+
+
+class TestRadiusCut(unittest.TestCase):
+    def test_radius_cut(self):
+        nearest = LocationRadiusRecord('WLG', np.array([5, 1, 9]), np.array([3.0, 12.0, 40.0]), radius=50)
+        cut = radius_cut(nearest, 'WLG:20', 20)
+        self.assertEqual((cut.location_radius, cut.ruptures.tolist(), cut.radius), ('WLG:20', [1, 5], 20))
+        with self.assertRaises(ValueError):
+            radius_cut(nearest, 'WLG:60', 60)
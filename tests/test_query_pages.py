@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""Tests for the paged queries, see `solvis_store.query.pages`."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from solvis_store.backends import set_backend
+from solvis_store.backends.sqlite import SQLiteBackend
+from solvis_store.query import (
+    fault_name,
+    get_fault_name_rupture_page,
+    get_fault_name_ruptures,
+    get_location_radius_rupture_page,
+    get_location_radius_ruptures,
+    iter_fault_name_rupture_pages,
+    iter_location_radius_rupture_pages,
+    location_radius,
+    pages,
+)
+from solvis_store.records import FaultNameRecord, LocationRadiusRecord
+
+LOCATIONS = ('WLG', 'MRO', 'CHC')
+
+
+def records():
+    rng = np.random.default_rng(7)
+    for loc in LOCATIONS:
+        ruptures = np.unique(rng.integers(0, 300, 150)).astype(np.int32)
+        # few distinct distances, so there are ties to break
+        distances = rng.integers(0, 20, len(ruptures)).astype(np.float32) * 5
+        yield 'RS_1', LocationRadiusRecord(f'{loc}:100', ruptures, distances, radius=100)
+    for fault_id in range(3):
+        ruptures = np.unique(rng.integers(0, 300, 100)).astype(np.int32)
+        yield 'RS_1', FaultNameRecord(f'Fault {fault_id}', fault_id, ruptures)
+
+
+class TestPages(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        backend = SQLiteBackend(Path(self.tmpdir.name) / 'store.sqlite')
+        self.addCleanup(backend.close)
+        backend.batch_put(records())
+        set_backend(backend)
+        self.addCleanup(set_backend, None)
+        for module in (location_radius, fault_name):
+            module.clear_caches()
+            self.addCleanup(module.clear_caches)
+
+    def test_location_radius_pages_by_rupture_id(self):
+        for union in (True, False):
+            expected = sorted(
+                get_location_radius_ruptures('RS_1', LOCATIONS, 100, union),
+                key=lambda r: (r.rupt_id, LOCATIONS.index(r.location_id)),
+            )
+            found = list(iter_location_radius_rupture_pages('RS_1', LOCATIONS, 100, union, limit=7))
+            self.assertTrue(all(len(page.rows) == 7 for page in found[:-1]))
+            self.assertTrue(0 < len(found[-1].rows) <= 7)
+            self.assertEqual([row for page in found for row in page.rows], expected)
+
+    def test_location_radius_pages_by_distance(self):
+        expected = sorted(
+            get_location_radius_ruptures('RS_1', LOCATIONS, 100, union=True),
+            key=lambda r: (r.distance, r.rupt_id, LOCATIONS.index(r.location_id)),
+        )
+        found = iter_location_radius_rupture_pages('RS_1', LOCATIONS, 100, union=True, order='distance', limit=11)
+        self.assertEqual([row for page in found for row in page.rows], expected)
+
+    def test_resume_from_cursor(self):
+        first = get_location_radius_rupture_page('RS_1', LOCATIONS, 100, True, order='distance', limit=20)
+        second = get_location_radius_rupture_page('RS_1', LOCATIONS, 100, True, 'distance', 20, first.cursor)
+        both = get_location_radius_rupture_page('RS_1', LOCATIONS, 100, True, order='distance', limit=40)
+        self.assertEqual(first.rows + second.rows, both.rows)
+
+        resumed = iter_location_radius_rupture_pages('RS_1', LOCATIONS, 100, True, limit=20, cursor=None)
+        rows = [row for page in resumed for row in page.rows]
+        last = get_location_radius_rupture_page('RS_1', LOCATIONS, 100, True, limit=len(rows) - 3)
+        self.assertEqual(
+            get_location_radius_rupture_page('RS_1', LOCATIONS, 100, True, cursor=last.cursor).rows, rows[-3:]
+        )
+
+    def test_distance_pages_touch_a_window_of_rows(self):
+        for union in (True, False):
+            cursor = None
+            for _ in range(3):
+                after = pages.decode_cursor(cursor, 'distance')
+                columns = location_radius.page_columns('RS_1', LOCATIONS, 100, union, 'distance', after, 6)
+                self.assertLessEqual(len(columns.rupt_id), len(LOCATIONS) * 6)
+                page = get_location_radius_rupture_page('RS_1', LOCATIONS, 100, union, 'distance', 5, cursor)
+                cursor = page.cursor
+
+    def test_fault_name_pages(self):
+        faults = ['Fault 0', 'Fault 1', 'Fault 2', 'NOPE']
+        for union in (True, False):
+            expected = sorted(get_fault_name_ruptures('RS_1', faults, union), key=lambda r: (r.rupt_id, r.fault_id))
+            found = list(iter_fault_name_rupture_pages('RS_1', faults, union, limit=5))
+            self.assertEqual([row for page in found for row in page.rows], expected)
+            self.assertIsNone(found[-1].cursor)
+
+    def test_empty_and_exact_pages(self):
+        page = get_location_radius_rupture_page('RS_1', ('NOPE',), 100)
+        self.assertEqual(page, pages.Page([], None))
+        count = len(list(get_fault_name_ruptures('RS_1', ['Fault 1'])))
+        page = get_fault_name_rupture_page('RS_1', ['Fault 1'], limit=count)
+        self.assertEqual((len(page.rows), page.cursor), (count, None))
+
+    def test_invalid_args(self):
+        cursor = get_location_radius_rupture_page('RS_1', LOCATIONS, 100, True, limit=2).cursor
+        with self.assertRaises(ValueError):
+            get_location_radius_rupture_page('RS_1', LOCATIONS, 100, True, order='distance', cursor=cursor)
+        with self.assertRaises(ValueError):
+            get_location_radius_rupture_page('RS_1', LOCATIONS, 100, cursor='not a cursor')
+        with self.assertRaises(ValueError):
+            get_location_radius_rupture_page('RS_1', LOCATIONS, 100, limit=0)
+        with self.assertRaises(ValueError):
+            get_fault_name_rupture_page('RS_1', ['Fault 1'], order='distance')
+
+
+class TestPageRows(unittest.TestCase):
+    def test_page_rows(self):
+        first = np.array([3, 1, 2, 1, 3, 2])
+        second = np.array([0, 1, 0, 0, 1, 1])
+        self.assertEqual(pages.page_rows([first, second], None, 4).tolist(), [3, 1, 2, 5])
+        self.assertEqual(pages.page_rows([first, second], (2, 0), 3).tolist(), [5, 0, 4])
+        self.assertEqual(pages.page_rows([first, second], (3, 1), 3).tolist(), [])
+
+    def test_key_position(self):
+        first = np.array([1, 2, 2, 2, 5])
+        second = np.array([9, 1, 3, 3, 0])
+        self.assertEqual(pages.key_position([first, second], (2, 3)), 2)
+        self.assertEqual(pages.key_position([first, second], (2, 3), 'right'), 4)
+        self.assertEqual(pages.key_position([first, second], (3, 0)), 4)
+        self.assertEqual(pages.key_position([first, second], (0, 0), 'right'), 0)
+
+    def test_sorted_window(self):
+        even = np.arange(0, 100, 2)
+        self.assertEqual(pages.sorted_window(3, 100, 4, lambda rows: rows % 2 == 0).tolist(), [4, 6, 8, 10])
+        self.assertEqual(pages.sorted_window(95, 100, 4, lambda rows: rows % 2 == 0).tolist(), [96, 98])
+        self.assertEqual(pages.sorted_window(0, 50, 3, lambda rows: even[rows] > 90).tolist(), [46, 47, 48])
+
+    def test_id_window(self):
+        ids = np.array([1, 3, 5, 7, 9])
+        self.assertEqual(pages.id_window(ids, None, 2).tolist(), [1, 3])
+        self.assertEqual(pages.id_window(ids, (5, 0), 2).tolist(), [5, 7, 9])
+        self.assertEqual(pages.id_window(ids, (4, 0), 2).tolist(), [5, 7])
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.query.prefetch` module."""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from moto import mock_dynamodb
+
+from solvis_store import instrumentation, model
+from solvis_store.bulk_load import bulk_load
+from solvis_store.query import (
+    fault_name,
+    get_fault_name_rupture_ids,
+    get_fault_name_ruptures,
+    prefetch,
+    prefetch_fault_names,
+    warm_up,
+)
+from solvis_store.query.cache import query_cache
+
+
+def fault_models(rupture_set_id, count):
+    for idx in range(count):
+        yield model.RuptureSetParentFaultRuptures(
+            rupture_set_id=rupture_set_id,
+            fault_id=idx,
+            fault_name=f"FAULT_{idx:03d}",
+            packed_ruptures=list(range(idx, idx + 10)),
+            rupture_count=10,
+        )
+
+
+@mock_dynamodb
+class TestPrefetch(unittest.TestCase):
+    def setUp(self):
+        model.set_local_mode()
+        model.migrate()
+        bulk_load(fault_models('RUPSET_ZZ', 120))
+        bulk_load(fault_models('RUPSET_YY', 3))
+        fault_name.clear_caches()
+        self.addCleanup(fault_name.clear_caches)
+        instrumentation.reset_stats()
+
+    def reads(self):
+        return sum(stats.reads for stats in instrumentation.read_stats().values())
+
+    def test_queries_are_served_from_memory(self):
+        (index,) = warm_up(['RUPSET_ZZ'])
+        self.assertEqual(len(index), 120)
+        self.assertEqual(self.reads(), 1)
+        self.assertEqual(instrumentation.read_stats()['RuptureSetParentFaultRuptures.query'].items, 120)
+
+        self.assertEqual(get_fault_name_rupture_ids('RUPSET_ZZ', ['FAULT_000', 'FAULT_005']), {5, 6, 7, 8, 9})
+        ruptures = list(get_fault_name_ruptures('RUPSET_ZZ', ['FAULT_001', 'NOPE'], union=True))
+        self.assertEqual([r.rupt_id for r in ruptures], list(range(1, 11)))
+        self.assertEqual(fault_name.query_fn('RUPSET_ZZ', ('FAULT_119',))[0].fault_id, 119)
+        self.assertEqual(self.reads(), 1)
+
+        # other rupture sets are read as before
+        self.assertEqual(get_fault_name_rupture_ids('RUPSET_YY', ['FAULT_002']), set(range(2, 12)))
+        self.assertEqual(self.reads(), 2)
+
+    def test_index(self):
+        index = prefetch_fault_names('RUPSET_YY')
+        self.assertEqual(index.fault_id_record(2).fault_name, 'FAULT_002')
+        self.assertIsNone(index.fault_id_record(99))
+        self.assertEqual(
+            index.fault_name_records(['FAULT_001', 'NOPE'])['FAULT_001'].ruptures.tolist(), list(range(1, 11))
+        )
+        self.assertFalse(index.ruptures.flags.writeable)
+        self.assertEqual(index.nbytes, 30 * 4 + 4 * 8 + 3 * 4)
+
+    def test_prefetch_all_on_first_query(self):
+        with mock.patch.object(prefetch, 'PREFETCH_FAULT_NAMES', ['*']):
+            self.assertEqual(warm_up(), [])
+            get_fault_name_rupture_ids('RUPSET_ZZ', ['FAULT_003'])
+            get_fault_name_rupture_ids('RUPSET_ZZ', ['FAULT_004', 'FAULT_007'], union=True)
+        self.assertEqual(self.reads(), 1)
+        self.assertIsNotNone(prefetch.get_fault_name_index('RUPSET_ZZ'))
+
+    def test_drop_prefetched(self):
+        prefetch_fault_names('RUPSET_ZZ')
+        prefetch.drop_prefetched('RUPSET_ZZ')
+        self.assertIsNone(prefetch.get_fault_name_index('RUPSET_ZZ'))
+
+    def test_invalidate_drops_the_index(self):
+        prefetch_fault_names('RUPSET_ZZ')
+        query_cache.invalidate('RUPSET_ZZ')
+        self.assertIsNone(prefetch.get_fault_name_index('RUPSET_ZZ'))
+
+    def test_expired_index_is_loaded_again(self):
+        index = prefetch_fault_names('RUPSET_ZZ')
+        self.assertIs(prefetch.get_fault_name_index('RUPSET_ZZ'), index)
+        index.loaded -= query_cache.ttl + 1
+        instrumentation.reset_stats()
+        reloaded = prefetch.get_fault_name_index('RUPSET_ZZ')
+        self.assertIsNot(reloaded, index)
+        self.assertEqual((len(reloaded), self.reads()), (120, 1))
+
+    def test_concurrent_first_queries_load_once(self):
+        loads = []
+        load = prefetch.prefetch_fault_names
+
+        def slow_load(rupture_set_id):
+            loads.append(rupture_set_id)
+            time.sleep(0.1)  # the other queries arrive while this one loads
+            return load(rupture_set_id)
+
+        with mock.patch.object(prefetch, 'PREFETCH_FAULT_NAMES', ['*']), mock.patch.object(
+            prefetch, 'prefetch_fault_names', slow_load
+        ):
+            threads = [threading.Thread(target=prefetch.get_fault_name_index, args=('RUPSET_ZZ',)) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(loads, ['RUPSET_ZZ'])
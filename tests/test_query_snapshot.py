@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.query.snapshot` module."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from moto import mock_dynamodb
+
+from solvis_store import model
+from solvis_store.bulk_load import bulk_load
+from solvis_store.query import (
+    fault_name,
+    get_fault_name_rupture_ids,
+    get_fault_name_ruptures,
+    get_location_radius_rupture_ids,
+    get_location_radius_ruptures,
+    location_radius,
+    snapshot,
+)
+from solvis_store.sharding import shard_model
+
+
+def location_model(loc, radius, ruptures, compact=False):
+    distances = [round(r / 7, 3) for r in ruptures]
+    arrays = (
+        dict(packed_ruptures=np.array(ruptures), packed_distances=np.array(distances, dtype=np.float32))
+        if compact
+        else dict(ruptures=list(ruptures), distances=distances)
+    )
+    return model.RuptureSetLocationDistances(
+        rupture_set_id='RUPSET_ZZ',
+        location_radius=f'{loc}:{radius}',
+        radius=radius,
+        location=loc,
+        rupture_count=len(ruptures),
+        **arrays,
+    )
+
+
+@mock_dynamodb
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        model.set_local_mode()
+        model.migrate()
+        location_radius.clear_caches()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / 'RUPSET_ZZ.npz'
+        bulk_load(
+            [
+                location_model('WLG', 10, [1, 2, 3]),
+                location_model('MRO', 10, [2, 3, 4], compact=True),
+                *shard_model(location_model('WLG', 100, list(range(0, 3000, 3))), max_item_bytes=4000),
+                model.RuptureSetParentFaultRuptures(
+                    rupture_set_id='RUPSET_ZZ',
+                    fault_name='Alpine: Kaniere',
+                    fault_id=3,
+                    ruptures=[1, 2, 3],
+                    rupture_count=3,
+                ),
+                *shard_model(
+                    model.RuptureSetParentFaultRuptures(
+                        rupture_set_id='RUPSET_ZZ',
+                        fault_name='Big',
+                        fault_id=7,
+                        ruptures=list(range(3000)),
+                        rupture_count=3000,
+                    ),
+                    max_item_bytes=4000,
+                ),
+                model.RuptureSetLocationDistances(
+                    rupture_set_id='OTHER',
+                    location_radius='AKL:10',
+                    radius=10,
+                    location='AKL',
+                    ruptures=[9],
+                    distances=[1.0],
+                    rupture_count=1,
+                ),
+            ]
+        )
+
+    def tearDown(self):
+        snapshot.drop_snapshot('RUPSET_ZZ')
+        location_radius.clear_caches()
+        model.drop_all()
+        self.tmpdir.cleanup()
+
+    def queries(self):
+        return (
+            get_location_radius_rupture_ids('RUPSET_ZZ', ('WLG', 'MRO'), 10),
+            get_location_radius_rupture_ids('RUPSET_ZZ', ('WLG', 'MRO', 'NADA'), 10, union=True),
+            list(get_location_radius_ruptures('RUPSET_ZZ', ('WLG', 'MRO'), 10, union=True)),
+            list(get_location_radius_ruptures('RUPSET_ZZ', ('WLG',), 100)),
+            get_fault_name_rupture_ids('RUPSET_ZZ', ['Big', 'Alpine: Kaniere']),
+            list(get_fault_name_ruptures('RUPSET_ZZ', ['Big', 'Alpine: Kaniere', 'Nope'], union=True)),
+        )
+
+    def test_export(self):
+        snapshot.export_snapshot('RUPSET_ZZ', self.path)
+        snap = snapshot.Snapshot(self.path)
+        self.assertEqual(snap.rupture_set_id, 'RUPSET_ZZ')
+        self.assertEqual(snap.keys('location_radius'), ['MRO:10', 'WLG:10', 'WLG:100'])
+        self.assertEqual(snap.keys('fault_name'), ['Alpine: Kaniere', 'Big'])
+        self.assertEqual(snap.meta['counts'], dict(location_radius=3, fault_name=2))
+
+        record = snap.location_radius_records(['WLG:100'])['WLG:100']
+        self.assertEqual(record.ruptures.tolist(), list(range(0, 3000, 3)))
+        self.assertIsInstance(record.ruptures.base, np.memmap)
+        self.assertIsNone(snap.fault_name_records(['Nope'])['Nope'])
+
+        # it's a plain npz file too
+        with np.load(self.path) as npz:
+            self.assertEqual(npz['fault_name.fault_ids'].tolist(), [3, 7])
+
+    def test_queries_match_dynamodb(self):
+        expected = self.queries()
+        snapshot.export_snapshot('RUPSET_ZZ', self.path)
+        snapshot.use_snapshot(self.path)
+        location_radius.clear_caches()
+        with mock.patch('solvis_store.backends.dynamodb.batch_get_shards') as batch_get:
+            actual = self.queries()
+            records = location_radius.query_fn('RUPSET_ZZ', 'WLG', 10)
+            faults = fault_name.query_fn('RUPSET_ZZ', ('Big',))
+        batch_get.assert_not_called()
+        self.assertEqual(actual, expected)
+        self.assertEqual(records[0].ruptures.tolist(), [1, 2, 3])
+        self.assertEqual(faults[0].fault_id, 7)
+
+    def test_compressed_npz_is_rejected(self):
+        np.savez_compressed(self.path, x=np.arange(3))
+        with self.assertRaises(ValueError):
+            snapshot.Snapshot(self.path)
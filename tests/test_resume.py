@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.resume` module."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from moto import mock_dynamodb
+
+from solvis_store import model
+from solvis_store.backends.dynamodb import DynamoDBBackend
+from solvis_store.backends.sqlite import SQLiteBackend
+from solvis_store.create import create_location_radius_rupture_models, create_parent_fault_rupture_models
+from solvis_store.records import FaultNameRecord, LocationRadiusRecord, content_hash
+from solvis_store.resume import ChangedModels, Journal, location_chunks, location_keys
+from solvis_store.sharding import shard_model
+
+from .synthetic_solution import SyntheticFaultSystemSolution
+
+LOCATIONS = ['WLG', 'AKL', 'CHC', 'ZQN']
+RADII = [50, 100, 200]
+
+
+class TestContentHash(unittest.TestCase):
+    def test_independent_of_order(self):
+        a = LocationRadiusRecord('WLG', np.array([3, 1, 2]), np.array([1.0, 2.0, 3.0]), radius=200)
+        b = LocationRadiusRecord('WLG', np.array([1, 2, 3]), np.array([2.0, 3.0, 1.0], dtype=np.float32), radius=200)
+        self.assertEqual(content_hash(a), content_hash(b))
+        self.assertNotEqual(content_hash(a), content_hash(a._replace(radius=100)))
+        self.assertNotEqual(content_hash(a), content_hash(a._replace(distances=np.array([1.0, 2.0, 3.5]))))
+        fault = FaultNameRecord('Big', 1, np.array([1, 2]))
+        self.assertNotEqual(content_hash(fault), content_hash(fault._replace(fault_id=2)))
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = Path(self.tmpdir.name) / 'journal.jsonl'
+
+    def test_record_and_resume(self):
+        journal = Journal(self.path)
+        self.assertEqual(journal.pending_locations('PUY', 'RS_1', LOCATIONS, RADII, False), LOCATIONS)
+        journal.record('PUY', 'RS_1', location_keys('WLG', RADII) + location_keys('AKL', RADII[:1]))
+        with open(self.path, 'a') as f:
+            f.write('{"fault_system": "PUY", "rupt')  # interrupted mid write
+
+        resumed = Journal(self.path)
+        self.assertEqual(resumed.pending_locations('PUY', 'RS_1', LOCATIONS, RADII, False), ['AKL', 'CHC', 'ZQN'])
+        self.assertEqual(resumed.pending_locations('PUY', 'RS_1', LOCATIONS, RADII, True), LOCATIONS)
+        self.assertEqual(resumed.pending_locations('HIK', 'RS_1', LOCATIONS, RADII, False), LOCATIONS)
+        self.assertEqual(resumed.done('PUY', 'RS_1'), {'WLG:50', 'WLG:100', 'WLG:200', 'AKL:50'})
+
+    def test_location_chunks(self):
+        fss = SyntheticFaultSystemSolution(n_sections=60, n_ruptures=400)
+        models = list(create_location_radius_rupture_models(fss, 'RS_1', LOCATIONS, RADII))
+        chunks = []
+        for locations, chunk in location_chunks(iter(models), 3):
+            chunks.append((list(chunk), list(locations)))
+        self.assertEqual([mod for chunk, _ in chunks for mod in chunk], models)
+        self.assertEqual([locations for _, locations in chunks], [['WLG', 'AKL', 'CHC'], ['ZQN']])
+        self.assertTrue(all(mod.location in locations for chunk, locations in chunks for mod in chunk))
+        self.assertEqual(list(location_chunks([], 3)), [])
+
+    def test_location_keys(self):
+        self.assertEqual(location_keys('WLG', [10, 20]), ['WLG:10', 'WLG:20'])
+        self.assertEqual(location_keys('WLG', [10, 20], nearest=True), ['WLG'])
+
+
+class ChangedModelsTests:
+    """Incremental reruns against a backend, mixed in to a `unittest.TestCase` that sets `self.backend`."""
+
+    backend: object
+
+    def test_only_changed_models_are_written(self):
+        fss = SyntheticFaultSystemSolution(n_sections=60, n_ruptures=400)
+        models = list(create_location_radius_rupture_models(fss, 'RS_1', LOCATIONS, RADII, compact=True))
+        count = self.backend.put_models(models)
+
+        changed = ChangedModels(self.backend.content_hashes('location_radius', 'RS_1'))
+        self.assertEqual(list(changed(models)), [])
+        self.assertEqual((changed.changed, changed.unchanged), (0, count))
+
+        # one location more, and different ruptures for one key
+        models = list(create_location_radius_rupture_models(fss, 'RS_1', LOCATIONS + ['NPE'], RADII, compact=True))
+        models[0].packed_ruptures = models[0].packed_ruptures[1:]
+        models[0].packed_distances = models[0].packed_distances[1:]
+        models[0].content_hash = content_hash(
+            LocationRadiusRecord(models[0].location_radius, models[0].packed_ruptures, models[0].packed_distances, 50)
+        )
+        changed = ChangedModels(self.backend.content_hashes('location_radius', 'RS_1'))
+        written = [mod.location_radius for mod in changed(models)]
+        self.assertEqual(written[0], models[0].location_radius)
+        self.assertTrue(all(key.startswith('NPE:') for key in written[1:]))
+
+    def test_fault_names(self):
+        fss = SyntheticFaultSystemSolution(n_sections=60, n_ruptures=400)
+        self.backend.put_models(create_parent_fault_rupture_models(fss, 'RS_1'))
+        changed = ChangedModels(self.backend.content_hashes('fault_name', 'RS_1'))
+        self.assertEqual(list(changed(create_parent_fault_rupture_models(fss, 'RS_1', compact=True))), [])
+        self.assertGreater(changed.unchanged, 0)
+
+
+class TestChangedModelsSQLite(ChangedModelsTests, unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.backend = SQLiteBackend(Path(self.tmpdir.name) / 'store.sqlite')
+        self.addCleanup(self.backend.close)
+
+
+class TestChangedModelsDynamoDB(ChangedModelsTests, unittest.TestCase):
+    def setUp(self):
+        mock = mock_dynamodb()  # the inherited tests are not decorated by a class decorator
+        mock.start()
+        self.addCleanup(mock.stop)
+        model.set_local_mode()
+        model.migrate()
+        self.backend = DynamoDBBackend(writers=2)
+
+    def test_partly_written_shards_are_rewritten(self):
+        fss = SyntheticFaultSystemSolution(n_sections=60, n_ruptures=400)
+        models = list(create_location_radius_rupture_models(fss, 'RS_1', ['WLG'], [200], compact=True))
+        shards = shard_model(models[0], max_item_bytes=300)
+        self.assertGreater(len(shards), 2)
+        self.backend.put_models(shards)
+        changed = ChangedModels(self.backend.content_hashes('location_radius', 'RS_1'))
+        self.assertEqual(list(changed(shards)), [])
+
+        # as if the run died before writing the last shard
+        shards[-1].delete()
+        changed = ChangedModels(self.backend.content_hashes('location_radius', 'RS_1'))
+        self.assertEqual(list(changed(shards)), shards)
+        self.assertEqual((changed.changed, changed.unchanged), (1, 0))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.create.section_distances` module."""
+
+import unittest
+
+import geopandas as gpd
+import numpy as np
+from pyproj import Transformer
+from shapely.geometry import LineString, Point, Polygon
+
+from solvis_store.create.section_distances import section_location_distances
+
+LOCATIONS = [(-41.3, 174.78), (-36.87, 174.77), (-43.53, 172.63)]  # WLG, AKL, CHC
+
+
+def reference_distance(lat, lon, geometry, upper_depth, lower_depth):
+    """Mirrors `solvis.geometry.section_distance`, the nearest of the first two trace points at both depths."""
+    transformer = Transformer.from_crs(
+        "+proj=longlat +datum=WGS84 +no_defs", f"+proj=aeqd +R=6371000 +units=m +lat_0={lat} +lon_0={lon}"
+    )
+    coords = geometry.exterior.coords.xy if isinstance(geometry, Polygon) else geometry.coords.xy
+    xs, ys = transformer.transform(*coords)
+    points = [(xs[idx], ys[idx], depth * 1000) for idx in (0, 1) for depth in (upper_depth, lower_depth)]
+    return min(np.linalg.norm(point) / 1000 for point in points)
+
+
+class TestSectionLocationDistances(unittest.TestCase):
+    def setUp(self):
+        self.surfaces = gpd.GeoDataFrame(
+            dict(
+                UpDepth=[0.0, 2.5, 5.0],
+                LowDepth=[20.0, 15.0, 25.0],
+                geometry=[
+                    LineString([(174.9, -41.2), (175.1, -41.0), (175.3, -40.8)]),
+                    Polygon([(172.5, -43.0), (172.7, -43.2), (172.9, -43.1), (172.5, -43.0)]),
+                    LineString([(176.0, -38.0), (176.2, -37.9)]),
+                ],
+            )
+        )
+
+    def test_matches_reference(self):
+        lats, lons = zip(*LOCATIONS)
+        distances = section_location_distances(self.surfaces, lats, lons)
+        self.assertEqual(distances.shape, (3, 3))
+        for row, section in enumerate(self.surfaces.itertuples()):
+            for col, (lat, lon) in enumerate(LOCATIONS):
+                expected = reference_distance(lat, lon, section.geometry, section.UpDepth, section.LowDepth)
+                self.assertAlmostEqual(distances[row, col], expected, places=6)
+
+    def test_matches_solvis_section_distance(self):
+        try:
+            import pyvista  # noqa
+        except ImportError:
+            self.skipTest("solvis.geometry.section_distance needs the optional pyvista dependency")
+        from solvis import geometry
+
+        lats, lons = zip(*LOCATIONS)
+        distances = section_location_distances(self.surfaces, lats, lons)
+        for col, (lat, lon) in enumerate(LOCATIONS):
+            transformer = Transformer.from_crs(
+                "+proj=longlat +datum=WGS84 +no_defs", f"+proj=aeqd +R=6371000 +units=m +lat_0={lat} +lon_0={lon}"
+            )
+            for row, section in enumerate(self.surfaces.itertuples()):
+                expected = geometry.section_distance(transformer, section.geometry, section.UpDepth, section.LowDepth)
+                self.assertAlmostEqual(distances[row, col], expected, places=6)
+
+    def test_float32(self):
+        lats, lons = zip(*LOCATIONS)
+        distances = section_location_distances(self.surfaces, lats, lons, dtype=np.float32)
+        self.assertEqual(distances.dtype, np.float32)
+        np.testing.assert_allclose(distances, section_location_distances(self.surfaces, lats, lons), rtol=1e-6)
+
+    def test_unsupported_geometry(self):
+        self.surfaces.loc[1, 'geometry'] = Point(172.5, -43.0)
+        with self.assertRaises(ValueError):
+            section_location_distances(self.surfaces, [-41.3], [174.78])
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""Tests for `solvis_store.sharding` module."""
+
+import unittest
+
+import numpy as np
+from moto import mock_dynamodb
+
+from solvis_store import instrumentation, model
+from solvis_store.backends.dynamodb import DynamoDBBackend
+from solvis_store.bulk_load import bulk_load
+from solvis_store.query import fault_name, get_fault_name_rupture_ids, get_location_radius_ruptures, location_radius
+from solvis_store.sharding import MAX_ITEM_BYTES, group_shards, is_shard_key, item_size, shard_model, stale_shard_keys
+
+
+def location_model(location_radius, ruptures, distances, compact=False):
+    arrays = (
+        dict(packed_ruptures=np.array(ruptures), packed_distances=np.array(distances))
+        if compact
+        else dict(ruptures=list(ruptures), distances=list(distances))
+    )
+    return model.RuptureSetLocationDistances(
+        rupture_set_id='RUPSET_ZZ',
+        location_radius=location_radius,
+        radius=int(location_radius.split(':')[1]),
+        location=location_radius.split(':')[0],
+        rupture_count=len(ruptures),
+        **arrays,
+    )
+
+
+def leftover_shard(location_radius, shard):
+    """A shard left behind by an item since rewritten with fewer shards."""
+    mod = location_model(location_radius, [7], [7.0])
+    mod.location_radius, mod.shard, mod.shard_count = f'{location_radius}#{shard}', shard, shard + 1
+    return mod
+
+
+class TestShardModel(unittest.TestCase):
+    def test_is_shard_key(self):
+        assert is_shard_key('WLG:20', 'WLG:20')
+        assert is_shard_key('WLG:20#3', 'WLG:20')
+        assert not is_shard_key('WLG:200', 'WLG:20')
+        assert not is_shard_key('WLG:20#x', 'WLG:20')
+
+    def test_small_model_is_not_sharded(self):
+        mod = location_model('WLG:10', [1, 2, 3], [1.0, 2.0, 3.0])
+        self.assertEqual(shard_model(mod), [mod])
+
+    def test_legacy_model_shards(self):
+        ruptures = list(range(0, 300_000, 2))
+        mod = location_model('WLG:200', ruptures, [round(r / 1000, 3) for r in ruptures])
+        shards = shard_model(mod)
+        self.assertGreater(len(shards), 1)
+        self.assertEqual([shard.location_radius for shard in shards][:2], ['WLG:200', 'WLG:200#1'])
+        self.assertEqual(sum(shard.rupture_count for shard in shards), len(ruptures))
+        self.assertEqual(sum((shard.ruptures for shard in shards), []), ruptures)
+        for shard in shards:
+            assert item_size(shard) <= MAX_ITEM_BYTES
+            assert shard.shard_count == len(shards)
+
+    def test_compact_model_shards(self):
+        ruptures = np.arange(1000)
+        shards = shard_model(location_model('WLG:200', ruptures, ruptures / 10, compact=True), max_item_bytes=1000)
+        self.assertGreater(len(shards), 1)
+        np.testing.assert_array_equal(np.concatenate([shard.packed_ruptures for shard in shards]), ruptures)
+
+    def test_group_shards_ignores_leftover_shards(self):
+        shards = shard_model(location_model('WLG:200', np.arange(1000), np.arange(1000) / 10, True), 1000)
+        leftover = leftover_shard('WLG:200', len(shards))
+        grouped = group_shards([leftover, *reversed(shards)], ['WLG:200'], 'location_radius')
+        self.assertEqual(grouped, {'WLG:200': shards})
+
+        unsharded = location_model('WLG:200', [1, 2], [1.0, 2.0])
+        self.assertEqual(group_shards([unsharded, shards[1]], ['WLG:200'], 'location_radius'), {'WLG:200': [unsharded]})
+
+    def test_group_shards_drops_missing_shards(self):
+        shards = shard_model(location_model('WLG:200', np.arange(1000), np.arange(1000) / 10, True), 1000)
+        self.assertEqual(group_shards(shards[:1], ['WLG:200'], 'location_radius'), {})
+        self.assertEqual(group_shards(shards[1:], ['WLG:200'], 'location_radius'), {})
+
+    def test_stale_shard_keys(self):
+        range_keys = ['WLG:20', 'WLG:20#1', 'WLG:20#2', 'WLG:20#10', 'WLG:200#3']
+        self.assertEqual(stale_shard_keys('WLG:20', 2, range_keys), ['WLG:20#2', 'WLG:20#10'])
+        self.assertEqual(stale_shard_keys('WLG:20', 1, range_keys), ['WLG:20#1', 'WLG:20#2', 'WLG:20#10'])
+
+
+@mock_dynamodb
+class TestShardedQueries(unittest.TestCase):
+    def setUp(self):
+        model.set_local_mode()
+        model.migrate()
+        location_radius.clear_caches()
+        fault_name.clear_caches()
+
+        self.ruptures = np.arange(0, 3000, 3)
+        self.distances = np.linspace(0, 199, len(self.ruptures)).astype(np.float32)
+        models = [
+            *shard_model(location_model('WLG:200', self.ruptures, self.distances, compact=True), max_item_bytes=500),
+            location_model('WLG:20', [1, 2], [5.0, 6.0]),
+            *shard_model(
+                model.RuptureSetParentFaultRuptures(
+                    rupture_set_id='RUPSET_ZZ',
+                    fault_name='Big Fault',
+                    fault_id=1,
+                    ruptures=list(range(5000)),
+                    rupture_count=5000,
+                ),
+                max_item_bytes=2000,
+            ),
+            model.RuptureSetParentFaultRuptures(
+                rupture_set_id='RUPSET_ZZ', fault_name='Big Fault 2', fault_id=2, ruptures=[4999, 5000], rupture_count=2
+            ),
+        ]
+        bulk_load(models)
+        return super(TestShardedQueries, self).setUp()
+
+    def test_location_radius_shards_are_reassembled(self):
+        rsds = list(get_location_radius_ruptures(rupture_set_id='RUPSET_ZZ', locations=('WLG',), radius=200))
+        self.assertEqual([rsd.rupt_id for rsd in rsds], self.ruptures.tolist())
+        np.testing.assert_array_equal([rsd.distance for rsd in rsds], self.distances)
+
+    def test_location_radius_prefix_is_not_matched(self):
+        rsds = list(get_location_radius_ruptures(rupture_set_id='RUPSET_ZZ', locations=('WLG',), radius=20))
+        self.assertEqual([rsd.rupt_id for rsd in rsds], [1, 2])
+
+    def test_fault_name_shards_are_reassembled(self):
+        rids = get_fault_name_rupture_ids(rupture_set_id='RUPSET_ZZ', fault_names=['Big Fault'])
+        self.assertEqual(sorted(rids), list(range(5000)))
+        rids = get_fault_name_rupture_ids(rupture_set_id='RUPSET_ZZ', fault_names=['Big Fault', 'Big Fault 2'])
+        self.assertEqual(sorted(rids), [4999])
+
+    def test_keys_with_the_same_prefix_are_not_read(self):
+        bulk_load(
+            model.RuptureSetParentFaultRuptures(
+                rupture_set_id='RUPSET_ZZ', fault_name=name, fault_id=3, ruptures=list(range(1000)), rupture_count=1000
+            )
+            for name in ('Big Fault 1', 'Big Fault#x')
+        )
+        instrumentation.reset_stats()
+        record = DynamoDBBackend().get('fault_name', 'RUPSET_ZZ', 'Big Fault 2')
+        self.assertEqual(record.ruptures.tolist(), [4999, 5000])
+        self.assertEqual(instrumentation.read_stats()['RuptureSetParentFaultRuptures.batch_get'].items, 1)
+
+        instrumentation.reset_stats()
+        records = fault_name.query_fn('RUPSET_ZZ', ('Big Fault', 'Big Fault 2', 'Big Fault 1'))
+        self.assertEqual([record.fault_name for record in records], ['Big Fault', 'Big Fault 2', 'Big Fault 1'])
+        shard_count = model.RuptureSetParentFaultRuptures.get('RUPSET_ZZ', 'Big Fault').shard_count
+        stats = instrumentation.read_stats()
+        self.assertEqual(list(stats), ['RuptureSetParentFaultRuptures.batch_get'])
+        self.assertEqual(stats['RuptureSetParentFaultRuptures.batch_get'].items, shard_count + 2)
+
+    def test_leftover_shard_is_ignored(self):
+        bulk_load([leftover_shard('WLG:20', 2)])
+        rsds = list(get_location_radius_ruptures(rupture_set_id='RUPSET_ZZ', locations=('WLG',), radius=20))
+        self.assertEqual([rsd.rupt_id for rsd in rsds], [1, 2])
+
+    def test_rewrite_deletes_leftover_shards(self):
+        DynamoDBBackend().put_models([location_model('WLG:200', [1, 2], [5.0, 6.0])], writers=2)
+        range_keys = [item.location_radius for item in model.RuptureSetLocationDistances.query('RUPSET_ZZ')]
+        self.assertEqual(range_keys, ['WLG:20', 'WLG:200'])
+        rsds = list(get_location_radius_ruptures(rupture_set_id='RUPSET_ZZ', locations=('WLG',), radius=200))
+        self.assertEqual([rsd.rupt_id for rsd in rsds], [1, 2])
+
+    def tearDown(self):
+        model.drop_all()
+        return super(TestShardedQueries, self).tearDown()